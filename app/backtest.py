@@ -1,38 +1,40 @@
 """
 Backtest: 동일 지표/전략 (처리 순서 스탑→청산→진입, 직전 N봉 Donchian, 필터 3개).
-- Binance API 또는 DB 테이블(btc4h 등)에서 캔들 로드 가능.
+- Binance API, DB 테이블(btc4h 등) 또는 로컬 파일(.bin/.csv/.parquet)에서 캔들 로드 가능.
 - 매매 기록 전체를 JSON 파일로 저장 가능.
+- --intrabar-tf 1m|15m: 하위 TF 캔들로 봉 중 스탑 도달 시점/체결가 시뮬레이션 (고정밀 모드).
+- --stream: DB 서버사이드 커서로 청크 단위 스트리밍 (1m 수년치도 메모리 일정). 지표/포지션 상태는 엔진이 이어감.
+- 결과 캐시: 같은 캔들 내용 + params + 비용 설정이면 .backtest_cache/에서 바로 반환 (--no-cache로 끔).
+- --checkpoint: 엔진 상태(포지션/잔고/필터/지표 스트림)를 저장해 두고, 다음 실행은 이후 새 봉만 처리.
+- --trades-out: 매매 기록을 실행 중 JSONL/바이너리(.tbt)로 스트리밍 기록 (+ .gz), 요약은 별도 작은 JSON. 전체 매매는 메모리에 안 쌓고 결과 캐시도 안 씀.
 CLI: python -m app.backtest BTCUSDT 4h --source db --output trades.json
 """
 import argparse
 import json
+import os
 import sys
-from app.services.binance_client import fetch_klines
-from app.services.db_klines import load_klines_from_db
-from app.services.indicators import compute_all
+import time
+from collections import deque
+from itertools import islice
+from typing import Callable
+from app.services import backtest_cache
+from app.services.intrabar import IntrabarIndex, tf_to_ms
+from app.services.indicators import IndicatorStream
 from app.services.strategy import evaluate, LONG_ENTRY, SHORT_ENTRY, LONG_EXIT, SHORT_EXIT
 from app.services.params import DEFAULT_PARAMS
 from app.services.adaptive_filter import evaluate as filter_evaluate, check_consecutive_losses, reason_to_ko
 
+# 같은 입력에 대한 결과가 달라지는 엔진/전략/필터 변경 시 올림 (결과 캐시 무효화)
+ENGINE_VERSION = 1
 
-def run_backtest(
-    symbol: str,
-    tf: str,
-    limit: int | None = 500,
-    source: str = "binance",
-    initial_capital_usdt: float = 1000.0,
+
+def backtest_params(
     adx_min: float | None = None,
     entry_len: int | None = None,
     exit_len: int | None = None,
     cooldown_bars: int | None = None,
-    slippage_bps: float = 0,
-    fee_bps: float = 0,
 ) -> dict:
-    """
-    source: "binance" | "db"
-    - binance: fetch_klines(symbol, tf, limit)
-    - db: load_klines_from_db(symbol, tf, limit) — btc4h 등 TABLE_MAP에 등록된 테이블 사용.
-    """
+    """DEFAULT_PARAMS + CLI 오버라이드."""
     params = dict(DEFAULT_PARAMS)
     if adx_min is not None:
         params["adx_min"] = adx_min
@@ -42,212 +44,579 @@ def run_backtest(
         params["exit_len"] = exit_len
     if cooldown_bars is not None:
         params["cooldown_bars"] = cooldown_bars
+    return params
 
-    if source == "db":
-        try:
-            klines = load_klines_from_db(symbol, tf, limit=limit)
-        except Exception as e:
-            return {"error": f"DB 로드 실패: {e}"}
-    else:
-        klines = fetch_klines(symbol, tf, limit=limit or 500)
-
-    if len(klines) < 250:
-        return {"error": f"캔들 부족: {len(klines)}개 (최소 250 필요)"}
-
-    ema_len = params["ema_len"]
-    entry_len = params["entry_len"]
-    exit_len = params["exit_len"]
-    dmi_len = params["dmi_len"]
-    atr_len = params["atr_len"]
-    adx_min = params["adx_min"]
-    stop_mult = params["stop_mult"]
-    breakout_atr_margin = params.get("breakout_atr_margin", 0.2)
-    use_ema_slope = params.get("use_ema_slope", True)
-    use_adx_rising = params.get("use_adx_rising", True)
-    cooldown_bars = int(params.get("cooldown_bars", 0))  # 청산 후 N봉 대기 (실전과 동일)
-
-    start_idx = max(ema_len, entry_len, exit_len, dmi_len, atr_len) + 25
-    position_side = None
-    entry_price = 0.0
-    stop_price: float | None = None
-    trades = []
-    balance = initial_capital_usdt
-    last_3_exit_pnls: list[float] = []
-    skip_entries_remaining = 0
-    entry_filter_state = "NORMAL"
-    entry_position_mult = 1.0
-    last_exit_bar_idx: int | None = None  # 청산 후 N봉 대기용 (실전 worker _in_cooldown과 동일)
-
-    slip = 1 + (slippage_bps / 10000)  # 진입 시 불리, 청산 시 불리
-    fee = fee_bps / 10000  # 한 번당
-
-    for i in range(start_idx, len(klines)):
-        window = klines[: i + 1]
-        indicators = compute_all(
-            window,
-            ema_len=ema_len,
-            entry_len=entry_len,
-            exit_len=exit_len,
-            dmi_len=dmi_len,
-            atr_len=atr_len,
+
+class BacktestEngine:
+    """
+    봉 단위 백테스트 상태 머신. step(bar)로 한 봉씩 넣으면 지표(IndicatorStream)·포지션·잔고·필터 상태가 이어짐.
+    - 리스트든 DB 서버사이드 커서든 같은 경로 → 청크 경계와 무관하게 결과 동일.
+    - keep_trades=False면 전체 매매 리스트 대신 요약 카운터 + 최근 20건만 유지 (봉 수와 무관하게 메모리 일정).
+    - checkpoint()/from_checkpoint(): 상태 전체를 JSON dict로 저장·복원 → 새 봉만 이어서 step.
+    - on_trade: 매매 1건마다 호출되는 싱크 (trade_log writer 등). keep_trades와 무관하게 전 건 전달.
+    """
+
+    # 체크포인트에 그대로 저장하는 봉 단위 상태 (지표 스트림·매매 기록은 별도)
+    _STATE_FIELDS = (
+        "bar_idx",
+        "last_open_time",
+        "position_side",
+        "entry_price",
+        "stop_price",
+        "balance",
+        "last_3_exit_pnls",
+        "skip_entries_remaining",
+        "entry_filter_state",
+        "entry_position_mult",
+        "last_exit_bar_idx",
+        "exit_count",
+        "win_count",
+        "total_pnl",
+    )
+
+    def __init__(
+        self,
+        params: dict,
+        *,
+        initial_capital_usdt: float = 1000.0,
+        slippage_bps: float = 0,
+        fee_bps: float = 0,
+        intrabar: IntrabarIndex | None = None,
+        max_gap_bps: float = 50,
+        keep_trades: bool = True,
+        on_trade: Callable[[dict], None] | None = None,
+    ):
+        self.params = params
+        self.ema_len = params["ema_len"]
+        self.entry_len = params["entry_len"]
+        self.exit_len = params["exit_len"]
+        self.dmi_len = params["dmi_len"]
+        self.atr_len = params["atr_len"]
+        self.adx_min = params["adx_min"]
+        self.stop_mult = params["stop_mult"]
+        self.breakout_atr_margin = params.get("breakout_atr_margin", 0.2)
+        self.use_ema_slope = params.get("use_ema_slope", True)
+        self.use_adx_rising = params.get("use_adx_rising", True)
+        self.cooldown_bars = int(params.get("cooldown_bars", 0))  # 청산 후 N봉 대기 (실전과 동일)
+        self.start_idx = max(self.ema_len, self.entry_len, self.exit_len, self.dmi_len, self.atr_len) + 25
+
+        self.initial_capital_usdt = initial_capital_usdt
+        self.slippage_bps = slippage_bps
+        self.fee_bps = fee_bps
+        self.slip = 1 + (slippage_bps / 10000)  # 진입 시 불리, 청산 시 불리
+        self.fee = fee_bps / 10000  # 한 번당
+        self.intrabar = intrabar
+        self.intrabar_base = 0  # intrabar 인덱스 0번이 가리키는 bar_idx (체크포인트 재개 시 새 봉부터 인덱싱)
+        self.max_gap_bps = max_gap_bps
+        self.keep_trades = keep_trades
+        self.on_trade = on_trade
+
+        self.indicators = IndicatorStream(
+            ema_len=self.ema_len,
+            entry_len=self.entry_len,
+            exit_len=self.exit_len,
+            dmi_len=self.dmi_len,
+            atr_len=self.atr_len,
+        )
+        self.bar_idx = -1
+        self.last_open_time: int | None = None
+        self.position_side: str | None = None
+        self.entry_price = 0.0
+        self.stop_price: float | None = None
+        self.balance = initial_capital_usdt
+        self.last_3_exit_pnls: list[float] = []
+        self.skip_entries_remaining = 0
+        self.entry_filter_state = "NORMAL"
+        self.entry_position_mult = 1.0
+        self.last_exit_bar_idx: int | None = None  # 청산 후 N봉 대기용 (실전 worker _in_cooldown과 동일)
+
+        self.trades: list[dict] = []
+        self.recent_trades: deque = deque(maxlen=20)
+        self.exit_count = 0
+        self.win_count = 0
+        self.total_pnl = 0.0
+
+    @property
+    def bars(self) -> int:
+        return self.bar_idx + 1
+
+    def settings(self) -> dict:
+        """결과에 영향을 주는 실행 설정 (체크포인트 호환성 검사용)."""
+        return {
+            "engine_version": ENGINE_VERSION,
+            "params": self.params,
+            "initial_capital_usdt": self.initial_capital_usdt,
+            "slippage_bps": self.slippage_bps,
+            "fee_bps": self.fee_bps,
+            "max_gap_bps": self.max_gap_bps,
+        }
+
+    def checkpoint(self) -> dict:
+        """현재 상태 전체 (JSON 직렬화 가능). from_checkpoint로 복원 후 다음 봉부터 step하면 끊김 없이 이어짐."""
+        return {
+            "settings": self.settings(),
+            "state": {name: getattr(self, name) for name in self._STATE_FIELDS},
+            "keep_trades": self.keep_trades,
+            "trades": self.trades,
+            "recent_trades": list(self.recent_trades),
+            "indicators": self.indicators.state(),
+        }
+
+    @classmethod
+    def from_checkpoint(cls, cp: dict) -> "BacktestEngine":
+        s = cp["settings"]
+        engine = cls(
+            s["params"],
+            initial_capital_usdt=s["initial_capital_usdt"],
+            slippage_bps=s["slippage_bps"],
+            fee_bps=s["fee_bps"],
+            max_gap_bps=s["max_gap_bps"],
+            keep_trades=cp["keep_trades"],
         )
+        for name in cls._STATE_FIELDS:
+            setattr(engine, name, cp["state"][name])
+        engine.trades = cp["trades"]
+        engine.recent_trades = deque(cp["recent_trades"], maxlen=20)
+        engine.indicators.load_state(cp["indicators"])
+        return engine
+
+    def _add_trade(self, trade: dict) -> None:
+        if self.keep_trades:
+            self.trades.append(trade)
+        self.recent_trades.append(trade)
+        if self.on_trade is not None:
+            self.on_trade(trade)
+
+    def _exit(self, t: int, side: str, exit_px: float, pnl_pct: float, via: str) -> None:
+        self.balance = self.balance * (1 + self.entry_position_mult * pnl_pct / 100)
+        self.last_3_exit_pnls = (self.last_3_exit_pnls + [pnl_pct])[-3:]
+        if check_consecutive_losses(self.last_3_exit_pnls):
+            self.skip_entries_remaining = 2
+        self.exit_count += 1
+        if pnl_pct > 0:
+            self.win_count += 1
+        self.total_pnl += pnl_pct
+        self._add_trade({"time": t, "side": side, "price": exit_px, "action": "exit", "pnl_pct": pnl_pct, "via": via, "balance": self.balance, "filter_state": self.entry_filter_state})
+        self.position_side = None
+        self.entry_price = 0.0
+        self.stop_price = None
+        self.last_exit_bar_idx = self.bar_idx
+
+    def step(self, bar: dict) -> None:
+        """봉 1개 처리 (마감 기준): 1) 스탑 2) 청산 3) 진입."""
+        self.bar_idx += 1
+        i = self.bar_idx
+        self.last_open_time = bar["open_time"]
+        self.indicators.push(bar)
+        if i < self.start_idx:
+            return
+        indicators = self.indicators.snapshot()
         close = indicators.get("close")
         if close is None:
-            continue
+            return
+
+        high = bar["h"]
+        low = bar["l"]
+        t = bar["open_time"]
+        fee = self.fee
+        slip = self.slip
+        position_side = self.position_side
+        entry_price = self.entry_price
+        stop_price = self.stop_price
+
+        # Intrabar: 상위 봉이 스탑을 건드렸으면 하위 TF로 실제 도달 여부/체결가 확인
+        intrabar_fill: float | None = None
+        stop_active = stop_price
+        if self.intrabar is not None and stop_price is not None and self.intrabar.has_slice(i - self.intrabar_base):
+            touched = (position_side == "LONG" and low <= stop_price) or (position_side == "SHORT" and high >= stop_price)
+            if touched:
+                hit = self.intrabar.stop_fill(i - self.intrabar_base, position_side, stop_price, self.max_gap_bps)
+                if hit is None:
+                    stop_active = None  # 하위 TF상 미도달 (상위 봉 꼬리 데이터 불일치) → 스탑 없음으로 평가
+                else:
+                    intrabar_fill = hit[0]
 
         action = evaluate(
             indicators,
             position_side,
             entry_price=entry_price if position_side else None,
-            stop_price=stop_price,
-            adx_min=adx_min,
-            breakout_atr_margin=breakout_atr_margin,
-            use_ema_slope=use_ema_slope,
-            use_adx_rising=use_adx_rising,
+            stop_price=stop_active,
+            adx_min=self.adx_min,
+            breakout_atr_margin=self.breakout_atr_margin,
+            use_ema_slope=self.use_ema_slope,
+            use_adx_rising=self.use_adx_rising,
         )
 
-        bar = window[-1]
-        high = bar["h"]
-        low = bar["l"]
-        t = bar["open_time"]
-
         # Adaptive Filter (거래 여부·규모만 조절, 진입/청산 규칙은 그대로)
         adx = indicators.get("ADX")
         atr_cur = indicators.get("ATR")
         atr_30 = indicators.get("ATR_30")
-        filt = filter_evaluate(adx, atr_cur, atr_30, last_3_exit_pnls, skip_entries_remaining)
-
-        def _record_exit(side: str, exit_px: float, pnl_pct: float, via: str):
-            nonlocal balance, last_3_exit_pnls, skip_entries_remaining
-            balance = balance * (1 + entry_position_mult * pnl_pct / 100)
-            last_3_exit_pnls = (last_3_exit_pnls + [pnl_pct])[-3:]
-            if check_consecutive_losses(last_3_exit_pnls):
-                skip_entries_remaining = 2
-            return {"time": t, "side": side, "price": exit_px, "action": "exit", "pnl_pct": pnl_pct, "via": via, "balance": balance, "filter_state": entry_filter_state}
+        filt = filter_evaluate(adx, atr_cur, atr_30, self.last_3_exit_pnls, self.skip_entries_remaining)
 
         # 1) 스탑 체결 (봉 중) — 실전과 동일
-        if position_side == "LONG" and stop_price is not None and low <= stop_price:
-            exit_px = min(stop_price, close) * (1 - fee)
+        if position_side == "LONG" and stop_active is not None and low <= stop_active:
+            exit_px = (intrabar_fill if intrabar_fill is not None else min(stop_price, close)) * (1 - fee)
             pnl_pct = (exit_px - entry_price * (1 + fee)) / (entry_price * (1 + fee)) * 100
-            trades.append(_record_exit("LONG", exit_px, pnl_pct, "stop"))
-            position_side = None
-            entry_price = 0.0
-            stop_price = None
-            last_exit_bar_idx = i
-            continue
-        if position_side == "SHORT" and stop_price is not None and high >= stop_price:
-            exit_px = max(stop_price, close) * (1 + fee)
+            self._exit(t, "LONG", exit_px, pnl_pct, "stop")
+            return
+        if position_side == "SHORT" and stop_active is not None and high >= stop_active:
+            exit_px = (intrabar_fill if intrabar_fill is not None else max(stop_price, close)) * (1 + fee)
             pnl_pct = (entry_price * (1 - fee) - exit_px) / (entry_price * (1 - fee)) * 100
-            trades.append(_record_exit("SHORT", exit_px, pnl_pct, "stop"))
-            position_side = None
-            entry_price = 0.0
-            stop_price = None
-            last_exit_bar_idx = i
-            continue
+            self._exit(t, "SHORT", exit_px, pnl_pct, "stop")
+            return
 
         # 2) 청산 신호 — 실전과 동일
         if action == LONG_EXIT and position_side == "LONG":
             exit_px = close * (1 - fee)
             pnl_pct = (exit_px - entry_price * slip) / (entry_price * slip) * 100
-            trades.append(_record_exit("LONG", exit_px, pnl_pct, "channel"))
-            position_side = None
-            entry_price = 0.0
-            stop_price = None
-            last_exit_bar_idx = i
-            continue
+            self._exit(t, "LONG", exit_px, pnl_pct, "channel")
+            return
         if action == SHORT_EXIT and position_side == "SHORT":
             exit_px = close * (1 + fee)
             pnl_pct = (entry_price * (1 - fee) - exit_px) / (entry_price * (1 - fee)) * 100
-            trades.append(_record_exit("SHORT", exit_px, pnl_pct, "channel"))
-            position_side = None
-            entry_price = 0.0
-            stop_price = None
-            last_exit_bar_idx = i
-            continue
+            self._exit(t, "SHORT", exit_px, pnl_pct, "channel")
+            return
 
         # 청산 후 N봉 대기 (실전 worker _in_cooldown과 동일)
         skip_entry_cooldown = (
-            last_exit_bar_idx is not None
-            and i <= last_exit_bar_idx + 1 + cooldown_bars
+            self.last_exit_bar_idx is not None
+            and i <= self.last_exit_bar_idx + 1 + self.cooldown_bars
         )
 
         # 3) 진입 (필터 + 청산 후 쿨다운: 실전과 동일)
-        if action == LONG_ENTRY and position_side is None and not skip_entry_cooldown:
+        if action in (LONG_ENTRY, SHORT_ENTRY) and position_side is None and not skip_entry_cooldown:
             if not filt.allowed:
                 if filt.reason == "consecutive_loss_cooldown":
-                    skip_entries_remaining = max(0, skip_entries_remaining - 1)
-                continue
-            entry_filter_state = filt.state
-            entry_position_mult = filt.multiplier
+                    self.skip_entries_remaining = max(0, self.skip_entries_remaining - 1)
+                return
+            self.entry_filter_state = filt.state
+            self.entry_position_mult = filt.multiplier
             atr_val = indicators.get("ATR") or 0
-            entry_price = close * slip
-            stop_price = entry_price - stop_mult * atr_val
-            position_side = "LONG"
-            trades.append({"time": t, "side": "LONG", "price": entry_price, "action": "entry", "filter_state": filt.state, "position_mult": filt.multiplier, "reason_ko": reason_to_ko(filt.reason)})
-        elif action == SHORT_ENTRY and position_side is None and not skip_entry_cooldown:
-            if not filt.allowed:
-                if filt.reason == "consecutive_loss_cooldown":
-                    skip_entries_remaining = max(0, skip_entries_remaining - 1)
-                continue
-            entry_filter_state = filt.state
-            entry_position_mult = filt.multiplier
-            atr_val = indicators.get("ATR") or 0
-            entry_price = close * (1 - fee)
-            stop_price = entry_price + stop_mult * atr_val
-            position_side = "SHORT"
-            trades.append({"time": t, "side": "SHORT", "price": entry_price, "action": "entry", "filter_state": filt.state, "position_mult": filt.multiplier, "reason_ko": reason_to_ko(filt.reason)})
-
-    exit_trades = [t for t in trades if t.get("action") == "exit"]
-    wins = [t for t in exit_trades if t.get("pnl_pct", 0) > 0]
-    total_pnl = sum(t.get("pnl_pct", 0) for t in exit_trades)
-    win_rate = round(len(wins) / len(exit_trades) * 100, 2) if exit_trades else 0
-    n_bars = len(klines)
-    final_balance = balance
-    growth_pct = round((final_balance - initial_capital_usdt) / initial_capital_usdt * 100, 2) if initial_capital_usdt else 0
-
-    result_summary = {
-        "initial_capital_usdt": initial_capital_usdt,
-        "final_balance_usdt": round(final_balance, 2),
-        "growth_pct": growth_pct,
-        "symbol": symbol,
-        "tf": tf,
-        "source": source,
-        "adaptive_filter": "ON",
-        "bars": n_bars,
-        "bars_used": n_bars - start_idx,
-        "trades_count": len(exit_trades),
-        "wins": len(wins),
-        "losses": len(exit_trades) - len(wins),
-        "win_rate_pct": win_rate,
-        "total_pnl_pct": round(total_pnl, 2),
-        "avg_pnl_per_trade_pct": round(total_pnl / len(exit_trades), 2) if exit_trades else 0,
-    }
-
-    return {
-        "result": result_summary,
-        "symbol": symbol,
-        "tf": tf,
-        "source": source,
-        "bars": n_bars,
-        "start_idx": start_idx,
-        "trades_count": len(exit_trades),
-        "wins": len(wins),
-        "losses": len(exit_trades) - len(wins),
-        "win_rate_pct": win_rate,
-        "total_pnl_pct": round(total_pnl, 2),
-        "params": params,
-        "trades": trades,
-        "trades_last_20": trades[-20:],
-    }
+            if action == LONG_ENTRY:
+                side = "LONG"
+                self.entry_price = close * slip
+                self.stop_price = self.entry_price - self.stop_mult * atr_val
+            else:
+                side = "SHORT"
+                self.entry_price = close * (1 - fee)
+                self.stop_price = self.entry_price + self.stop_mult * atr_val
+            self.position_side = side
+            self._add_trade({"time": t, "side": side, "price": self.entry_price, "action": "entry", "filter_state": filt.state, "position_mult": filt.multiplier, "reason_ko": reason_to_ko(filt.reason)})
+
+    def result(self, symbol: str, tf: str, source: str, intrabar_tf: str | None = None) -> dict:
+        """run_backtest 반환 형식 (요약 + 매매 기록)."""
+        n_exits = self.exit_count
+        wins = self.win_count
+        total_pnl = self.total_pnl
+        win_rate = round(wins / n_exits * 100, 2) if n_exits else 0
+        n_bars = self.bars
+        initial = self.initial_capital_usdt
+        final_balance = self.balance
+        growth_pct = round((final_balance - initial) / initial * 100, 2) if initial else 0
+
+        result_summary = {
+            "initial_capital_usdt": initial,
+            "final_balance_usdt": round(final_balance, 2),
+            "growth_pct": growth_pct,
+            "symbol": symbol,
+            "tf": tf,
+            "source": source,
+            "adaptive_filter": "ON",
+            "intrabar_tf": intrabar_tf,
+            "bars": n_bars,
+            "bars_used": n_bars - self.start_idx,
+            "trades_count": n_exits,
+            "wins": wins,
+            "losses": n_exits - wins,
+            "win_rate_pct": win_rate,
+            "total_pnl_pct": round(total_pnl, 2),
+            "avg_pnl_per_trade_pct": round(total_pnl / n_exits, 2) if n_exits else 0,
+        }
+
+        return {
+            "result": result_summary,
+            "symbol": symbol,
+            "tf": tf,
+            "source": source,
+            "bars": n_bars,
+            "start_idx": self.start_idx,
+            "trades_count": n_exits,
+            "wins": wins,
+            "losses": n_exits - wins,
+            "win_rate_pct": win_rate,
+            "total_pnl_pct": round(total_pnl, 2),
+            "params": self.params,
+            "trades": self.trades,
+            "trades_last_20": list(self.recent_trades),
+        }
+
+
+def run_backtest(
+    symbol: str,
+    tf: str,
+    limit: int | None = 500,
+    source: str = "binance",
+    initial_capital_usdt: float = 1000.0,
+    adx_min: float | None = None,
+    entry_len: int | None = None,
+    exit_len: int | None = None,
+    cooldown_bars: int | None = None,
+    slippage_bps: float = 0,
+    fee_bps: float = 0,
+    intrabar_tf: str | None = None,
+    max_gap_bps: float = 50,
+    stream: bool = False,
+    chunk_size: int = 10000,
+    file_path: str | None = None,
+    intrabar_file: str | None = None,
+    cache_dir: str | None = None,
+    cache_max_bytes: int = backtest_cache.DEFAULT_MAX_BYTES,
+    checkpoint_path: str | None = None,
+    trade_sink: Callable[[dict], None] | None = None,
+) -> dict:
+    """
+    source: "binance" | "db" | "file"
+    - binance: fetch_klines(symbol, tf, limit) — 마감된 봉만 (진행 중인 마지막 봉 제외)
+    - db: load_klines_from_db(symbol, tf, limit) — btc4h 등 TABLE_MAP에 등록된 테이블 사용.
+    - file: load_klines_from_file(file_path, limit) — .bin(mmap 컬럼형) / .csv / .parquet. DB·네트워크 불필요.
+    intrabar_tf: "1m" | "15m" 등 — 같은 source에서 하위 TF 캔들을 로드해 스탑 체결을 봉 중 순서대로 판정.
+      체결가는 스탑가(갭 시 하위 봉 시가, max_gap_bps로 상한). None이면 기존 min(stop, close) 방식.
+      source="file"이면 하위 TF 캔들은 intrabar_file에서 읽음.
+    stream: True면 캔들을 리스트로 올리지 않고 DB 서버사이드 커서/파일(chunk_size씩)에서 바로 엔진에 흘림.
+      전체 trades 대신 요약 + trades_last_20만 반환 (피크 메모리 일정). intrabar_tf와 함께 사용 불가.
+    cache_dir: 지정 시 결과 캐시 사용 (backtest_cache). 캔들 로드 후 내용 digest로 키를 만들어 적중하면 엔진 실행 생략.
+      stream 모드, checkpoint_path, trade_sink 사용 시에는 캐시하지 않음.
+    checkpoint_path: 파일이 있으면 엔진 상태를 복원해 마지막 봉 이후 새 봉만 로드·처리하고, 끝나면 상태를 다시 저장.
+      (params/자금/비용 설정이 체크포인트와 다르면 에러. 재개 시 limit은 새로 읽는 봉 수 상한)
+    trade_sink: 매매 1건마다 호출 (실행 중 파일로 흘려 쓰기용). 이때 엔진은 전체 trades를 메모리에 쌓지 않음
+      (stream과 같이 요약 + trades_last_20만 반환, 전체 매매는 싱크 쪽 파일에서 읽음).
+    """
+    params = backtest_params(adx_min, entry_len, exit_len, cooldown_bars)
+    engine = BacktestEngine(
+        params,
+        initial_capital_usdt=initial_capital_usdt,
+        slippage_bps=slippage_bps,
+        fee_bps=fee_bps,
+        max_gap_bps=max_gap_bps,
+        keep_trades=not stream and trade_sink is None,
+    )
+    if stream and intrabar_tf:
+        return {"error": "stream 모드는 intrabar_tf를 지원하지 않음"}
+
+    resume_from: int | None = None
+    if checkpoint_path:
+        try:
+            engine = _resume_engine(checkpoint_path, engine, symbol, tf, intrabar_tf)
+        except (OSError, ValueError, KeyError) as e:
+            return {"error": f"체크포인트 로드 실패: {e}"}
+        resume_from = engine.last_open_time
+    if trade_sink is not None and engine.keep_trades:
+        engine.keep_trades, engine.trades = False, []  # 이전 매매는 이어쓰는 trade log에 있음
+    engine.on_trade = trade_sink
+
+    if stream:
+        start_time = resume_from + 1 if resume_from is not None else None
+        try:
+            for bar in _iter_source(symbol, tf, limit, source, chunk_size, file_path, start_time):
+                engine.step(bar)
+        except Exception as e:
+            return {"error": f"캔들 로드 실패: {e}"}
+        if engine.bars < 250:
+            return {"error": f"캔들 부족: {engine.bars}개 (최소 250 필요)"}
+        if checkpoint_path:
+            _save_checkpoint(checkpoint_path, engine, symbol, tf, intrabar_tf)
+        return engine.result(symbol, tf, source)
+
+    if resume_from is not None:
+        # 체크포인트 이후 봉만 (리스트로 올려도 새 봉 수만큼)
+        try:
+            klines = list(_iter_source(symbol, tf, limit, source, chunk_size, file_path, resume_from + 1))
+        except Exception as e:
+            return {"error": f"캔들 로드 실패: {e}"}
+    # 캔들 소스 모듈은 필요한 것만 import (db_klines → app.database → sqlalchemy/MariaDB 설정)
+    elif source == "db":
+        from app.services.db_klines import load_klines_from_db
+        try:
+            klines = load_klines_from_db(symbol, tf, limit=limit)
+        except Exception as e:
+            return {"error": f"DB 로드 실패: {e}"}
+    elif source == "file":
+        from app.services.file_klines import load_klines_from_file
+        try:
+            klines = load_klines_from_file(file_path, limit=limit)
+        except Exception as e:
+            return {"error": f"파일 로드 실패: {e}"}
+    else:
+        from app.services.binance_client import fetch_klines
+        klines = _closed_only(fetch_klines(symbol, tf, limit=limit or 500), tf)
+
+    if engine.bars + len(klines) < 250:
+        return {"error": f"캔들 부족: {engine.bars + len(klines)}개 (최소 250 필요)"}
+
+    if intrabar_tf and klines:
+        engine.intrabar_base = engine.bars
+        try:
+            engine.intrabar = _load_intrabar(
+                symbol, tf, intrabar_tf, klines, max(0, engine.start_idx - engine.bars), source, intrabar_file
+            )
+        except Exception as e:
+            return {"error": f"하위 TF({intrabar_tf}) 로드 실패: {e}"}
+
+    key = None
+    if cache_dir and not checkpoint_path and trade_sink is None:
+        key = backtest_cache.cache_key(
+            engine_version=ENGINE_VERSION,
+            symbol=symbol,
+            tf=tf,
+            klines=backtest_cache.klines_digest(klines),
+            intrabar_tf=intrabar_tf,
+            intrabar=_intrabar_digest(engine.intrabar),
+            max_gap_bps=max_gap_bps if intrabar_tf else None,
+            params=params,
+            initial_capital_usdt=initial_capital_usdt,
+            slippage_bps=slippage_bps,
+            fee_bps=fee_bps,
+        )
+        cached = backtest_cache.get(cache_dir, key)
+        if cached is not None:
+            # 키는 소스 무관 (같은 캔들이면 db/file 결과 공유) → 소스 표기만 이번 실행 기준
+            return {**cached, "source": source, "result": {**cached["result"], "source": source}}
+
+    for bar in klines:
+        engine.step(bar)
+    result = engine.result(symbol, tf, source, intrabar_tf)
+    if checkpoint_path and klines:
+        _save_checkpoint(checkpoint_path, engine, symbol, tf, intrabar_tf)
+    if key:
+        try:
+            backtest_cache.put(cache_dir, key, result, cache_max_bytes)
+        except OSError as e:
+            print(f"결과 캐시 저장 실패 (무시): {e}", file=sys.stderr)
+    return result
+
+
+def _checkpoint_meta(engine: BacktestEngine, symbol: str, tf: str, intrabar_tf: str | None) -> dict:
+    return {"symbol": symbol.upper(), "tf": tf, "intrabar_tf": intrabar_tf, **engine.settings()}
+
+
+def _resume_engine(
+    path: str,
+    engine: BacktestEngine,
+    symbol: str,
+    tf: str,
+    intrabar_tf: str | None,
+) -> BacktestEngine:
+    """체크포인트가 있으면 복원한 엔진, 없으면 새 엔진 그대로. 실행 설정이 다르면 ValueError."""
+    if not os.path.exists(path):
+        return engine
+    with open(path, encoding="utf-8") as f:
+        cp = json.load(f)
+    expected = json.dumps(_checkpoint_meta(engine, symbol, tf, intrabar_tf), sort_keys=True)
+    if json.dumps(cp["meta"], sort_keys=True) != expected:
+        raise ValueError(f"{path}의 심볼/TF/params/비용 설정이 현재 실행과 다름 (파일 삭제 후 처음부터 실행)")
+    restored = BacktestEngine.from_checkpoint(cp["engine"])
+    return restored
+
+
+def _save_checkpoint(path: str, engine: BacktestEngine, symbol: str, tf: str, intrabar_tf: str | None) -> None:
+    """임시 파일에 쓴 뒤 rename (중간에 죽어도 이전 체크포인트 유지)."""
+    cp = {"meta": _checkpoint_meta(engine, symbol, tf, intrabar_tf), "engine": engine.checkpoint()}
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cp, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _intrabar_digest(intrabar: IntrabarIndex | None) -> str | None:
+    if intrabar is None:
+        return None
+    return backtest_cache.arrays_digest(intrabar.open_time, intrabar.o, intrabar.h, intrabar.l, intrabar.starts, intrabar.ends)
+
+
+def _closed_only(klines: list[dict], tf: str) -> list[dict]:
+    """Binance 응답 끝의 진행 중인 봉 제외. 미완성 봉이 엔진·체크포인트에 들어가면 재개 때 그 봉의 확정값을 다시 안 읽음."""
+    now_ms = int(time.time() * 1000)
+    bar_ms = tf_to_ms(tf)
+    while klines and int(klines[-1]["open_time"]) + bar_ms - 1 > now_ms:
+        klines = klines[:-1]
+    return klines
+
+
+def _iter_source(
+    symbol: str,
+    tf: str,
+    limit: int | None,
+    source: str,
+    chunk_size: int,
+    file_path: str | None = None,
+    start_time: int | None = None,
+):
+    """
+    stream/재개용 캔들 이터레이터. db는 서버사이드 커서, file은 순차 읽기, binance는 API 한도(1500) 내 조회분.
+    start_time: 이 openTime 이상 봉만 (체크포인트 재개 시 마지막 봉 다음부터).
+    """
+    if source in ("db", "file"):
+        if source == "db":
+            from app.services.db_klines import iter_klines_from_db
+            rows = iter_klines_from_db(symbol, tf, start_time=start_time, chunk_size=chunk_size)
+        else:
+            from app.services.file_klines import iter_klines_from_file
+            rows = iter_klines_from_file(file_path, start_time=start_time, chunk_size=chunk_size)
+        return islice(rows, limit) if limit else rows
+    from app.services.binance_client import fetch_klines
+    rows = _closed_only(fetch_klines(symbol, tf, limit=limit or 500), tf)
+    return iter([k for k in rows if k["open_time"] >= start_time] if start_time is not None else rows)
+
+
+def _load_intrabar(
+    symbol: str,
+    tf: str,
+    intrabar_tf: str,
+    klines: list[dict],
+    start_idx: int,
+    source: str,
+    intrabar_file: str | None = None,
+) -> IntrabarIndex:
+    """백테스트 구간(start_idx 이후) 상위 봉 아래 하위 TF 캔들을 스트리밍으로 읽어 인덱스 생성."""
+    bar_ms = tf_to_ms(tf)
+    if tf_to_ms(intrabar_tf) >= bar_ms:
+        raise ValueError(f"intrabar_tf({intrabar_tf})는 {tf}보다 짧아야 함")
+    start_time = klines[start_idx]["open_time"] if start_idx < len(klines) else klines[-1]["open_time"]
+    end_time = klines[-1]["open_time"] + bar_ms
+    if source == "db":
+        from app.services.db_klines import iter_klines_from_db
+        rows = iter_klines_from_db(symbol, intrabar_tf, start_time=start_time, end_time=end_time)
+    elif source == "file":
+        from app.services.file_klines import iter_klines_from_file
+        if not intrabar_file:
+            raise ValueError("source=file이면 intrabar_file 필요")
+        rows = iter_klines_from_file(intrabar_file, start_time=start_time, end_time=end_time)
+    else:
+        from app.services.binance_client import iter_klines_range
+        rows = iter_klines_range(symbol, intrabar_tf, start_time, end_time)
+    return IntrabarIndex((k["open_time"] for k in klines), bar_ms, rows)
+
+
+def _strip_ext(path: str) -> str:
+    """trades.jsonl.gz → trades"""
+    for ext in (".gz", ".jsonl", ".tbt"):
+        if path.endswith(ext):
+            path = path[: -len(ext)]
+    return path
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Backtest strategy (Binance API 또는 DB btc4h)")
+    parser = argparse.ArgumentParser(description="Backtest strategy (Binance API, DB btc4h 또는 로컬 캔들 파일)")
     parser.add_argument("symbol", default="BTCUSDT", nargs="?", help="Symbol (default: BTCUSDT)")
     parser.add_argument("tf", default="4h", nargs="?", help="Timeframe (default: 4h)")
-    parser.add_argument("--source", choices=("binance", "db"), default="binance", help="캔들 출처: binance API 또는 db(btc4h 등)")
+    parser.add_argument("--source", choices=("binance", "db", "file"), default="binance", help="캔들 출처: binance API, db(btc4h 등) 또는 file(--file)")
+    parser.add_argument("--file", type=str, default=None, help="source=file일 때 캔들 파일 경로 (.bin / .csv / .parquet)")
+    parser.add_argument("--intrabar-file", type=str, default=None, help="source=file + --intrabar-tf일 때 하위 TF 캔들 파일 경로")
     parser.add_argument("--limit", type=int, default=None, help="캔들 개수 (db일 때 None=전체, binance 기본 500)")
-    parser.add_argument("--output", "-o", type=str, default=None, help="매매 기록 전체를 저장할 JSON 파일 경로")
+    out = parser.add_mutually_exclusive_group()
+    out.add_argument("--output", "-o", type=str, default=None, help="매매 기록 전체를 저장할 JSON 파일 경로")
+    out.add_argument("--trades-out", type=str, default=None, help="매매 기록 스트리밍 파일 (.jsonl / .tbt, 뒤에 .gz 가능)")
+    parser.add_argument("--summary-out", type=str, default=None, help="--trades-out 사용 시 요약 JSON 경로 (기본: <trades-out>_summary.json)")
     parser.add_argument("--capital", type=float, default=1000, help="시작 자금 USDT (기본 1000)")
     parser.add_argument("--adx-min", type=float, default=None, help="ADX minimum")
     parser.add_argument("--entry-len", type=int, default=None, help="Donchian entry length")
@@ -255,24 +624,58 @@ def main():
     parser.add_argument("--cooldown-bars", type=int, default=None, help="청산 후 N봉 대기 (실전과 동일, 기본 params)")
     parser.add_argument("--slippage-bps", type=float, default=0, help="Slippage bps (e.g. 10 = 0.1%%)")
     parser.add_argument("--fee-bps", type=float, default=5, help="Fee one-way bps (e.g. 5 = 0.05%%)")
+    parser.add_argument("--intrabar-tf", type=str, default=None, help="하위 TF(1m/15m)로 봉 중 스탑 체결 시뮬레이션 (같은 source에서 로드)")
+    parser.add_argument("--stream", action="store_true", help="캔들을 리스트로 올리지 않고 청크 스트리밍 (trades는 최근 20건만 유지)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="stream 모드 DB 커서 청크 크기 (기본 10000)")
+    parser.add_argument("--max-gap-bps", type=float, default=50, help="intrabar 갭 체결 시 스탑가 대비 최대 불리폭 bps (기본 50)")
+    parser.add_argument("--cache-dir", type=str, default=".backtest_cache", help="결과 캐시 디렉터리 (기본 .backtest_cache)")
+    parser.add_argument("--cache-max-mb", type=float, default=256, help="결과 캐시 최대 용량 MB (초과 시 오래 안 쓴 것부터 삭제)")
+    parser.add_argument("--no-cache", action="store_true", help="결과 캐시 사용 안 함")
+    parser.add_argument("--checkpoint", type=str, default=None, help="엔진 상태 파일: 있으면 이어서 새 봉만 처리, 실행 후 갱신")
     args = parser.parse_args()
 
     if args.source == "binance" and args.limit is None:
         args.limit = 500
+    if args.source == "file" and not args.file:
+        parser.error("--source file 에는 --file 경로가 필요합니다")
 
-    result = run_backtest(
-        args.symbol,
-        args.tf,
-        limit=args.limit,
-        source=args.source,
-        initial_capital_usdt=args.capital,
-        adx_min=args.adx_min,
-        entry_len=args.entry_len,
-        exit_len=args.exit_len,
-        cooldown_bars=args.cooldown_bars,
-        slippage_bps=args.slippage_bps,
-        fee_bps=args.fee_bps,
-    )
+    writer = None
+    if args.trades_out:
+        from app.services.trade_log import open_trade_writer
+        # 체크포인트에서 이어가는 실행이면 기존 매매 기록 뒤에 이어씀
+        append = bool(args.checkpoint and os.path.exists(args.checkpoint))
+        try:
+            writer = open_trade_writer(args.trades_out, append=append)
+        except ValueError as e:
+            parser.error(str(e))
+
+    try:
+        result = run_backtest(
+            args.symbol,
+            args.tf,
+            limit=args.limit,
+            source=args.source,
+            initial_capital_usdt=args.capital,
+            adx_min=args.adx_min,
+            entry_len=args.entry_len,
+            exit_len=args.exit_len,
+            cooldown_bars=args.cooldown_bars,
+            slippage_bps=args.slippage_bps,
+            fee_bps=args.fee_bps,
+            intrabar_tf=args.intrabar_tf,
+            max_gap_bps=args.max_gap_bps,
+            stream=args.stream,
+            chunk_size=args.chunk_size,
+            file_path=args.file,
+            intrabar_file=args.intrabar_file,
+            cache_dir=None if args.no_cache else args.cache_dir,
+            cache_max_bytes=int(args.cache_max_mb * 1024 * 1024),
+            checkpoint_path=args.checkpoint,
+            trade_sink=writer.write if writer else None,
+        )
+    finally:
+        if writer:
+            writer.close()
     if "error" in result:
         print(result["error"], file=sys.stderr)
         sys.exit(1)
@@ -286,6 +689,12 @@ def main():
         with open(result_path, "w", encoding="utf-8") as f:
             json.dump(result["result"], f, ensure_ascii=False, indent=2)
         print(f"결과 요약 저장: {result_path}")
+    if writer:
+        from app.services.trade_log import write_summary
+        summary_path = args.summary_out or _strip_ext(args.trades_out) + "_summary.json"
+        write_summary(summary_path, result)
+        print(f"매매 기록 {writer.count}건 저장: {args.trades_out}")
+        print(f"결과 요약 저장: {summary_path}")
 
     r = result["result"]
     print("========== 백테스트 결과 ==========")
@@ -0,0 +1,412 @@
+"""
+벤치마크 하네스 (오프라인, DB/네트워크 불필요).
+- 각 벤치는 여러 번 실행해 최솟값(best-of-N)을 기록. ops>1인 벤치는 1건당 초 (출력에 ops/s 병기).
+- 캔들은 고정 시드 합성 ETH 4h 캔들 (synthetic_klines). DB는 sqlite 메모리, 거래소는 stub.
+- --baseline JSON과 비교해 threshold(기본 25%) 이상 느려지면 종료 코드 1.
+- --update: 현재 결과로 baseline 갱신.
+
+벤치:
+  import_backtest          새 프로세스에서 import app.backtest (DB 모듈이 끌려오면 실패)
+  compute_all              A봇 지표 (500봉)
+  bot_b_indicators         B봇 지표 (500봉)
+  c_bot_indicators         C봇 지표 (500봉)
+  run_backtest             ETH 4h 5000봉 전체 백테스트 (file 소스, 캐시 없음)
+  process_one_event        worker 이벤트 1건 (fetch_klines stub + sqlite). 먼저 REST/kline WS 경로 지표 일치 확인
+  webhook_tv               POST /webhook/tv 1건 (TestClient + sqlite)
+  order_path               execute_entry + execute_exit 1회 왕복 (로컬 fake_binance 서버, 지연 0)
+
+실행:
+  python -m app.bench                      # 전체 실행 + bench_baseline.json과 비교
+  python -m app.bench --only import_backtest
+  python -m app.bench --update             # baseline 갱신
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Callable
+from unittest import mock
+
+DEFAULT_BASELINE = "bench_baseline.json"
+BAR_4H_MS = 4 * 3600 * 1000
+
+# name → (fn, repeat, ops). fn은 ops건 실행 소요 초를 반환 (준비 작업은 측정에서 제외하기 위해 직접 측정).
+BENCHES: dict[str, tuple[Callable[[], float], int, int]] = {}
+# name → 회귀로 보지 않는 절대 차이(ms). 프로세스 기동처럼 노이즈가 큰 벤치만 지정
+NOISE_MS: dict[str, float] = {}
+
+
+def bench(name: str, repeat: int = 5, ops: int = 1, noise_ms: float = 0.0):
+    def deco(fn: Callable[[], float]) -> Callable[[], float]:
+        BENCHES[name] = (fn, repeat, ops)
+        if noise_ms:
+            NOISE_MS[name] = noise_ms
+        return fn
+    return deco
+
+
+def synthetic_klines(n: int, seed: int = 7, bar_ms: int = BAR_4H_MS, price: float = 2000.0) -> list[dict]:
+    """고정 시드 랜덤워크 캔들 (300봉마다 상승/하락 추세 전환 → 진입/청산이 골고루 발생)."""
+    rnd = random.Random(seed)
+    t = 1_600_000_000_000 // bar_ms * bar_ms
+    out = []
+    for i in range(n):
+        o = price
+        c = o * (1 + rnd.gauss(0, 0.012) + 0.002 * ((i // 300) % 2 * 2 - 1))
+        h = max(o, c) * (1 + abs(rnd.gauss(0, 0.005)))
+        l = min(o, c) * (1 - abs(rnd.gauss(0, 0.005)))
+        out.append({"open_time": t, "o": o, "h": h, "l": l, "c": c, "v": rnd.random() * 100, "close_time": t + bar_ms - 1})
+        price = c
+        t += bar_ms
+    return out
+
+
+def _sqlite_sessionmaker():
+    """모델 테이블을 만든 sqlite 메모리 DB 세션 팩토리 (연결 1개 공유)."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app import models  # noqa: F401
+    from app.database import Base
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+# 백테스트 CLI가 import만으로 sqlalchemy/DB 설정을 끌어오지 않는지 함께 확인
+_IMPORT_SNIPPET = """
+import sys, time
+t0 = time.perf_counter()
+import app.backtest
+dt = time.perf_counter() - t0
+heavy = [m for m in ("sqlalchemy", "pymysql", "app.database", "requests") if m in sys.modules]
+print(dt)
+print(",".join(heavy))
+"""
+
+
+@bench("import_backtest", repeat=5, noise_ms=10)
+def bench_import_backtest() -> float:
+    """새 프로세스에서 import app.backtest (DATABASE_URL을 MySQL이 아닌 값으로 둬도 성공해야 함)."""
+    env = dict(os.environ, DATABASE_URL="sqlite://", PYTHONDONTWRITEBYTECODE="1")
+    out = subprocess.run(
+        [sys.executable, "-c", _IMPORT_SNIPPET],
+        capture_output=True, text=True, env=env, check=True,
+    ).stdout.splitlines()
+    heavy = out[1] if len(out) > 1 else ""
+    if heavy:
+        raise RuntimeError(f"import app.backtest가 무거운 모듈을 로드함: {heavy}")
+    return float(out[0])
+
+
+def _timed(fn: Callable, *args, **kwargs) -> float:
+    t0 = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - t0
+
+
+@bench("compute_all", repeat=20)
+def bench_compute_all() -> float:
+    from app.services.indicators import compute_all
+    return _timed(compute_all, synthetic_klines(500))
+
+
+@bench("bot_b_indicators", repeat=20)
+def bench_bot_b_indicators() -> float:
+    from app.services.bot_b_indicators import compute_bot_b_indicators
+    return _timed(compute_bot_b_indicators, synthetic_klines(500))
+
+
+@bench("c_bot_indicators", repeat=20)
+def bench_c_bot_indicators() -> float:
+    from app.services.c_bot_indicators import compute_c_bot_indicators
+    return _timed(compute_c_bot_indicators, synthetic_klines(500))
+
+
+@bench("run_backtest", repeat=3)
+def bench_run_backtest() -> float:
+    from app.backtest import run_backtest
+    from app.services.file_klines import write_klines_bin
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "eth4h.bin")
+        write_klines_bin(path, synthetic_klines(5000), "ETHUSDT", "4h")
+        t0 = time.perf_counter()
+        result = run_backtest("ETHUSDT", "4h", limit=None, source="file", file_path=path, fee_bps=5)
+        dt = time.perf_counter() - t0
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return dt
+
+
+_EVENTS = 20
+
+
+@bench("process_one_event", repeat=5, ops=_EVENTS)
+def bench_process_one_event() -> float:
+    """거래소(fetch_klines)는 합성 캔들 stub, 주문 경로는 trade disabled (주문 API 호출 없음)."""
+    from app import worker
+    from app.models import Event
+
+    klines = synthetic_klines(2000)
+    Session = _sqlite_sessionmaker()
+    db = Session()
+    limit_cache: dict[int, list[dict]] = {}
+    pos = {"i": 300}
+
+    def fake_fetch_klines(symbol, tf, limit=500, **kwargs):
+        # Binance REST처럼 끝에 진행 중인 봉(pos["i"])까지
+        window = limit_cache.get(pos["i"])
+        if window is None:
+            window = limit_cache[pos["i"]] = klines[max(0, pos["i"] + 1 - limit) : pos["i"] + 1]
+        return window
+
+    patches = (
+        mock.patch.object(worker, "fetch_klines", fake_fetch_klines),
+        mock.patch.object(worker, "notify_signal", lambda *a, **k: None),
+        mock.patch("app.services.execution.get_trade_enabled", lambda: False),
+        mock.patch.object(worker.shadow, "submit", lambda *a, **k: None),  # 백그라운드 → 별도 bench (shadow_sets)
+    )
+    for p in patches:
+        p.start()
+    try:
+        _check_kline_paths(worker, db, klines)
+        events = []
+        for j in range(_EVENTS):
+            k = klines[300 + j * 50]
+            ev = Event(symbol="ETHUSDT", tf="4h", close_time=k["close_time"], dedup_key=f"bench_{j}", raw={}, status="pending")
+            db.add(ev)
+            events.append(ev)
+        db.commit()
+        total = 0.0
+        for j, ev in enumerate(events):
+            pos["i"] = 301 + j * 50
+            total += _timed(worker.process_one_event, db, ev)
+        return total
+    finally:
+        for p in patches:
+            p.stop()
+        db.close()
+
+
+def _check_kline_paths(worker, db, klines: list[dict]) -> None:
+    """같은 봉 마감을 REST(진행 중 봉 포함 응답)와 kline WS(candles) 경로로 처리하면 지표 스냅샷이 같아야 함."""
+    from app.models import Candle, Event, Signal
+    from app.services import kline_stream
+
+    # Binance 응답처럼 틱 단위 가격 (candles DECIMAL 저장 후에도 같은 값)
+    bars = [{**k, "o": round(k["o"], 2), "h": round(k["h"], 2), "l": round(k["l"], 2), "c": round(k["c"], 2),
+             "v": round(k["v"], 3)} for k in klines[700:1002]]
+    for k in bars[:-1]:
+        kline_stream.save_candle(db, "ETHUSDT", "4h", k)
+    close_time = bars[-2]["close_time"]
+    rest = Event(symbol="ETHUSDT", tf="4h", close_time=close_time, dedup_key="check_rest", raw={}, status="pending")
+    ws = Event(symbol="ETHUSDT", tf="4h", close_time=close_time, dedup_key="check_ws",
+               raw={"source": kline_stream.SOURCE}, status="pending")
+    db.add_all([rest, ws])
+    db.commit()
+    with mock.patch.object(worker, "fetch_klines", side_effect=RuntimeError("WS path must not call REST")):
+        worker.process_one_event(db, ws)
+    with mock.patch.object(worker, "fetch_klines", lambda symbol, tf, limit=500, **kw: bars[-limit:]):
+        worker.process_one_event(db, rest)
+    rows = db.query(Signal).filter(Signal.close_time == close_time).order_by(Signal.id).all()
+    snaps = [r.indicators_snapshot for r in rows]
+    if ws.status != "processed" or rest.status != "processed" or len(snaps) != 2 or snaps[0] != snaps[1]:
+        raise RuntimeError(f"REST and kline WS paths disagree for close {close_time}: {snaps}")
+    db.query(Signal).delete()
+    db.query(Candle).delete()
+    db.commit()
+
+
+_SHADOW_BARS = 50
+
+
+@bench("shadow_sets", repeat=3, ops=_SHADOW_BARS)
+def bench_shadow_sets() -> float:
+    """후보 8세트 (지표 그룹 2개: entry_len 20/30) × 50봉. 실전 지표 재사용 포함, 봉당 시간."""
+    from app.models import ParamSet
+    from app.services import shadow
+    from app.services.indicators import compute_all
+    from app.services.params import DEFAULT_PARAMS
+
+    klines = synthetic_klines(300 + _SHADOW_BARS)
+    Session = _sqlite_sessionmaker()
+    db = Session()
+    for j in range(8):
+        db.add(ParamSet(name=f"shadow:b{j}", json={"adx_min": 12 + j * 2, "entry_len": 20 if j % 2 else 30}, active=False))
+    db.commit()
+    bar_ms = BAR_4H_MS
+    total = 0.0
+    for i in range(300, 300 + _SHADOW_BARS):
+        window = klines[i - 260 : i + 1]
+        live = compute_all(window, exit_len=DEFAULT_PARAMS["exit_len"])
+        total += _timed(
+            shadow.evaluate_shadow_sets, db, "ETHUSDT", "4h", klines[i]["close_time"], bar_ms, window,
+            live_key=shadow.indicator_key(DEFAULT_PARAMS), live_indicators=live,
+        )
+    db.close()
+    return total
+
+
+_REQUESTS = 200
+
+
+@bench("webhook_tv", repeat=5, ops=_REQUESTS)
+def bench_webhook_tv() -> float:
+    """POST /webhook/tv (신규 이벤트 queued 경로). get_db는 sqlite 메모리 세션으로 override."""
+    from fastapi.testclient import TestClient
+    from app.database import get_db
+    from app.main import app
+
+    Session = _sqlite_sessionmaker()
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    settings = SimpleNamespace(webhook_secret="bench", webhook_dedup_cache_size=4096)
+    try:
+        with mock.patch("app.services.ingest.get_settings", lambda: settings):
+            client = TestClient(app)
+            t0 = time.perf_counter()
+            for i in range(_REQUESTS):
+                r = client.post(
+                    "/webhook/tv",
+                    json={"symbol": "ETHUSDT", "tf": "4h", "event": "CANDLE_CLOSED", "time": 1_700_000_000_000 + i * BAR_4H_MS, "secret": "bench"},
+                )
+                if r.status_code != 200:
+                    raise RuntimeError(f"webhook {r.status_code}: {r.text}")
+            return time.perf_counter() - t0
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+
+_ROUND_TRIPS = 10
+
+
+@bench("order_path", repeat=3, ops=_ROUND_TRIPS)
+def bench_order_path() -> float:
+    """진입(계정·마크가·필터·레버리지·MARKET·STOP_MARKET) + 청산(positionRisk·reduceOnly MARKET) HTTP 경로 전체."""
+    from app.config import get_settings
+    from app.fake_binance import running
+    from app.services import binance_client, execution
+    from app.services.admin_state import MODE_LIVE, set_mode
+    from app.services.indicators import compute_all
+    from app.services.params import DEFAULT_PARAMS
+
+    Session = _sqlite_sessionmaker()
+    db = Session()
+    set_mode(db, MODE_LIVE)
+    with running() as (base_url, _):
+        settings = get_settings().model_copy(
+            update={"binance_base_url": base_url, "binance_api_key": "bench", "binance_api_secret": "bench"}
+        )
+        with mock.patch.object(binance_client, "get_settings", lambda: settings), \
+                mock.patch.object(execution, "get_settings", lambda: settings), \
+                mock.patch.object(execution, "get_trade_enabled", lambda: True), \
+                mock.patch.object(execution, "notify_order", lambda *a, **k: None):
+            indicators = compute_all(binance_client.fetch_klines("ETHUSDT", "4h", limit=300))
+            params = dict(DEFAULT_PARAMS)
+            t0 = time.perf_counter()
+            for _ in range(_ROUND_TRIPS):
+                if not execution.execute_entry(db, "ETHUSDT", "LONG", indicators, params):
+                    raise RuntimeError("execute_entry failed against fake_binance")
+                ok, _ = execution.execute_exit(db, "ETHUSDT", "LONG")
+                if not ok:
+                    raise RuntimeError("execute_exit failed against fake_binance")
+            dt = time.perf_counter() - t0
+    db.close()
+    return dt
+
+
+def run(names: list[str] | None = None) -> dict[str, float]:
+    results = {}
+    for name, (fn, repeat, ops) in BENCHES.items():
+        if names and name not in names:
+            continue
+        results[name] = min(fn() for _ in range(repeat)) / ops
+        line = f"{name:<28} {results[name] * 1000:10.3f} ms"
+        if ops > 1:
+            line += f"  ({1 / results[name]:,.0f} ops/s)"
+        print(line)
+    return results
+
+
+def compare(
+    results: dict[str, float],
+    baseline: dict[str, float],
+    threshold: float,
+    min_delta_ms: float = 0.0,
+) -> list[str]:
+    """
+    baseline 대비 (1 + threshold)배 넘게 느려진 벤치 목록.
+    max(min_delta_ms, 벤치별 NOISE_MS) 미만의 절대 차이는 측정 노이즈로 무시.
+    """
+    regressions = []
+    for name, sec in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = sec / base
+        if ratio > 1 + threshold and (sec - base) * 1000 >= max(min_delta_ms, NOISE_MS.get(name, 0.0)):
+            regressions.append(f"{name}: {base * 1000:.2f} ms → {sec * 1000:.2f} ms (x{ratio:.2f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="성능 벤치마크 (오프라인)")
+    parser.add_argument("--only", nargs="*", help="실행할 벤치 이름 (기본: 전체)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON 경로")
+    parser.add_argument("--threshold", type=float, default=0.25, help="허용 회귀 비율 (0.25 = 25%% 느려짐까지 허용)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.0, help="이보다 작은 절대 차이(ms)는 회귀로 보지 않음 (전 벤치 공통)")
+    parser.add_argument("--update", action="store_true", help="현재 결과로 baseline 갱신")
+    parser.add_argument("--list", action="store_true", help="벤치 이름만 출력")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHES))
+        return
+    unknown = [n for n in args.only or [] if n not in BENCHES]
+    if unknown:
+        parser.error(f"알 수 없는 벤치: {', '.join(unknown)}")
+
+    # worker/httpx/execution 로그가 측정 시간·출력에 섞이지 않게 (실패는 예외로 드러남)
+    logging.disable(logging.WARNING)
+    results = run(args.only)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if args.update:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline 갱신: {args.baseline}")
+        return
+    if not baseline:
+        print(f"baseline 없음 ({args.baseline}) → --update로 생성")
+        return
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"회귀 (> {args.threshold:.0%}):")
+        for line in regressions:
+            print("  " + line)
+        sys.exit(1)
+    print("OK (회귀 없음)")
+
+
+if __name__ == "__main__":
+    main()
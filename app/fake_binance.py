@@ -0,0 +1,866 @@
+"""
+로컬 Binance USDT-M Futures 대역 서버 (부하·지연·재시도 테스트용, 네트워크 불필요).
+BINANCE_BASE_URL=http://127.0.0.1:9090 으로 두면 binance_client/execution/worker/대시보드가 그대로 붙음.
+
+구현 엔드포인트:
+  GET  /fapi/v1/klines, /fapi/v1/exchangeInfo, /fapi/v1/premiumIndex, /fapi/v1/time
+  GET  /fapi/v2/account, /fapi/v2/positionRisk, /fapi/v1/openOrders
+  GET/DELETE /fapi/v1/order (orderId 또는 origClientOrderId)
+  POST /fapi/v1/leverage, /fapi/v1/marginType, /fapi/v1/order, /fapi/v1/batchOrders
+  POST/PUT/DELETE /fapi/v1/listenKey, WS /ws/{listenKey} (user data stream: ORDER_TRADE_UPDATE,
+  ACCOUNT_UPDATE, listenKeyExpired). 구독자가 있으면 스트림이 주기적으로 스탑을 판정해 체결을 바로 push.
+  WS /stream?streams=ethusdt@kline_4h/... (combined kline stream: 진행 중 봉 x=false, 봉 경계 넘으면 마감 봉 x=true)
+- 가격: 심볼별 결정적 함수 (사인파 합 + 분 단위 해시 노이즈) → 같은 구간은 항상 같은 캔들, TF 간에도 일관.
+- 주문: MARKET은 마크가 ± slippage_bps로 즉시 체결(수수료 fee_bps), STOP_MARKET은 미체결로 보관했다가
+  요청 시마다 마크가가 스탑을 넘으면 체결. 포지션·잔고는 메모리 (one-way 모드).
+- 장애 주입 (CLI 또는 POST /_fake/config):
+  latency_ms / jitter_ms   모든 응답 지연
+  error_rate / error_kinds 확률적으로 503, -1001(DISCONNECTED), -1021(timestamp), 429 응답,
+                           lost(주문은 처리하고 응답만 503 -1007 → 결과 불명 재현, POST /fapi/v1/order만)
+  weight_limit             1분 가중치 한도. 초과 시 429 + Retry-After (응답마다 X-MBX-USED-WEIGHT-1M 헤더)
+  clock_skew_ms            서버 시각 오프셋 (timestamp/recvWindow 검사에 반영 → -1021 재현)
+- 보조: GET /_fake/state, POST /_fake/reset, POST /_fake/price {"symbol","price"} (마크가 고정, null이면 해제),
+  POST /_fake/expire_listen_keys (listenKeyExpired 재현),
+  POST /_fake/kline_replay {"symbol","interval","start_time","count"} (과거 마감 봉을 kline 스트림으로 즉시 재생),
+  POST /_fake/drop_streams (kline 스트림 연결 끊기 → 재연결·갭 백필 재현)
+
+실행:
+  python -m app.fake_binance --port 9090 --latency-ms 30 --jitter-ms 20 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import parse_qsl
+
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import JSONResponse
+
+from app.services.intrabar import tf_to_ms
+
+BASE_PRICE = {"ETHUSDT": 2500.0, "BTCUSDT": 60000.0}
+SYMBOL_FILTERS = {
+    "ETHUSDT": {"tick": "0.01", "step": "0.001", "min_notional": "20"},
+    "BTCUSDT": {"tick": "0.10", "step": "0.001", "min_notional": "100"},
+}
+
+# path → 요청 가중치 (klines는 limit에 따라 별도 계산)
+WEIGHTS = {
+    "/fapi/v1/exchangeInfo": 1,
+    "/fapi/v1/premiumIndex": 1,
+    "/fapi/v1/time": 1,
+    "/fapi/v2/account": 5,
+    "/fapi/v2/positionRisk": 5,
+    "/fapi/v1/openOrders": 1,
+    "/fapi/v1/order": 1,
+    "/fapi/v1/batchOrders": 5,
+    "/fapi/v1/leverage": 1,
+    "/fapi/v1/marginType": 1,
+    "/fapi/v1/listenKey": 1,
+}
+SIGNED_PATHS = {
+    "/fapi/v2/account",
+    "/fapi/v2/positionRisk",
+    "/fapi/v1/openOrders",
+    "/fapi/v1/order",
+    "/fapi/v1/batchOrders",
+    "/fapi/v1/leverage",
+    "/fapi/v1/marginType",
+}
+
+DEFAULT_CONFIG = {
+    "latency_ms": 0.0,
+    "jitter_ms": 0.0,
+    "error_rate": 0.0,
+    "error_kinds": ["503", "-1001"],
+    "weight_limit": 2400,
+    "clock_skew_ms": 0,
+    "slippage_bps": 0.0,
+    "fee_bps": 4.0,
+    "initial_balance": 10000.0,
+    "listen_key_ttl_ms": 60 * 60 * 1000,
+}
+STREAM_TICK_S = 0.25  # user data stream 구독 중 스탑 판정 주기
+
+
+class BinanceError(Exception):
+    def __init__(self, status: int, code: int, msg: str, headers: dict | None = None):
+        self.status = status
+        self.code = code
+        self.msg = msg
+        self.headers = headers or {}
+
+
+def _noise(symbol: str, minute: int) -> float:
+    return zlib.crc32(f"{symbol}:{minute}".encode()) / 0xFFFFFFFF * 2 - 1
+
+
+def model_price(symbol: str, t_ms: int) -> float:
+    """심볼별 결정적 가격 (시간 연속 + 분 단위 노이즈)."""
+    x = t_ms / 3_600_000
+    base = BASE_PRICE.get(symbol, 100.0)
+    return base * math.exp(
+        0.08 * math.sin(x / 97)
+        + 0.03 * math.sin(x / 13.3 + 1)
+        + 0.01 * math.sin(x / 1.7 + 2)
+        + 0.002 * _noise(symbol, t_ms // 60000)
+    )
+
+
+def kline_message(symbol: str, interval: str, row: list, closed: bool, event_ms: int) -> dict:
+    """REST kline 행 → WS kline 이벤트 (data 부분)."""
+    return {
+        "e": "kline", "E": event_ms, "s": symbol,
+        "k": {
+            "t": row[0], "T": row[6], "s": symbol, "i": interval,
+            "o": row[1], "h": row[2], "l": row[3], "c": row[4], "v": row[5],
+            "n": row[8], "x": closed, "q": row[7], "V": row[9], "Q": row[10],
+        },
+    }
+
+
+def model_kline(symbol: str, open_time: int, bar_ms: int) -> list:
+    """[openTime, o, h, l, c, v, closeTime, quoteVolume, trades, takerBase, takerQuote, ignore] (Binance 형식)."""
+    samples = min(bar_ms // 60000 + 1, 61)
+    step = bar_ms / (samples - 1) if samples > 1 else bar_ms
+    prices = [model_price(symbol, int(open_time + k * step)) for k in range(samples)]
+    o, c = prices[0], prices[-1]
+    h, l = max(prices), min(prices)
+    v = 1000 * (1.5 + _noise(symbol + "v", open_time // 60000)) * bar_ms / 3_600_000
+    return [open_time, f"{o:.2f}", f"{h:.2f}", f"{l:.2f}", f"{c:.2f}", f"{v:.3f}", open_time + bar_ms - 1, f"{v * c:.2f}", int(v), f"{v / 2:.3f}", f"{v * c / 2:.2f}", "0"]
+
+
+class FakeExchange:
+    """메모리 상태: 잔고, 포지션(one-way), 레버리지/마진타입, 미체결 스탑, 가중치 창."""
+
+    def __init__(self, **config):
+        self.config = {**DEFAULT_CONFIG, **config}
+        self.lock = threading.Lock()
+        self.subscribers: dict[str, list] = {}  # listenKey → [(loop, asyncio.Queue)]
+        self.market_subscribers: list = []  # [(streams set, loop, asyncio.Queue)]
+        self.reset()
+
+    def reset(self) -> None:
+        self.balance = float(self.config["initial_balance"])
+        self.positions: dict[str, dict] = {}
+        self.leverage: dict[str, int] = {}
+        self.margin_type: dict[str, str] = {}
+        self.orders: dict[int, dict] = {}
+        self.mark_override: dict[str, float] = {}
+        self.order_ids = itertools.count(1_000_000)
+        self.weight_log: deque = deque()  # (ts_ms, weight)
+        self.request_count = 0
+        self.error_count = 0
+        self.listen_keys: dict[str, int] = {}  # listenKey → 만료 시각 ms
+
+    # ---------- 시각/가격 ----------
+    def now_ms(self) -> int:
+        return int(time.time() * 1000) + int(self.config["clock_skew_ms"])
+
+    def mark_price(self, symbol: str) -> float:
+        if symbol in self.mark_override:
+            return self.mark_override[symbol]
+        return round(model_price(symbol, self.now_ms()), 2)
+
+    # ---------- 가중치 ----------
+    def used_weight(self, now_ms: int) -> int:
+        while self.weight_log and self.weight_log[0][0] <= now_ms - 60_000:
+            self.weight_log.popleft()
+        return sum(w for _, w in self.weight_log)
+
+    def charge(self, weight: int) -> int:
+        """가중치 차감. 한도 초과면 429 BinanceError (Retry-After = 창에서 빠질 때까지 초)."""
+        now = int(time.time() * 1000)
+        used = self.used_weight(now)
+        limit = int(self.config["weight_limit"])
+        if limit and used + weight > limit:
+            retry = max(1, math.ceil((self.weight_log[0][0] + 60_000 - now) / 1000)) if self.weight_log else 1
+            raise BinanceError(
+                429, -1003, f"Too many requests; current limit is {limit} request weight per 1 MINUTE.",
+                {"Retry-After": str(retry), "X-MBX-USED-WEIGHT-1M": str(used)},
+            )
+        self.weight_log.append((now, weight))
+        return used + weight
+
+    # ---------- user data stream ----------
+    def new_listen_key(self) -> str:
+        """Binance처럼 살아 있는 키가 있으면 그대로 반환하고 만료만 연장."""
+        now = self.now_ms()
+        key = next((k for k, exp in self.listen_keys.items() if exp > now), None)
+        key = key or "".join(random.choices("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789", k=64))
+        self.listen_keys[key] = now + int(self.config["listen_key_ttl_ms"])
+        return key
+
+    def keepalive_listen_key(self, key: str) -> None:
+        if self.listen_keys.get(key, 0) <= self.now_ms():
+            raise BinanceError(400, -1125, "This listenKey does not exist.")
+        self.listen_keys[key] = self.now_ms() + int(self.config["listen_key_ttl_ms"])
+
+    def emit(self, event: dict) -> None:
+        """모든 구독 중인 스트림에 이벤트 push (어느 스레드에서 불려도 안전)."""
+        for subs in self.subscribers.values():
+            for loop, queue in list(subs):
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def emit_market(self, stream: str, message: dict | None) -> None:
+        """stream을 구독 중인 kline 스트림에 combined 메시지 push. message=None이면 연결 끊기."""
+        for streams, loop, queue in list(self.market_subscribers):
+            if message is None or stream in streams:
+                loop.call_soon_threadsafe(queue.put_nowait, message and {"stream": stream, "data": message})
+
+    def expire_listen_keys(self) -> None:
+        now = self.now_ms()
+        for key in list(self.listen_keys):
+            self.listen_keys[key] = 0
+            for loop, queue in self.subscribers.get(key, []):
+                loop.call_soon_threadsafe(queue.put_nowait, {"e": "listenKeyExpired", "E": now, "listenKey": key})
+
+    def order_event(self, order: dict, exec_type: str, last_qty: float = 0.0, last_price: float = 0.0, realized: float = 0.0,
+                    triggered: bool = False) -> None:
+        """ORDER_TRADE_UPDATE. triggered: 발동된 스탑 체결 → 실거래소처럼 o=MARKET, ot=원래 타입(STOP_MARKET)."""
+        now = self.now_ms()
+        self.emit({
+            "e": "ORDER_TRADE_UPDATE",
+            "E": now,
+            "T": now,
+            "o": {
+                "s": order["symbol"],
+                "c": order["clientOrderId"],
+                "S": order["side"],
+                "o": "MARKET" if triggered else order["type"],
+                "ot": order["type"],
+                "q": order["origQty"],
+                "p": order["price"],
+                "ap": order["avgPrice"],
+                "sp": order["stopPrice"],
+                "x": exec_type,
+                "X": order["status"],
+                "i": order["orderId"],
+                "l": f"{last_qty:.3f}",
+                "z": order["executedQty"],
+                "L": f"{last_price:.2f}",
+                "T": now,
+                "R": order["reduceOnly"],
+                "rp": f"{realized:.8f}",
+            },
+        })
+
+    def account_event(self, symbol: str, reason: str) -> None:
+        pos = self.position(symbol)
+        mark = self.mark_price(symbol)
+        now = self.now_ms()
+        self.emit({
+            "e": "ACCOUNT_UPDATE",
+            "E": now,
+            "T": now,
+            "a": {
+                "m": reason,
+                "B": [{"a": "USDT", "wb": f"{self.balance:.8f}", "cw": f"{self.balance:.8f}", "bc": "0"}],
+                "P": [{
+                    "s": symbol,
+                    "pa": f"{pos['amt']:.3f}",
+                    "ep": f"{pos['entry']:.2f}",
+                    "up": f"{pos['amt'] * (mark - pos['entry']):.4f}" if pos["amt"] else "0",
+                    "mt": self.margin_type.get(symbol, "cross").lower(),
+                    "ps": "BOTH",
+                }],
+            },
+        })
+
+    # ---------- 포지션/주문 ----------
+    def position(self, symbol: str) -> dict:
+        return self.positions.setdefault(symbol, {"amt": 0.0, "entry": 0.0})
+
+    def fill(self, symbol: str, side: str, qty: float, price: float, reduce_only: bool) -> float:
+        """체결 반영 후 실제 체결 수량 반환 (reduceOnly면 포지션 크기로 제한)."""
+        pos = self.position(symbol)
+        signed = qty if side == "BUY" else -qty
+        if reduce_only:
+            if pos["amt"] == 0 or (pos["amt"] > 0) == (signed > 0):
+                raise BinanceError(400, -2022, "ReduceOnly Order is rejected.")
+            signed = math.copysign(min(abs(signed), abs(pos["amt"])), signed)
+        self.balance -= abs(signed) * price * float(self.config["fee_bps"]) / 10000
+        amt = pos["amt"]
+        if amt == 0 or (amt > 0) == (signed > 0):
+            new_amt = amt + signed
+            pos["entry"] = (abs(amt) * pos["entry"] + abs(signed) * price) / abs(new_amt)
+            pos["amt"] = new_amt
+        else:
+            closed = min(abs(signed), abs(amt))
+            self.balance += closed * (price - pos["entry"]) * (1 if amt > 0 else -1)
+            new_amt = amt + signed
+            if abs(new_amt) < 1e-12:
+                pos["amt"], pos["entry"] = 0.0, 0.0
+            elif (new_amt > 0) != (amt > 0):
+                pos["amt"], pos["entry"] = new_amt, price  # 반대 방향으로 넘어감
+            else:
+                pos["amt"] = new_amt
+        return abs(signed)
+
+    def place_order(self, p: dict) -> dict:
+        symbol = p.get("symbol", "").upper()
+        side = p.get("side", "").upper()
+        order_type = p.get("type", "").upper()
+        if symbol not in SYMBOL_FILTERS:
+            raise BinanceError(400, -1121, "Invalid symbol.")
+        if side not in ("BUY", "SELL"):
+            raise BinanceError(400, -1117, "Invalid side.")
+        try:
+            qty = float(p["quantity"])
+        except (KeyError, ValueError):
+            raise BinanceError(400, -1102, "Mandatory parameter 'quantity' was not sent, was empty/null, or malformed.")
+        reduce_only = str(p.get("reduceOnly", "false")).lower() == "true"
+        client_id = p.get("newClientOrderId") or f"fake-{next(self.order_ids)}"
+        if any(o["clientOrderId"] == client_id for o in self.orders.values()):
+            raise BinanceError(400, -4015, "Client order id is not valid.")
+        order = {
+            "orderId": next(self.order_ids),
+            "symbol": symbol,
+            "status": "NEW",
+            "clientOrderId": client_id,
+            "price": "0",
+            "avgPrice": "0.00",
+            "origQty": f"{qty:.3f}",
+            "executedQty": "0",
+            "cumQuote": "0",
+            "type": order_type,
+            "side": side,
+            "reduceOnly": reduce_only,
+            "stopPrice": "0",
+            "updateTime": self.now_ms(),
+        }
+        if order_type == "MARKET":
+            self._fill_order(order, qty, reduce_only)
+        elif order_type == "STOP_MARKET":
+            try:
+                order["stopPrice"] = f"{float(p['stopPrice']):.2f}"
+            except (KeyError, ValueError):
+                raise BinanceError(400, -1102, "Mandatory parameter 'stopPrice' was not sent, was empty/null, or malformed.")
+            self.order_event(order, "NEW")
+        else:
+            raise BinanceError(400, -1116, "Invalid orderType.")
+        self.orders[order["orderId"]] = order
+        return dict(order)
+
+    def _fill_order(self, order: dict, qty: float, reduce_only: bool, triggered: bool = False) -> None:
+        mark = self.mark_price(order["symbol"])
+        slip = float(self.config["slippage_bps"]) / 10000
+        price = mark * (1 + slip) if order["side"] == "BUY" else mark * (1 - slip)
+        balance_before = self.balance
+        filled = self.fill(order["symbol"], order["side"], qty, price, reduce_only)
+        order.update(
+            status="FILLED",
+            avgPrice=f"{price:.2f}",
+            executedQty=f"{filled:.3f}",
+            cumQuote=f"{filled * price:.2f}",
+            updateTime=self.now_ms(),
+        )
+        fee = filled * price * float(self.config["fee_bps"]) / 10000
+        self.order_event(order, "TRADE", filled, price, self.balance - balance_before + fee, triggered=triggered)
+        self.account_event(order["symbol"], "ORDER")
+
+    def check_stops(self, symbol: str) -> None:
+        """미체결 STOP_MARKET 중 마크가가 스탑을 넘은 것 체결 (reduceOnly인데 포지션 없으면 만료)."""
+        mark = self.mark_price(symbol)
+        for order in self.orders.values():
+            if order["symbol"] != symbol or order["status"] != "NEW" or order["type"] != "STOP_MARKET":
+                continue
+            stop = float(order["stopPrice"])
+            if (order["side"] == "SELL" and mark <= stop) or (order["side"] == "BUY" and mark >= stop):
+                try:
+                    self._fill_order(order, float(order["origQty"]), order["reduceOnly"], triggered=True)
+                except BinanceError:
+                    order.update(status="EXPIRED", updateTime=self.now_ms())
+                    self.order_event(order, "EXPIRED")
+
+    def find_order(self, p: dict) -> dict:
+        if p.get("orderId"):
+            order = self.orders.get(int(p["orderId"]))
+        else:
+            cid = p.get("origClientOrderId")
+            order = next((o for o in self.orders.values() if o["clientOrderId"] == cid), None) if cid else None
+        if order is None or order["symbol"] != p.get("symbol", "").upper():
+            raise BinanceError(400, -2013, "Order does not exist.")
+        return order
+
+    def position_risk(self, symbol: str | None = None) -> list[dict]:
+        out = []
+        for sym in ([symbol] if symbol else sorted(SYMBOL_FILTERS)):
+            pos = self.position(sym)
+            mark = self.mark_price(sym)
+            out.append({
+                "symbol": sym,
+                "positionAmt": f"{pos['amt']:.3f}",
+                "entryPrice": f"{pos['entry']:.2f}",
+                "markPrice": f"{mark:.2f}",
+                "unRealizedProfit": f"{pos['amt'] * (mark - pos['entry']):.4f}" if pos["amt"] else "0.0000",
+                "leverage": str(self.leverage.get(sym, 20)),
+                "marginType": self.margin_type.get(sym, "cross").lower(),
+                "positionSide": "BOTH",
+                "updateTime": self.now_ms(),
+            })
+        return out
+
+    def account(self) -> dict:
+        positions = self.position_risk()
+        upnl = sum(float(p["unRealizedProfit"]) for p in positions)
+        wallet = f"{self.balance:.8f}"
+        return {
+            "totalWalletBalance": wallet,
+            "totalUnrealizedProfit": f"{upnl:.8f}",
+            "availableBalance": wallet,
+            "assets": [{"asset": "USDT", "walletBalance": wallet, "totalWalletBalance": wallet, "unrealizedProfit": f"{upnl:.8f}"}],
+            "positions": positions,
+        }
+
+
+def _kline_weight(limit: int) -> int:
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+async def _params(request: Request) -> dict:
+    """query string + form body (Binance 서명 요청은 POST body에 application/x-www-form-urlencoded)."""
+    params = dict(request.query_params)
+    body = await request.body()
+    if body:
+        params.update(parse_qsl(body.decode()))
+    return params
+
+
+def create_app(exchange: FakeExchange | None = None) -> FastAPI:
+    ex = exchange or FakeExchange()
+    app = FastAPI(title="Fake Binance Futures")
+    app.state.exchange = ex
+
+    @app.middleware("http")
+    async def _inject(request: Request, call_next):
+        path = request.url.path
+        if path.startswith("/_fake"):
+            return await call_next(request)
+        cfg = ex.config
+        delay = float(cfg["latency_ms"]) + random.uniform(0, float(cfg["jitter_ms"]))
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        ex.request_count += 1
+        try:
+            weight = _kline_weight(int(request.query_params.get("limit", 500))) if path == "/fapi/v1/klines" else WEIGHTS.get(path, 1)
+            with ex.lock:
+                used = ex.charge(weight)
+            if cfg["error_rate"] and random.random() < float(cfg["error_rate"]):
+                kind = random.choice(cfg["error_kinds"])
+                if kind == "lost" and path == "/fapi/v1/order" and request.method == "POST":
+                    await _check_signed(request, ex)
+                    await call_next(request)
+                    raise BinanceError(503, -1007, "Timeout waiting for response from backend server. Send status unknown; execution status unknown.")
+                if kind == "503":
+                    raise BinanceError(503, -1001, "Service Unavailable.")
+                if kind == "429":
+                    raise BinanceError(429, -1003, "Too many requests.", {"Retry-After": "1"})
+                if kind == "-1021":
+                    raise BinanceError(400, -1021, "Timestamp for this request is outside of the recvWindow.")
+                raise BinanceError(500, -1001, "Internal error; unable to process your request. Please try again.")
+            if path in SIGNED_PATHS:
+                await _check_signed(request, ex)
+        except BinanceError as e:
+            ex.error_count += 1
+            return JSONResponse({"code": e.code, "msg": e.msg}, status_code=e.status, headers=e.headers)
+        response = await call_next(request)
+        response.headers["X-MBX-USED-WEIGHT-1M"] = str(used)
+        return response
+
+    @app.exception_handler(BinanceError)
+    async def _binance_error(request: Request, e: BinanceError):
+        ex.error_count += 1
+        return JSONResponse({"code": e.code, "msg": e.msg}, status_code=e.status, headers=e.headers)
+
+    # ---------- Public ----------
+    @app.get("/fapi/v1/time")
+    def server_time():
+        return {"serverTime": ex.now_ms()}
+
+    @app.get("/fapi/v1/klines")
+    def klines(symbol: str, interval: str, limit: int = 500, startTime: int | None = None, endTime: int | None = None):
+        bar_ms = tf_to_ms(interval)
+        limit = max(1, min(limit, 1500))
+        now = ex.now_ms()
+        last_open = now // bar_ms * bar_ms
+        if endTime is not None:
+            last_open = min(last_open, endTime // bar_ms * bar_ms)
+        if startTime is not None:
+            first = -(-startTime // bar_ms) * bar_ms
+            opens = range(first, min(last_open, first + (limit - 1) * bar_ms) + 1, bar_ms)
+        else:
+            opens = range(last_open - (limit - 1) * bar_ms, last_open + 1, bar_ms)
+        return [model_kline(symbol.upper(), t, bar_ms) for t in opens]
+
+    @app.get("/fapi/v1/exchangeInfo")
+    def exchange_info(symbol: str | None = None):
+        symbols = []
+        for sym, f in SYMBOL_FILTERS.items():
+            if symbol and symbol.upper() != sym:
+                continue
+            symbols.append({
+                "symbol": sym,
+                "status": "TRADING",
+                "contractType": "PERPETUAL",
+                "baseAsset": sym[:-4],
+                "quoteAsset": "USDT",
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "tickSize": f["tick"], "minPrice": "0.01", "maxPrice": "1000000"},
+                    {"filterType": "LOT_SIZE", "stepSize": f["step"], "minQty": f["step"], "maxQty": "10000"},
+                    {"filterType": "MIN_NOTIONAL", "notional": f["min_notional"]},
+                ],
+            })
+        return {
+            "timezone": "UTC",
+            "serverTime": ex.now_ms(),
+            "rateLimits": [{"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": ex.config["weight_limit"]}],
+            "symbols": symbols,
+        }
+
+    @app.get("/fapi/v1/premiumIndex")
+    def premium_index(symbol: str):
+        symbol = symbol.upper()
+        with ex.lock:
+            ex.check_stops(symbol)
+        mark = ex.mark_price(symbol)
+        return {"symbol": symbol, "markPrice": f"{mark:.2f}", "indexPrice": f"{mark:.2f}", "lastFundingRate": "0.00010000", "time": ex.now_ms()}
+
+    # ---------- Signed ----------
+    @app.get("/fapi/v2/account")
+    async def account(request: Request):
+        with ex.lock:
+            for sym in SYMBOL_FILTERS:
+                ex.check_stops(sym)
+            return ex.account()
+
+    @app.get("/fapi/v2/positionRisk")
+    async def position_risk(request: Request):
+        p = await _params(request)
+        symbol = p.get("symbol", "").upper() or None
+        with ex.lock:
+            for sym in [symbol] if symbol else SYMBOL_FILTERS:
+                ex.check_stops(sym)
+            return ex.position_risk(symbol)
+
+    @app.post("/fapi/v1/leverage")
+    async def leverage(request: Request):
+        p = await _params(request)
+        symbol = p.get("symbol", "").upper()
+        lev = int(p.get("leverage", 0))
+        if not 1 <= lev <= 125:
+            raise BinanceError(400, -4028, "Leverage is not valid.")
+        ex.leverage[symbol] = lev
+        return {"symbol": symbol, "leverage": lev, "maxNotionalValue": "1000000"}
+
+    @app.post("/fapi/v1/marginType")
+    async def margin_type(request: Request):
+        p = await _params(request)
+        symbol = p.get("symbol", "").upper()
+        mt = p.get("marginType", "").upper()
+        if ex.margin_type.get(symbol, "CROSSED") == mt:
+            raise BinanceError(400, -4046, "No need to change margin type.")
+        if ex.position(symbol)["amt"]:
+            raise BinanceError(400, -4048, "Margin type cannot be changed if there exists position.")
+        ex.margin_type[symbol] = mt
+        return {"code": 200, "msg": "success"}
+
+    @app.post("/fapi/v1/order")
+    async def new_order(request: Request):
+        p = await _params(request)
+        with ex.lock:
+            ex.check_stops(p.get("symbol", "").upper())
+            return ex.place_order(p)
+
+    @app.get("/fapi/v1/order")
+    async def query_order(request: Request):
+        p = await _params(request)
+        with ex.lock:
+            ex.check_stops(p.get("symbol", "").upper())
+            return dict(ex.find_order(p))
+
+    @app.delete("/fapi/v1/order")
+    async def cancel_order(request: Request):
+        p = await _params(request)
+        with ex.lock:
+            order = ex.find_order(p)
+            if order["status"] != "NEW":
+                raise BinanceError(400, -2011, "Unknown order sent.")
+            order.update(status="CANCELED", updateTime=ex.now_ms())
+            ex.order_event(order, "CANCELED")
+            return dict(order)
+
+    @app.get("/fapi/v1/openOrders")
+    async def open_orders(request: Request):
+        p = await _params(request)
+        symbol = p.get("symbol", "").upper()
+        with ex.lock:
+            if symbol:
+                ex.check_stops(symbol)
+            return [dict(o) for o in ex.orders.values() if o["status"] == "NEW" and (not symbol or o["symbol"] == symbol)]
+
+    @app.post("/fapi/v1/batchOrders")
+    async def batch_orders(request: Request):
+        """batchOrders=JSON 배열 (최대 5건). 건별 성공/에러를 같은 순서로 반환."""
+        p = await _params(request)
+        try:
+            batch = json.loads(p.get("batchOrders", ""))
+        except ValueError:
+            raise BinanceError(400, -1130, "Data sent for parameter 'batchOrders' is not valid.")
+        if not isinstance(batch, list) or not 1 <= len(batch) <= 5:
+            raise BinanceError(400, -1130, "Data sent for parameter 'batchOrders' is not valid.")
+        out = []
+        with ex.lock:
+            for item in batch:
+                try:
+                    ex.check_stops(str(item.get("symbol", "")).upper())
+                    out.append(ex.place_order({k: str(v) for k, v in item.items()}))
+                except BinanceError as e:
+                    out.append({"code": e.code, "msg": e.msg})
+        return out
+
+    # ---------- User data stream ----------
+    @app.post("/fapi/v1/listenKey")
+    def listen_key_new(request: Request):
+        _check_api_key(request)
+        with ex.lock:
+            return {"listenKey": ex.new_listen_key()}
+
+    @app.put("/fapi/v1/listenKey")
+    def listen_key_keepalive(request: Request):
+        _check_api_key(request)
+        with ex.lock:
+            key = next((k for k, exp in ex.listen_keys.items() if exp > ex.now_ms()), None)
+            if key is None:
+                raise BinanceError(400, -1125, "This listenKey does not exist.")
+            ex.keepalive_listen_key(key)
+        return {}
+
+    @app.delete("/fapi/v1/listenKey")
+    def listen_key_close(request: Request):
+        _check_api_key(request)
+        with ex.lock:
+            ex.listen_keys.clear()
+        return {}
+
+    @app.websocket("/ws/{listen_key}")
+    async def user_stream(ws: WebSocket, listen_key: str):
+        if ex.listen_keys.get(listen_key, 0) <= ex.now_ms():
+            await ws.close(code=4001)
+            return
+        await ws.accept()
+        sub = (asyncio.get_running_loop(), asyncio.Queue())
+        ex.subscribers.setdefault(listen_key, []).append(sub)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub[1].get(), timeout=STREAM_TICK_S)
+                except asyncio.TimeoutError:
+                    with ex.lock:
+                        for sym in SYMBOL_FILTERS:
+                            ex.check_stops(sym)
+                    continue
+                await ws.send_text(json.dumps(event))
+                if event.get("e") == "listenKeyExpired":
+                    await ws.close()
+                    return
+        except Exception:
+            pass  # 클라이언트 종료
+        finally:
+            ex.subscribers[listen_key].remove(sub)
+
+    @app.websocket("/stream")
+    async def market_stream(ws: WebSocket):
+        streams = {s for s in ws.query_params.get("streams", "").split("/") if "@kline_" in s}
+        await ws.accept()
+        loop, queue = asyncio.get_running_loop(), asyncio.Queue()
+        sub = (streams, loop, queue)
+        ex.market_subscribers.append(sub)
+        # stream → 마지막으로 보낸 봉 openTime (경계 넘으면 그 봉을 x=true로 한 번 보냄)
+        current = {s: None for s in streams}
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=STREAM_TICK_S)
+                except asyncio.TimeoutError:
+                    now = ex.now_ms()
+                    for stream, last_open in current.items():
+                        sym, interval = stream.split("@kline_")
+                        bar_ms = tf_to_ms(interval)
+                        open_time = now // bar_ms * bar_ms
+                        if last_open is not None and open_time > last_open:
+                            row = model_kline(sym.upper(), last_open, bar_ms)
+                            await ws.send_text(json.dumps({"stream": stream, "data": kline_message(sym.upper(), interval, row, True, now)}))
+                        current[stream] = open_time
+                        row = model_kline(sym.upper(), open_time, bar_ms)
+                        await ws.send_text(json.dumps({"stream": stream, "data": kline_message(sym.upper(), interval, row, False, now)}))
+                    continue
+                if message is None:
+                    await ws.close()
+                    return
+                await ws.send_text(json.dumps(message))
+        except Exception:
+            pass  # 클라이언트 종료
+        finally:
+            ex.market_subscribers.remove(sub)
+
+    # ---------- 제어 ----------
+    @app.get("/_fake/state")
+    def state():
+        return {
+            "config": ex.config,
+            "balance": ex.balance,
+            "positions": ex.positions,
+            "open_orders": [o for o in ex.orders.values() if o["status"] == "NEW"],
+            "orders": len(ex.orders),
+            "requests": ex.request_count,
+            "errors": ex.error_count,
+            "used_weight_1m": ex.used_weight(int(time.time() * 1000)),
+        }
+
+    @app.post("/_fake/config")
+    async def set_config(request: Request):
+        updates = await request.json()
+        unknown = set(updates) - set(DEFAULT_CONFIG)
+        if unknown:
+            return JSONResponse({"error": f"unknown keys: {sorted(unknown)}"}, status_code=400)
+        ex.config.update(updates)
+        return ex.config
+
+    @app.post("/_fake/reset")
+    def reset():
+        with ex.lock:
+            ex.reset()
+        return {"ok": True}
+
+    @app.post("/_fake/expire_listen_keys")
+    def expire_listen_keys():
+        with ex.lock:
+            ex.expire_listen_keys()
+        return {"ok": True}
+
+    @app.post("/_fake/kline_replay")
+    async def kline_replay(request: Request):
+        body = await request.json()
+        symbol, interval = body["symbol"].upper(), body["interval"]
+        bar_ms = tf_to_ms(interval)
+        first = int(body["start_time"]) // bar_ms * bar_ms
+        stream = f"{symbol.lower()}@kline_{interval}"
+        for i in range(int(body.get("count", 1))):
+            row = model_kline(symbol, first + i * bar_ms, bar_ms)
+            ex.emit_market(stream, kline_message(symbol, interval, row, True, ex.now_ms()))
+        return {"ok": True, "stream": stream, "subscribers": sum(stream in s[0] for s in ex.market_subscribers)}
+
+    @app.post("/_fake/drop_streams")
+    def drop_streams():
+        ex.emit_market("", None)
+        return {"ok": True}
+
+    @app.post("/_fake/price")
+    async def set_price(request: Request):
+        body = await request.json()
+        symbol = body["symbol"].upper()
+        if body.get("price") is None:
+            ex.mark_override.pop(symbol, None)
+        else:
+            ex.mark_override[symbol] = float(body["price"])
+        with ex.lock:
+            ex.check_stops(symbol)
+        return {"symbol": symbol, "markPrice": ex.mark_price(symbol)}
+
+    return app
+
+
+def _check_api_key(request: Request) -> None:
+    if not request.headers.get("X-MBX-APIKEY"):
+        raise BinanceError(401, -2015, "Invalid API-key, IP, or permissions for action.")
+
+
+async def _check_signed(request: Request, ex: FakeExchange) -> None:
+    """서명 요청 형식 검사 (서명 값 자체는 검증하지 않음) + timestamp/recvWindow."""
+    _check_api_key(request)
+    p = await _params(request)
+    if "signature" not in p or "timestamp" not in p:
+        raise BinanceError(400, -1102, "Mandatory parameter 'signature' or 'timestamp' was not sent.")
+    ts = int(p["timestamp"])
+    recv_window = int(p.get("recvWindow", 5000))
+    now = ex.now_ms()
+    if ts > now + 1000 or now - ts > recv_window:
+        raise BinanceError(400, -1021, "Timestamp for this request is outside of the recvWindow.")
+
+
+@contextmanager
+def running(host: str = "127.0.0.1", port: int = 0, **config):
+    """
+    백그라운드 스레드로 서버 기동 (벤치/스크립트용). with running(latency_ms=20) as (base_url, exchange): ...
+    port=0이면 빈 포트 자동 선택. user data stream WS 주소는 base_url의 http → ws.
+    """
+    import socket
+    import uvicorn
+
+    if not port:
+        with socket.socket() as s:
+            s.bind((host, 0))
+            port = s.getsockname()[1]
+    exchange = FakeExchange(**config)
+    server = uvicorn.Server(uvicorn.Config(create_app(exchange), host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError("fake binance server failed to start")
+        time.sleep(0.01)
+    try:
+        yield f"http://{host}:{port}", exchange
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="로컬 Binance USDT-M Futures 대역 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9090)
+    parser.add_argument("--latency-ms", type=float, default=0, help="응답 지연 (ms)")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="추가 지연 0~N ms 균등분포")
+    parser.add_argument("--error-rate", type=float, default=0, help="에러 응답 확률 (0~1)")
+    parser.add_argument("--error-kinds", default="503,-1001", help="주입할 에러 종류 (503,-1001,-1021,429,lost)")
+    parser.add_argument("--weight-limit", type=int, default=2400, help="1분 요청 가중치 한도 (0=무제한)")
+    parser.add_argument("--clock-skew-ms", type=int, default=0, help="서버 시각 오프셋 (ms)")
+    parser.add_argument("--slippage-bps", type=float, default=0, help="MARKET 체결 슬리피지 bps")
+    parser.add_argument("--fee-bps", type=float, default=4, help="체결 수수료 bps")
+    parser.add_argument("--balance", type=float, default=10000, help="시작 USDT 잔고")
+    args = parser.parse_args()
+
+    exchange = FakeExchange(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_kinds=[k.strip() for k in args.error_kinds.split(",") if k.strip()],
+        weight_limit=args.weight_limit,
+        clock_skew_ms=args.clock_skew_ms,
+        slippage_bps=args.slippage_bps,
+        fee_bps=args.fee_bps,
+        initial_balance=args.balance,
+    )
+    uvicorn.run(create_app(exchange), host=args.host, port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
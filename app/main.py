@@ -1,15 +1,26 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse
-from app.database import init_db
+from app.database import SessionLocal, init_db
+from app.services.admin_state import ensure_mode
+from app.services import binance_async, live_state, time_sync, webhook_wal
 from app.routers import webhook, params, trade, dashboard, dashboard_b, admin_c_bot, admin_unified
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    db = SessionLocal()
+    try:
+        ensure_mode(db)  # 모드 미설정(업그레이드 직후)이면 trade_enabled 기준으로 기록
+    finally:
+        db.close()
+    time_sync.start()  # 관리자 청산 등 서명 요청용 서버 시각 오프셋
+    webhook_wal.start()  # webhook_wal_enabled면 남은 로그 재생 + flusher
     yield
-    # shutdown if needed
+    webhook_wal.stop()
+    await live_state.hub.close()  # 열린 SSE 스트림 종료
+    await binance_async.aclose()
 
 
 app = FastAPI(title="TradeBot", lifespan=lifespan)
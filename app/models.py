@@ -5,7 +5,7 @@ Python에서는 snake_case 속성으로 접근하고 DB 컬럼은 name= 으로 c
 import time
 from sqlalchemy import (
     String, Integer, BigInteger, Boolean, Text, JSON,
-    UniqueConstraint, Column, Numeric,
+    UniqueConstraint, Column, Numeric, Index,
 )
 from app.database import Base
 
@@ -19,6 +19,8 @@ class Event(Base):
     __tablename__ = "events"
     __table_args__ = (
         UniqueConstraint("dedupKey", name="uk_events_dedup"),
+        Index("ix_events_status_close", "status", "closeTime"),  # migration 006
+        Index("ix_events_symbol_tf_status_close", "symbol", "tf", "status", "closeTime"),
         {"mysql_charset": "utf8mb4"},
     )
 
@@ -102,12 +104,14 @@ class Order(Base):
     symbol = Column(String(20), nullable=False)
     tf = Column(String(10))
     order_id = Column(BigInteger, name="orderId")
+    client_order_id = Column(String(36), name="clientOrderId", index=True)  # tb-{event_id}-{leg} (migration 004)
     type = Column(String(32), nullable=False)
     side = Column(String(8), nullable=False)
     qty = Column(Numeric(28, 8), nullable=False)
     price = Column(Numeric(20, 8))
     status = Column(String(32), nullable=False)
     raw = Column(JSON, name="raw")
+    mode = Column(String(8), nullable=False, default="LIVE")  # LIVE | PAPER (migration 002)
     created_at = Column(BigInteger, name="createdAt", nullable=False)
 
     def __init__(self, **kwargs):
@@ -135,6 +139,7 @@ class Position(Base):
     size = Column(Numeric(28, 8), nullable=False)
     entry_price = Column(Numeric(20, 8), name="entryPrice", nullable=False)
     stop_price = Column(Numeric(20, 8), name="stopPrice")  # 고정 스탑 (진입 시 1회 설정)
+    mode = Column(String(8), nullable=False, default="LIVE")  # LIVE | PAPER (migration 002)
     updated_at = Column(BigInteger, name="updatedAt", nullable=False)
 
     def __init__(self, **kwargs):
@@ -143,6 +148,60 @@ class Position(Base):
         super().__init__(**kwargs)
 
 
+# ---------- shadow_signals (후보 파라미터 세트 가상 신호·PnL, app/services/shadow.py) ----------
+class ShadowSignal(Base):
+    __tablename__ = "shadow_signals"
+    __table_args__ = (
+        UniqueConstraint("paramSetId", "symbol", "tf", "closeTime", name="uk_shadow_set_symbol_tf_close"),
+        {"mysql_charset": "utf8mb4"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    param_set_id = Column(Integer, name="paramSetId", nullable=False)
+    name = Column(String(64), nullable=False)
+    symbol = Column(String(20), nullable=False)
+    tf = Column(String(10), nullable=False)
+    close_time = Column(BigInteger, name="closeTime", nullable=False)
+    action = Column(String(32), nullable=False)
+    price = Column(Numeric(20, 8))
+    pnl_pct = Column(Numeric(12, 6), name="pnlPct")  # 청산 봉에만 (수수료·슬리피지 차감)
+    # 이 봉 처리 후 가상 포지션 상태 (다음 봉 평가 입력)
+    position_side = Column(String(8), name="positionSide")
+    entry_price = Column(Numeric(20, 8), name="entryPrice")
+    stop_price = Column(Numeric(20, 8), name="stopPrice")
+    created_at = Column(BigInteger, name="createdAt", nullable=False)
+
+    def __init__(self, **kwargs):
+        if "created_at" not in kwargs and "createdAt" not in kwargs:
+            kwargs["created_at"] = _epoch_ms()
+        super().__init__(**kwargs)
+
+
+# ---------- bar_indicators (봉별 봇 지표·레짐·체크 스냅샷, worker가 기록, app/services/bar_indicators.py) ----------
+class BarIndicator(Base):
+    __tablename__ = "bar_indicators"
+    __table_args__ = (
+        UniqueConstraint("symbol", "tf", "closeTime", name="uk_bar_indicators_symbol_tf_close"),
+        {"mysql_charset": "utf8mb4"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    symbol = Column(String(20), nullable=False)
+    tf = Column(String(10), nullable=False)
+    close_time = Column(BigInteger, name="closeTime", nullable=False)
+    regime = Column(String(16))  # B봇 기준 ADX 레짐 (RANGE/NEUTRAL/TREND)
+    a = Column(JSON)  # A봇 compute_all (worker 지표)
+    b = Column(JSON)  # B봇 compute_bot_b_indicators
+    c = Column(JSON)  # C봇 compute_c_bot_indicators
+    checks = Column(JSON)  # B봇 long/short 체크 (리스크·쿨다운 제외한 지표 조건)
+    created_at = Column(BigInteger, name="createdAt", nullable=False)
+
+    def __init__(self, **kwargs):
+        if "created_at" not in kwargs and "createdAt" not in kwargs:
+            kwargs["created_at"] = _epoch_ms()
+        super().__init__(**kwargs)
+
+
 # ---------- app_settings (킬스위치 등, 프로젝트용) ----------
 class AppSetting(Base):
     __tablename__ = "app_settings"
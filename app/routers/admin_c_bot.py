@@ -1,7 +1,11 @@
 """
 C봇 v1.1 API: 상태 스냅샷, 풀 스냅샷(지표 포함), evaluate(캔들 마감 시), 관리자 페이지.
+캔들을 조회하는 evaluate/full은 async (binance_async), DB 작업은 스레드풀.
+full의 지표는 worker가 기록한 bar_indicators 최신 행이 있으면 그대로, 없으면 캔들로 계산.
+full 응답은 상태 버전 기준 캐시 + ETag/304 (app/services/response_cache.py).
 """
-from fastapi import APIRouter, Depends, Query, Body
+from fastapi import APIRouter, Depends, Query, Body, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
@@ -10,7 +14,9 @@ from app.database import get_db
 from app.services.c_bot import get_snapshot, evaluate
 from app.services.c_bot_thresholds import get_thresholds
 from app.services.c_bot_indicators import compute_c_bot_indicators
-from app.services.binance_client import fetch_klines
+from app.services.binance_async import fetch_klines
+from app.services.rate_limit import PRIORITY_UI
+from app.services import bar_indicators, response_cache
 
 router = APIRouter(prefix="/admin/c-bot", tags=["admin-c-bot"])
 
@@ -24,7 +30,7 @@ class EvaluateBody(BaseModel):
 
 
 @router.post("/evaluate")
-def c_bot_evaluate(db: Session = Depends(get_db), body: EvaluateBody = Body(default=None)):
+async def c_bot_evaluate(db: Session = Depends(get_db), body: EvaluateBody = Body(default=None)):
     """
     캔들 마감 시 호출. ohlcv는 Binance에서 조회 후 evaluate() 실행.
     """
@@ -34,7 +40,7 @@ def c_bot_evaluate(db: Session = Depends(get_db), body: EvaluateBody = Body(defa
     account_state = body.account_state or {}
     bot_states = body.bot_states or {}
     try:
-        klines = fetch_klines(symbol, tf, limit=200)
+        klines = await fetch_klines(symbol, tf, limit=200, priority=PRIORITY_UI)
     except Exception as e:
         return {"ok": False, "error": str(e)}
     if not klines:
@@ -42,7 +48,8 @@ def c_bot_evaluate(db: Session = Depends(get_db), body: EvaluateBody = Body(defa
     bar_ms = 4 * 3600 * 1000 if tf.lower() == "4h" else 3600 * 1000
     last_open = klines[-1]["open_time"]
     now_candle_time = body.now_candle_time or (last_open + bar_ms - 1)
-    result = evaluate(
+    result = await run_in_threadpool(
+        evaluate,
         db,
         tf=tf,
         symbol=symbol,
@@ -61,24 +68,37 @@ def c_bot_state(db: Session = Depends(get_db)):
 
 
 @router.get("/full")
-def c_bot_full(
+async def c_bot_full(
+    request: Request,
     db: Session = Depends(get_db),
     symbol: str = Query("BTCUSDT"),
     tf: str = Query("4h"),
 ):
     """
     관리자용 풀 스냅샷: 저장된 state + 현재 캔들 기준 지표 + 임계값.
-    (evaluate 호출은 하지 않음; 최신 지표 표시용)
+    (evaluate 호출은 하지 않음; 최신 지표 표시용). 상태 버전 기준 캐시 + ETag/304, 직접 계산한 지표는 live TTL.
     """
-    state = get_snapshot(db)
-    th = get_thresholds(symbol, tf)
+    return await response_cache.cached_json(
+        request, db,
+        lambda: _full_snapshot(db, symbol, tf),
+        is_live=lambda d: d["indicators_source"] == "live",
+    )
+
+
+async def _full_snapshot(db: Session, symbol: str, tf: str) -> dict:
+    state, row, th = await run_in_threadpool(
+        lambda: (get_snapshot(db), bar_indicators.latest(db, symbol, tf), get_thresholds(symbol, tf))
+    )
     indicators = {}
-    try:
-        klines = fetch_klines(symbol, tf, limit=200)
-        if klines:
-            indicators = compute_c_bot_indicators(klines)
-    except Exception:
-        pass
+    if row is not None:
+        indicators = row.c or {}
+    else:
+        try:
+            klines = await fetch_klines(symbol, tf, limit=200, priority=PRIORITY_UI)
+            if klines:
+                indicators = await run_in_threadpool(compute_c_bot_indicators, klines)  # CPU: 이벤트 루프(SSE 허브) 막지 않게
+        except Exception:
+            pass
     return {
         **state,
         "symbol": symbol,
@@ -91,6 +111,7 @@ def c_bot_full(
             "ema_slope_pct": indicators.get("ema_slope_pct"),
         },
         "threshold_profile": th,
+        "indicators_source": "worker" if row is not None else "live",
     }
 
 
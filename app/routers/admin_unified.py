@@ -3,13 +3,21 @@ Unified 관리자 대시보드 (ETH 단일 보수형).
 - GET /admin/state       : 관리자 UI용 상태 JSON (controls/meta/botA/botB/position/bot_opinions)
 - GET /admin/unified     : 단일 HTML 페이지 (Top Banner, Action Bar, Cards, Reporter, Timeline 골조)
 - POST /admin/control/...: Run/Pause, New Entry, Emergency, Mode, Leverage, Risk, Close Position 제어
+- GET /admin/reconcile   : DB↔거래소 대사 마지막 사이클 요약 (drift 건수, 가중치)
+- GET /admin/time-sync   : Binance 서버 시각 오프셋·RTT·drift (이 API 프로세스 기준)
+- GET /admin/rate-limit  : Binance 요청 가중치 사용량·우선순위별 허용/대기/shed, klines 캐시 적중 (이 API 프로세스 기준)
+- GET /admin/webhook-wal : 웹훅 선기록 append/flush/insert 건수, 미반영 바이트 (WAL 꺼져 있으면 enabled=false)
+- GET /admin/live        : 대시보드 SSE 허브 지문 조회·재계산·전송 수, 토픽별 구독자, JSON 응답 캐시 hits/304/misses (이 API 프로세스 기준)
+페이지는 /dashboard/stream?topic=admin 구독. 제어 POST는 커밋 후 허브에 알려 바로 push
 """
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.services.admin_state import (
+    fetch_meta_klines,
     get_unified_admin_state,
     set_run_state,
     set_new_entry,
@@ -17,8 +25,15 @@ from app.services.admin_state import (
     set_mode,
     set_leverage,
     set_risk_text,
+    MODES,
+    MODE_PAPER,
 )
 from app.services.execution import execute_exit
+from app.services.reconcile import get_metrics as get_reconcile_metrics
+from app.services.time_sync import clock
+from app.services import bar_indicators, live_state, response_cache, webhook_wal
+from app.services.rate_limit import limiter
+from app.services.binance_client import kline_cache_stats
 from app.models import Position
 
 
@@ -26,9 +41,55 @@ router = APIRouter(prefix="/admin", tags=["admin-unified"])
 
 
 @router.get("/state")
-def admin_state(db: Session = Depends(get_db)):
-    """ETH 단일 관리자 대시보드용 상태 JSON."""
-    return get_unified_admin_state(db)
+async def admin_state(request: Request, db: Session = Depends(get_db)):
+    """ETH 단일 관리자 대시보드용 상태 JSON. 상태 버전 기준 캐시 + ETag (If-None-Match 같으면 304), 직접 계산한 meta 지표는 live TTL."""
+    return await response_cache.cached_json(
+        request, db,
+        lambda: _admin_state(db),
+        is_live=lambda d: d["meta"]["indicators_source"] == "live",
+    )
+
+
+async def _admin_state(db: Session) -> dict:
+    """worker 지표 스냅샷이 없을 때만 캔들을 async로 받고, DB 조회는 스레드풀."""
+    klines = None
+    if await run_in_threadpool(bar_indicators.latest, db, "ETHUSDT", "4h") is None:
+        klines = await fetch_meta_klines()
+    return await run_in_threadpool(get_unified_admin_state, db, klines)
+
+
+live_state.hub.register("admin", _admin_state)
+
+
+@router.get("/reconcile")
+def admin_reconcile(db: Session = Depends(get_db)):
+    """대사 지표: at(ms), ms(소요), w(가중치), d(이번 drift 종류별), n(누적 사이클), t(누적 drift)."""
+    return {"reconcile": get_reconcile_metrics(db)}
+
+
+@router.get("/time-sync")
+def admin_time_sync():
+    """서버 시각 동기화 상태: offset_ms, rtt_ms, drift_ms(직전 측정 대비), recv_window_ms 등."""
+    return clock.state()
+
+
+@router.get("/rate-limit")
+def admin_rate_limit():
+    """가중치 제한 상태: used_weight_1m(헤더 보정), 우선순위별 상한·허용·대기·shed 건수, 429/418 백오프, klines 캐시(hits/shared/misses)."""
+    return {**limiter.state(), "kline_cache": dict(kline_cache_stats)}
+
+
+@router.get("/webhook-wal")
+def admin_webhook_wal():
+    """웹훅 WAL: appended, flushed(반영한 줄), inserted(새 이벤트), flush_errors, skipped_lines, pending_bytes."""
+    wal = webhook_wal.wal
+    return {"enabled": wal is not None, **(wal.state() if wal is not None else {})}
+
+
+@router.get("/live")
+def admin_live():
+    """SSE 허브: polls(지문 조회), changes, builds(토픽 재계산), sent(메시지), resyncs(느린 뷰어 snapshot 대체), topics. response_cache: 응답 캐시."""
+    return {**live_state.hub.state(), "response_cache": response_cache.state()}
 
 
 @router.post("/control/run")
@@ -39,6 +100,7 @@ def admin_control_run(db: Session = Depends(get_db), body: dict = Body(...)):
     running = run_state.upper() == "RUNNING"
     set_run_state(db, running, reason)
     db.commit()
+    live_state.hub.notify()
     return {"ok": True}
 
 
@@ -49,6 +111,7 @@ def admin_control_new_entry(db: Session = Depends(get_db), body: dict = Body(...
     reason = (body or {}).get("reason")
     set_new_entry(db, enabled, reason)
     db.commit()
+    live_state.hub.notify()
     return {"ok": True}
 
 
@@ -62,16 +125,20 @@ def admin_control_emergency(db: Session = Depends(get_db), body: dict = Body(...
         # 비상 모드에서는 즉시 거래 중지
         set_run_state(db, False, reason or "Emergency Stop")
     db.commit()
+    live_state.hub.notify()
     return {"ok": True}
 
 
 @router.post("/control/mode")
 def admin_control_mode(db: Session = Depends(get_db), body: dict = Body(...)):
     """Mode (BACKTEST/PAPER/LIVE) 설정."""
-    mode = (body or {}).get("mode", "PAPER")
+    mode = str((body or {}).get("mode", MODE_PAPER)).upper()
+    if mode not in MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(MODES)}")
     reason = (body or {}).get("reason")
-    set_mode(db, str(mode).upper(), reason)
+    set_mode(db, mode, reason)
     db.commit()
+    live_state.hub.notify()
     return {"ok": True}
 
 
@@ -82,6 +149,7 @@ def admin_control_leverage(db: Session = Depends(get_db), body: dict = Body(...)
     reason = (body or {}).get("reason")
     set_leverage(db, leverage, reason)
     db.commit()
+    live_state.hub.notify()
     return {"ok": True}
 
 
@@ -92,6 +160,7 @@ def admin_control_risk(db: Session = Depends(get_db), body: dict = Body(...)):
     reason = (body or {}).get("reason")
     set_risk_text(db, risk_text, reason)
     db.commit()
+    live_state.hub.notify()
     return {"ok": True}
 
 
@@ -115,6 +184,7 @@ def admin_control_close_position(db: Session = Depends(get_db), body: dict = Bod
         # last_control_action에 반영
         set_risk_text(db, text[:200], None)
         db.commit()
+        live_state.hub.notify()
         return {"ok": True}
     return {"ok": False, "error": "Exit failed"}
 
@@ -371,6 +441,7 @@ def _html() -> str:
     </section>
   </main>
 
+  <script src="/dashboard/live.js"></script>
   <script>
     let LAST_STATE = null;
 
@@ -546,7 +617,7 @@ def _html() -> str:
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ run_state: 'RUNNING' })
-      }).then(() => fetchState().then(updateUI));
+      }).then(afterControl);
     });
 
     document.getElementById('btn-pause').addEventListener('click', () => {
@@ -556,7 +627,7 @@ def _html() -> str:
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ run_state: 'PAUSED', reason })
-      }).then(() => fetchState().then(updateUI));
+      }).then(afterControl);
     });
 
     document.getElementById('btn-new-entry').addEventListener('click', () => {
@@ -570,7 +641,7 @@ def _html() -> str:
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ enabled: next, reason })
-      }).then(() => fetchState().then(updateUI));
+      }).then(afterControl);
     });
 
     document.getElementById('btn-emergency').addEventListener('click', () => {
@@ -583,7 +654,7 @@ def _html() -> str:
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
           body: JSON.stringify({ active: true, reason })
-        }).then(() => fetchState().then(updateUI));
+        }).then(afterControl);
       } else {
         if (!confirm('Emergency Stop을 해제하시겠습니까?')) return;
         const reason = prompt('Emergency 해제 사유를 입력하세요 (선택):') || null;
@@ -591,7 +662,7 @@ def _html() -> str:
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
           body: JSON.stringify({ active: false, reason })
-        }).then(() => fetchState().then(updateUI));
+        }).then(afterControl);
       }
     });
 
@@ -610,7 +681,7 @@ def _html() -> str:
         if (!res.ok) {
           alert('종료 실패: ' + (res.error || 'unknown error'));
         }
-        fetchState().then(updateUI);
+        afterControl();
       });
     });
 
@@ -622,7 +693,7 @@ def _html() -> str:
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ mode: next })
-      }).then(() => fetchState().then(updateUI));
+      }).then(afterControl);
     });
 
     document.getElementById('btn-leverage').addEventListener('click', () => {
@@ -633,7 +704,7 @@ def _html() -> str:
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ value })
-      }).then(() => fetchState().then(updateUI));
+      }).then(afterControl);
     });
 
     document.getElementById('btn-risk').addEventListener('click', () => {
@@ -644,13 +715,21 @@ def _html() -> str:
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ value })
-      }).then(() => fetchState().then(updateUI));
+      }).then(afterControl);
     });
 
-    // 초기 로드
-    fetchState().then(updateUI).catch(() => {
-      document.getElementById('report-text').textContent = '상태 정보를 불러오지 못했습니다.';
-    });
+    // 초기 로드 + 이후 변경은 push (EventSource 없으면 30초 폴링)
+    function loadState() {
+      fetchState().then(updateUI).catch(() => {
+        document.getElementById('report-text').textContent = '상태 정보를 불러오지 못했습니다.';
+      });
+    }
+    const LIVE = subscribeLive('/dashboard/stream?topic=admin', updateUI, loadState);
+
+    // 제어 후: 구독 중이면 서버가 바로 push, 아니면 직접 다시 조회
+    function afterControl() {
+      if (!LIVE) fetchState().then(updateUI);
+    }
   </script>
 </body>
 </html>"""
@@ -1,20 +1,31 @@
-"""Dashboard API: positions, events, orders, signals for UI."""
-from fastapi import Depends
+"""Dashboard API: positions, events, orders, signals for UI.
+
+GET /dashboard/stream?topic=dashboard|b|admin: SSE push (snapshot, then top-level diffs) from app.services.live_state.
+GET /dashboard/data is cached per state version with ETag / If-None-Match → 304 (app.services.response_cache).
+"""
+from fastapi import Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import Position, Event, Order, Signal
+from app.services import live_state, response_cache
 from app.services.params import get_active_params
 from app.services.trade_switch import get_trade_enabled
 
 from fastapi import APIRouter
-from fastapi.responses import HTMLResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
 @router.get("/data")
-def dashboard_data(db: Session = Depends(get_db)):
-    """JSON for dashboard: positions, recent events, orders, signals, params."""
+async def dashboard_data(request: Request, db: Session = Depends(get_db)):
+    """JSON for dashboard. Cached per state version; If-None-Match → 304."""
+    return await response_cache.cached_json(request, db, lambda: run_in_threadpool(dashboard_state, db))
+
+
+def dashboard_state(db: Session) -> dict:
+    """Positions, recent events, orders, signals, params (also the SSE "dashboard" topic)."""
     positions = db.query(Position).filter(Position.size > 0).all()
     events = db.query(Event).order_by(Event.id.desc()).limit(50).all()
     orders = db.query(Order).order_by(Order.id.desc()).limit(50).all()
@@ -30,9 +41,61 @@ def dashboard_data(db: Session = Depends(get_db)):
     }
 
 
+live_state.hub.register("dashboard", dashboard_state)
+
+
+@router.get("/stream")
+async def dashboard_stream(
+    request: Request,
+    topic: str = Query("dashboard", description="dashboard | b | admin"),
+    symbol: str | None = Query(None, description="b 토픽: 심볼"),
+    tf: str | None = Query(None, description="b 토픽: 1h 또는 4h"),
+):
+    """Server-Sent Events: 첫 메시지 snapshot(전체 JSON), 이후 상태가 바뀔 때만 diff(바뀐 최상위 키)."""
+    if topic not in live_state.hub.topics():
+        raise HTTPException(status_code=400, detail=f"topic must be one of {', '.join(live_state.hub.topics())}")
+    params = {"symbol": symbol.upper() if symbol else None, "tf": tf.lower() if tf else None}
+    return StreamingResponse(
+        live_state.stream(topic, params, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/live.js")
+def dashboard_live_js():
+    """대시보드 페이지 공용 SSE 구독 스크립트."""
+    return Response(LIVE_JS, media_type="application/javascript")
+
+
+LIVE_JS = """// /dashboard/stream 구독: snapshot = 전체 상태, diff = 바뀐 최상위 키만 병합 후 render. EventSource가 없으면 폴링
+function subscribeLive(url, render, load, pollMs) {
+  if (!window.EventSource) {
+    load();
+    setInterval(load, pollMs || 30000);
+    return null;
+  }
+  var state = null;
+  var es = new EventSource(url);
+  es.addEventListener('snapshot', function(e) {
+    state = JSON.parse(e.data);
+    render(state);
+  });
+  es.addEventListener('diff', function(e) {
+    if (!state) return;
+    var d = JSON.parse(e.data);
+    for (var k in (d.set || {})) state[k] = d.set[k];
+    (d.unset || []).forEach(function(k) { delete state[k]; });
+    render(state);
+  });
+  return es;
+}
+"""
+
+
 @router.get("/", response_class=HTMLResponse)
 def dashboard_page():
-    """Simple HTML dashboard that fetches /dashboard/data."""
+    """Simple HTML dashboard: /dashboard/stream push (Refresh fetches /dashboard/data)."""
     return """<!DOCTYPE html>
 <html>
 <head>
@@ -75,23 +138,25 @@ def dashboard_page():
     <h2>Params</h2>
     <pre id="params"></pre>
   </section>
+  <script src="/dashboard/live.js"></script>
   <script>
+    function render(d) {
+      document.getElementById('trade-status').textContent = d.trade_enabled ? 'ON' : 'OFF';
+      document.getElementById('trade-status').className = 'badge ' + (d.trade_enabled ? 'on' : 'off');
+      const tb = (id, rows, fn) => {
+        const t = document.querySelector(id + ' tbody');
+        if (t) t.innerHTML = rows.map(fn).join('');
+      };
+      tb('#positions', d.positions, p => '<tr><td>'+p.symbol+'</td><td>'+p.side+'</td><td>'+p.size+'</td><td>'+p.entry_price+'</td></tr>');
+      tb('#signals', d.signals, s => '<tr><td>'+s.id+'</td><td>'+s.symbol+'</td><td>'+s.tf+'</td><td>'+s.action+'</td><td>'+s.close_time+'</td></tr>');
+      tb('#orders', d.orders, o => '<tr><td>'+o.order_id+'</td><td>'+o.symbol+'</td><td>'+o.type+'</td><td>'+o.side+'</td><td>'+o.qty+'</td><td>'+o.price+'</td><td>'+o.status+'</td></tr>');
+      tb('#events', d.events, e => '<tr><td>'+e.id+'</td><td>'+e.symbol+'</td><td>'+e.tf+'</td><td>'+e.close_time+'</td><td>'+e.status+'</td></tr>');
+      document.getElementById('params').textContent = JSON.stringify(d.params, null, 2);
+    }
     function load() {
-      fetch('/dashboard/data').then(r => r.json()).then(d => {
-        document.getElementById('trade-status').textContent = d.trade_enabled ? 'ON' : 'OFF';
-        document.getElementById('trade-status').className = 'badge ' + (d.trade_enabled ? 'on' : 'off');
-        const tb = (id, rows, fn) => {
-          const t = document.querySelector(id + ' tbody');
-          if (t) t.innerHTML = rows.map(fn).join('');
-        };
-        tb('#positions', d.positions, p => '<tr><td>'+p.symbol+'</td><td>'+p.side+'</td><td>'+p.size+'</td><td>'+p.entry_price+'</td></tr>');
-        tb('#signals', d.signals, s => '<tr><td>'+s.id+'</td><td>'+s.symbol+'</td><td>'+s.tf+'</td><td>'+s.action+'</td><td>'+s.close_time+'</td></tr>');
-        tb('#orders', d.orders, o => '<tr><td>'+o.order_id+'</td><td>'+o.symbol+'</td><td>'+o.type+'</td><td>'+o.side+'</td><td>'+o.qty+'</td><td>'+o.price+'</td><td>'+o.status+'</td></tr>');
-        tb('#events', d.events, e => '<tr><td>'+e.id+'</td><td>'+e.symbol+'</td><td>'+e.tf+'</td><td>'+e.close_time+'</td><td>'+e.status+'</td></tr>');
-        document.getElementById('params').textContent = JSON.stringify(d.params, null, 2);
-      });
+      fetch('/dashboard/data').then(r => r.json()).then(render);
     }
-    load();
+    subscribeLive('/dashboard/stream?topic=dashboard', render, load);
   </script>
 </body>
 </html>"""
@@ -1,15 +1,19 @@
 """
 B봇(평균회귀) 대시보드 API + 뷰.
-- GET /dashboard/b/data → 설계서의 JSON (뷰가 받는 데이터)
-- GET /dashboard/b → HTML 단일 페이지
+- GET /dashboard/b/data → 설계서의 JSON (뷰가 받는 데이터). worker가 기록한 bar_indicators 최신 행이 있으면 그 지표,
+  없으면 Binance 캔들로 직접 계산 (async: 캔들은 binance_async, DB 조회는 스레드풀). 상태 버전 기준 캐시 + ETag/304
+- GET /dashboard/b → HTML 단일 페이지 (/dashboard/stream?topic=b 구독, 상태가 바뀔 때만 갱신)
 """
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.services.binance_client import fetch_klines
+from app.services.binance_async import fetch_klines
+from app.services.rate_limit import PRIORITY_UI
 from app.services.bot_b_indicators import compute_bot_b_indicators
+from app.services import bar_indicators, live_state, response_cache
 from app.services.bot_b_strategy import (
     get_regime_from_adx,
     evaluate_long_checks,
@@ -52,33 +56,48 @@ def _bar_close_time_ms(open_time_ms: int, tf: str) -> int:
 
 
 @router.get("/data")
-def dashboard_b_data(
+async def dashboard_b_data(
+    request: Request,
     db: Session = Depends(get_db),
     symbol: str = Query("BTCUSDT", description="심볼"),
     tf: str = Query("4h", description="1h 또는 4h"),
     regime_override: str | None = Query(None, description="테스트용: RANGE/NEUTRAL/TREND 강제"),
 ):
+    """B봇 대시보드용 JSON. 상태 버전 기준 캐시 + ETag (If-None-Match 같으면 304). 직접 계산한 지표는 live TTL."""
+    return await response_cache.cached_json(
+        request, db,
+        lambda: dashboard_b_state(db, symbol, tf, regime_override),
+        is_live=lambda d: d["indicatorsSource"] == "live",
+    )
+
+
+async def dashboard_b_state(db: Session, symbol: str = "BTCUSDT", tf: str = "4h", regime_override: str | None = None) -> dict:
     """
-    B봇 대시보드용 JSON. 설계서 데이터 모델 그대로 반환.
-    - 지표/신호는 Binance 최신 캔들 기준으로 계산.
+    설계서 데이터 모델 그대로 반환.
+    - 지표: worker가 기록한 최신 봉 스냅샷(bar_indicators), 없으면 Binance 최신 캔들로 계산. 신호 체크는 현재 리스크 상태로.
     - 포지션/로그/리스크는 인메모리·DB 상태 사용.
     """
-    status = get_status_from_db(db)
-    risk = get_risk_from_db(db)
+    status, risk, row = await run_in_threadpool(
+        lambda: (get_status_from_db(db), get_risk_from_db(db), bar_indicators.latest(db, symbol, tf))
+    )
     position = get_position()
     logs = get_logs()
 
-    # 지표 계산을 위해 캔들 조회 (실패 시 빈 구조)
     indicators = {}
     candle_time = None
-    try:
-        klines = fetch_klines(symbol, tf, limit=60)
-        if klines:
-            indicators = compute_bot_b_indicators(klines)
-            last = klines[-1]
-            candle_time = _bar_close_time_ms(int(last["open_time"]), tf)
-    except Exception:
-        pass
+    if row is not None:
+        indicators = row.b or {}
+        candle_time = int(row.close_time)
+    else:
+        # 스냅샷 없음 → 캔들 조회 후 계산 (실패 시 빈 구조)
+        try:
+            klines = await fetch_klines(symbol, tf, limit=60, priority=PRIORITY_UI)
+            if klines:
+                indicators = await run_in_threadpool(compute_bot_b_indicators, klines)  # CPU: 이벤트 루프(SSE 허브) 막지 않게
+                last = klines[-1]
+                candle_time = _bar_close_time_ms(int(last["open_time"]), tf)
+        except Exception:
+            pass
 
     close = indicators.get("close")
     bb = indicators.get("bb") or {}
@@ -124,6 +143,7 @@ def dashboard_b_data(
         "tf": tf,
         "symbol": symbol,
         "candleTime": candle_time,
+        "indicatorsSource": "worker" if row is not None else "live",
         "indicators": {
             "close": close,
             "bb": {"upper": bb.get("upper"), "mid": bb.get("mid"), "lower": bb.get("lower")},
@@ -170,6 +190,9 @@ def dashboard_b_data(
     }
 
 
+live_state.hub.register("b", dashboard_b_state, params={"symbol": "BTCUSDT", "tf": "4h"})
+
+
 @router.get("/", response_class=HTMLResponse)
 def dashboard_b_page():
     """B봇 대시보드 단일 페이지 (세로 1페이지, 섹션 A~F)."""
@@ -281,89 +304,90 @@ def _dashboard_b_html() -> str:
 
   <p><button onclick="load()">Refresh</button></p>
 
+  <script src="/dashboard/live.js"></script>
   <script>
+    function render(d) {
+      document.getElementById('status').textContent = d.status || '-';
+      document.getElementById('status').className = 'badge ' + (d.status || '').toLowerCase().replace('_','-');
+      document.getElementById('regime').textContent = d.regime || '-';
+      document.getElementById('regime').className = 'badge ' + (d.regime || '').toLowerCase();
+      document.getElementById('botActive').textContent = d.regime === 'RANGE' ? 'B봇 활성' : '비활성';
+      document.getElementById('botActive').style.color = d.regime === 'RANGE' ? 'var(--green)' : 'var(--muted)';
+      document.getElementById('tf').textContent = d.tf || '-';
+      document.getElementById('symbol').textContent = d.symbol || '-';
+      document.getElementById('candleTime').textContent = d.candleTime ? new Date(d.candleTime).toISOString() : '-';
+
+      var sig = d.signal || {};
+      var long = sig.long || {};
+      var short = sig.short || {};
+      document.getElementById('longReady').textContent = long.ready ? 'YES' : 'NO';
+      document.getElementById('longEntryType').textContent = long.entryType || 'Immediate';
+      document.getElementById('shortReady').textContent = short.ready ? 'YES' : 'NO';
+      document.getElementById('shortEntryType').textContent = short.entryType || 'Immediate';
+      document.getElementById('longScore').textContent = long.score != null ? long.score : '-';
+      document.getElementById('shortScore').textContent = short.score != null ? short.score : '-';
+
+      function renderChecks(checks, ulId) {
+        var names = { adx_ok: 'ADX < threshold', price_outside_bb: 'Price outside BB', rsi_ok: 'RSI condition', reentry_confirmed: 'Re-entry confirmed', cooldown_ok: 'Cooldown ok', risk_ok: 'Risk ok' };
+        var ul = document.getElementById(ulId);
+        if (!ul) return;
+        ul.innerHTML = '';
+        for (var k in (checks || {})) {
+          var li = document.createElement('li');
+          li.innerHTML = (checks[k] ? '<span class="check">✓</span>' : '<span class="cross">✗</span>') + ' ' + (names[k] || k);
+          ul.appendChild(li);
+        }
+      }
+      renderChecks(long.checks, 'longChecks');
+      renderChecks(short.checks, 'shortChecks');
+
+      var ind = d.indicators || {};
+      var bb = ind.bb || {};
+      document.getElementById('bbVals').textContent = [bb.upper, bb.mid, bb.lower].filter(Boolean).map(function(x){ return x != null ? Number(x).toFixed(2) : '-'; }).join(' / ');
+      document.getElementById('bbZone').textContent = ind.bbZone === 'above_upper' ? 'Above upper' : ind.bbZone === 'below_lower' ? 'Below lower' : 'Inside';
+      document.getElementById('rsiVal').textContent = ind.rsi != null ? ind.rsi.toFixed(1) : '-';
+      document.getElementById('rsiStatus').textContent = ind.rsiStatus || '';
+      document.getElementById('adxVal').textContent = ind.adx != null ? ind.adx.toFixed(1) : '-';
+      document.getElementById('adxRange').textContent = (ind.adx != null && ind.adx < (d.rules && d.rules.adxRangeMax)) ? 'RANGE 가능' : 'RANGE 불가';
+      document.getElementById('atrVal').textContent = ind.atr != null ? ind.atr.toFixed(4) : '-';
+      document.getElementById('atrPct').textContent = ind.atrPct != null ? ind.atrPct.toFixed(2) + '%' : '-';
+      document.getElementById('atrTooHot').textContent = d.atrTooHot ? 'YES' : 'NO';
+
+      var pos = d.position;
+      var posCard = document.getElementById('positionCard');
+      if (pos && pos.side) {
+        posCard.style.display = 'block';
+        document.getElementById('posSide').textContent = pos.side;
+        document.getElementById('posEntry').textContent = pos.entry != null ? pos.entry : '-';
+        document.getElementById('posSize').textContent = pos.size != null ? pos.size : '-';
+        document.getElementById('posLeverage').textContent = pos.leverage != null ? pos.leverage : '-';
+        document.getElementById('posUpnl').textContent = (pos.upnl != null ? pos.upnl : '-') + (pos.upnlPct != null ? ' (' + pos.upnlPct + '%)' : '');
+        document.getElementById('posSlTp').textContent = (pos.sl != null ? pos.sl : '-') + ' / ' + (pos.tp != null ? pos.tp : '-');
+        document.getElementById('posTimeout').textContent = (pos.barsInTrade != null ? pos.barsInTrade : '-') + ' / ' + (pos.timeoutBarsLeft != null ? pos.timeoutBarsLeft : '-');
+      } else {
+        posCard.style.display = 'none';
+      }
+
+      var risk = d.risk || {};
+      document.getElementById('riskDaily').textContent = (risk.dailyPnl != null ? risk.dailyPnl : 0) + ' / ' + (risk.dailyLossLimit != null ? risk.dailyLossLimit : '-');
+      document.getElementById('riskConsec').textContent = risk.consecutiveLosses != null ? risk.consecutiveLosses : '0';
+      document.getElementById('riskReason').textContent = risk.tradeDisabledReason || (d.signal && d.signal.blockedReason) || '-';
+
+      var logs = d.logs || [];
+      var tbody = document.getElementById('logBody');
+      tbody.innerHTML = logs.slice().reverse().map(function(l) {
+        return '<tr><td>' + (l.time ? new Date(l.time).toISOString() : '') + '</td><td><span class="log-type ' + (l.type || '') + '">' + (l.type || '') + '</span></td><td>' + (l.msg || '') + '</td></tr>';
+      }).join('');
+    }
     function load() {
       fetch('/dashboard/b/data?symbol=BTCUSDT&tf=4h')
         .then(r => r.json())
-        .then(d => {
-          document.getElementById('status').textContent = d.status || '-';
-          document.getElementById('status').className = 'badge ' + (d.status || '').toLowerCase().replace('_','-');
-          document.getElementById('regime').textContent = d.regime || '-';
-          document.getElementById('regime').className = 'badge ' + (d.regime || '').toLowerCase();
-          document.getElementById('botActive').textContent = d.regime === 'RANGE' ? 'B봇 활성' : '비활성';
-          document.getElementById('botActive').style.color = d.regime === 'RANGE' ? 'var(--green)' : 'var(--muted)';
-          document.getElementById('tf').textContent = d.tf || '-';
-          document.getElementById('symbol').textContent = d.symbol || '-';
-          document.getElementById('candleTime').textContent = d.candleTime ? new Date(d.candleTime).toISOString() : '-';
-
-          var sig = d.signal || {};
-          var long = sig.long || {};
-          var short = sig.short || {};
-          document.getElementById('longReady').textContent = long.ready ? 'YES' : 'NO';
-          document.getElementById('longEntryType').textContent = long.entryType || 'Immediate';
-          document.getElementById('shortReady').textContent = short.ready ? 'YES' : 'NO';
-          document.getElementById('shortEntryType').textContent = short.entryType || 'Immediate';
-          document.getElementById('longScore').textContent = long.score != null ? long.score : '-';
-          document.getElementById('shortScore').textContent = short.score != null ? short.score : '-';
-
-          function renderChecks(checks, ulId) {
-            var names = { adx_ok: 'ADX < threshold', price_outside_bb: 'Price outside BB', rsi_ok: 'RSI condition', reentry_confirmed: 'Re-entry confirmed', cooldown_ok: 'Cooldown ok', risk_ok: 'Risk ok' };
-            var ul = document.getElementById(ulId);
-            if (!ul) return;
-            ul.innerHTML = '';
-            for (var k in (checks || {})) {
-              var li = document.createElement('li');
-              li.innerHTML = (checks[k] ? '<span class="check">✓</span>' : '<span class="cross">✗</span>') + ' ' + (names[k] || k);
-              ul.appendChild(li);
-            }
-          }
-          renderChecks(long.checks, 'longChecks');
-          renderChecks(short.checks, 'shortChecks');
-
-          var ind = d.indicators || {};
-          var bb = ind.bb || {};
-          document.getElementById('bbVals').textContent = [bb.upper, bb.mid, bb.lower].filter(Boolean).map(function(x){ return x != null ? Number(x).toFixed(2) : '-'; }).join(' / ');
-          document.getElementById('bbZone').textContent = ind.bbZone === 'above_upper' ? 'Above upper' : ind.bbZone === 'below_lower' ? 'Below lower' : 'Inside';
-          document.getElementById('rsiVal').textContent = ind.rsi != null ? ind.rsi.toFixed(1) : '-';
-          document.getElementById('rsiStatus').textContent = ind.rsiStatus || '';
-          document.getElementById('adxVal').textContent = ind.adx != null ? ind.adx.toFixed(1) : '-';
-          document.getElementById('adxRange').textContent = (ind.adx != null && ind.adx < (d.rules && d.rules.adxRangeMax)) ? 'RANGE 가능' : 'RANGE 불가';
-          document.getElementById('atrVal').textContent = ind.atr != null ? ind.atr.toFixed(4) : '-';
-          document.getElementById('atrPct').textContent = ind.atrPct != null ? ind.atrPct.toFixed(2) + '%' : '-';
-          document.getElementById('atrTooHot').textContent = d.atrTooHot ? 'YES' : 'NO';
-
-          var pos = d.position;
-          var posCard = document.getElementById('positionCard');
-          if (pos && pos.side) {
-            posCard.style.display = 'block';
-            document.getElementById('posSide').textContent = pos.side;
-            document.getElementById('posEntry').textContent = pos.entry != null ? pos.entry : '-';
-            document.getElementById('posSize').textContent = pos.size != null ? pos.size : '-';
-            document.getElementById('posLeverage').textContent = pos.leverage != null ? pos.leverage : '-';
-            document.getElementById('posUpnl').textContent = (pos.upnl != null ? pos.upnl : '-') + (pos.upnlPct != null ? ' (' + pos.upnlPct + '%)' : '');
-            document.getElementById('posSlTp').textContent = (pos.sl != null ? pos.sl : '-') + ' / ' + (pos.tp != null ? pos.tp : '-');
-            document.getElementById('posTimeout').textContent = (pos.barsInTrade != null ? pos.barsInTrade : '-') + ' / ' + (pos.timeoutBarsLeft != null ? pos.timeoutBarsLeft : '-');
-          } else {
-            posCard.style.display = 'none';
-          }
-
-          var risk = d.risk || {};
-          document.getElementById('riskDaily').textContent = (risk.dailyPnl != null ? risk.dailyPnl : 0) + ' / ' + (risk.dailyLossLimit != null ? risk.dailyLossLimit : '-');
-          document.getElementById('riskConsec').textContent = risk.consecutiveLosses != null ? risk.consecutiveLosses : '0';
-          document.getElementById('riskReason').textContent = risk.tradeDisabledReason || (d.signal && d.signal.blockedReason) || '-';
-
-          var logs = d.logs || [];
-          var tbody = document.getElementById('logBody');
-          tbody.innerHTML = logs.slice().reverse().map(function(l) {
-            return '<tr><td>' + (l.time ? new Date(l.time).toISOString() : '') + '</td><td><span class="log-type ' + (l.type || '') + '">' + (l.type || '') + '</span></td><td>' + (l.msg || '') + '</td></tr>';
-          }).join('');
-        })
+        .then(render)
         .catch(function(e) {
           document.getElementById('candleTime').textContent = 'Error: ' + e.message;
         });
     }
-    load();
-    setInterval(load, 30000);
+    subscribeLive('/dashboard/stream?topic=b&symbol=BTCUSDT&tf=4h', render, load, 30000);
   </script>
 </body>
 </html>"""
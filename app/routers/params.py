@@ -3,7 +3,9 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from app.database import get_db
 from app.models import ParamSet
+from app.services import live_state
 from app.services.params import get_active_params, DEFAULT_PARAMS
+from app.services.shadow import SHADOW_PREFIX, summarize as shadow_summary
 from app.services.trade_switch import get_trade_enabled, set_trade_enabled
 from app.config import get_settings
 
@@ -42,4 +44,32 @@ def update_params(body: UpdateParamsBody, db: Session = Depends(get_db)):
     new_row = ParamSet(name=name, json={**DEFAULT_PARAMS, **body.params}, active=True)
     db.add(new_row)
     db.commit()
+    live_state.hub.notify()
     return {"ok": True, "params": get_active_params(db)}
+
+
+@router.get("/shadow")
+def get_shadow_params(db: Session = Depends(get_db)):
+    """Shadow 후보 세트별 가상 신호·PnL 누적."""
+    return {"sets": shadow_summary(db)}
+
+
+@router.post("/shadow")
+def update_shadow_params(body: UpdateParamsBody, db: Session = Depends(get_db)):
+    """Shadow 후보 세트 추가/교체 (name 필수). params 없으면 해당 세트 삭제. Requires admin secret."""
+    require_admin(body.secret)
+    if not body.name:
+        raise HTTPException(status_code=400, detail="name required")
+    full_name = SHADOW_PREFIX + body.name
+    row = db.query(ParamSet).filter(ParamSet.name == full_name).first()
+    if body.params is None:
+        if row:
+            db.delete(row)
+            db.commit()
+        return {"ok": True, "sets": shadow_summary(db)}
+    if row:
+        row.json = {**DEFAULT_PARAMS, **body.params}
+    else:
+        db.add(ParamSet(name=full_name, json={**DEFAULT_PARAMS, **body.params}, active=False))
+    db.commit()
+    return {"ok": True, "sets": shadow_summary(db)}
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from app.services import live_state
 from app.services.trade_switch import get_trade_enabled, set_trade_enabled
 from app.config import get_settings
 
@@ -20,6 +21,7 @@ def trade_enable(body: TradeSwitchBody):
     """Turn on order execution (kill switch off)."""
     require_admin(body.secret)
     set_trade_enabled(True)
+    live_state.hub.notify()
     return {"ok": True, "trade_enabled": True}
 
 
@@ -28,6 +30,7 @@ def trade_disable(body: TradeSwitchBody):
     """Turn off order execution (kill switch)."""
     require_admin(body.secret)
     set_trade_enabled(False)
+    live_state.hub.notify()
     return {"ok": True, "trade_enabled": False}
 
 
@@ -5,13 +5,17 @@ from app.database import get_db
 from app.services.ingest import (
     validate_secret,
     dedup_key,
-    is_duplicate,
     enqueue_event,
+    enqueue_bulk,
+    recent_keys,
     EVENT_CANDLE_CLOSED,
 )
+from app.services import webhook_wal
 
 router = APIRouter(prefix="/webhook", tags=["webhook"])
 
+MAX_BULK_EVENTS = 5000
+
 
 class TVWebhookPayload(BaseModel):
     symbol: str
@@ -24,6 +28,21 @@ class TVWebhookPayload(BaseModel):
         extra = "allow"  # allow extra fields from TV
 
 
+class BulkEntry(BaseModel):
+    symbol: str
+    tf: str
+    event: str = EVENT_CANDLE_CLOSED
+    time: int  # bar close time (ms)
+
+    class Config:
+        extra = "allow"
+
+
+class BulkPayload(BaseModel):
+    secret: str
+    events: list[BulkEntry]
+
+
 @router.post("/tv")
 def webhook_tv(payload: TVWebhookPayload, request: Request, db: Session = Depends(get_db)):
     if not validate_secret(payload.secret):
@@ -32,12 +51,17 @@ def webhook_tv(payload: TVWebhookPayload, request: Request, db: Session = Depend
     if payload.event != EVENT_CANDLE_CLOSED:
         raise HTTPException(status_code=400, detail=f"Unsupported event: {payload.event}")
 
-    # dedup: same symbol+tf+closeTime only once
+    # dedup: same symbol+tf+closeTime only once (recent-key LRU, then INSERT IGNORE on uk_events_dedup)
     dk = dedup_key(payload.symbol, payload.tf, payload.time)
-    if is_duplicate(db, dk):
+    if recent_keys.seen(dk):
         return {"ok": True, "status": "duplicate", "dedup_key": dk}
+    raw = payload.model_dump(mode="json", exclude={"secret"})  # 비밀값은 events.raw·WAL 파일에 남기지 않음
+
+    # WAL mode: fsync to the local log and ack; the flusher inserts into events
+    if webhook_wal.append(payload.symbol, payload.tf, payload.time, raw):
+        recent_keys.add(dk)
+        return {"ok": True, "status": "accepted", "dedup_key": dk}
 
-    raw = payload.model_dump(mode="json")
     event = enqueue_event(
         db,
         symbol=payload.symbol,
@@ -49,3 +73,23 @@ def webhook_tv(payload: TVWebhookPayload, request: Request, db: Session = Depend
         return {"ok": True, "status": "duplicate", "dedup_key": dk}
 
     return {"ok": True, "status": "queued", "event_id": event.id, "dedup_key": dk}
+
+
+@router.post("/bulk")
+def webhook_bulk(payload: BulkPayload, db: Session = Depends(get_db)):
+    """Backfill many bar closes at once (re-running missed bars). One dedup query + multi-row insert per chunk.
+    The worker coalesces a backlog per symbol/tf and only trades the newest bar if it is still current."""
+    if not validate_secret(payload.secret):
+        raise HTTPException(status_code=401, detail="Invalid secret")
+    if len(payload.events) > MAX_BULK_EVENTS:
+        raise HTTPException(status_code=400, detail=f"Too many events (max {MAX_BULK_EVENTS})")
+    unsupported = {e.event for e in payload.events if e.event != EVENT_CANDLE_CLOSED}
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported event: {', '.join(sorted(unsupported))}")
+
+    items = [
+        {"symbol": e.symbol, "tf": e.tf, "close_time": e.time, "raw": {**e.model_dump(mode="json"), "source": "bulk"}}
+        for e in payload.events
+    ]
+    queued, duplicates = enqueue_bulk(db, items)
+    return {"ok": True, "queued": len(queued), "duplicate": len(duplicates), "queued_keys": queued}
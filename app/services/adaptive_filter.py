@@ -6,9 +6,10 @@ Adaptive Filter Module — Test Mode
 """
 import json
 from dataclasses import dataclass
-from typing import List
+from typing import TYPE_CHECKING, List
 
-from sqlalchemy.orm import Session
+if TYPE_CHECKING:  # 백테스트 import 경로에서 sqlalchemy 로드 안 함
+    from sqlalchemy.orm import Session
 
 # 4시간봉 기준 ADX 구간
 STATE_OFF = "OFF"      # ADX < 18 → 진입 금지
@@ -94,7 +95,7 @@ def check_consecutive_losses(last_3_pnls: List[float]) -> bool:
 ADAPTIVE_FILTER_KEY = "adaptive_filter"
 
 
-def get_adaptive_filter_state_from_db(db: Session) -> tuple[List[float], int]:
+def get_adaptive_filter_state_from_db(db: "Session") -> tuple[List[float], int]:
     """(last_3_exit_pnl_pcts, skip_entries_remaining)."""
     from app.models import AppSetting
     row = db.query(AppSetting).filter(AppSetting.key == ADAPTIVE_FILTER_KEY).first()
@@ -109,7 +110,7 @@ def get_adaptive_filter_state_from_db(db: Session) -> tuple[List[float], int]:
         return [], 0
 
 
-def update_adaptive_filter_state_after_exit(db: Session, pnl_pct: float) -> None:
+def update_adaptive_filter_state_after_exit(db: "Session", pnl_pct: float) -> None:
     """청산 후 PnL 반영, 연속 3회 손실이면 skip_remaining=2 설정."""
     from app.models import AppSetting
     pnls, skip = get_adaptive_filter_state_from_db(db)
@@ -125,7 +126,7 @@ def update_adaptive_filter_state_after_exit(db: Session, pnl_pct: float) -> None
     db.flush()
 
 
-def update_adaptive_filter_state_after_skip(db: Session) -> None:
+def update_adaptive_filter_state_after_skip(db: "Session") -> None:
     """진입 스킵 시(연속손실 쿨다운) skip 카운트 1 감소."""
     from app.models import AppSetting
     pnls, skip = get_adaptive_filter_state_from_db(db)
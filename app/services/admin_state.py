@@ -2,6 +2,7 @@
 Unified admin state builder for ETH 단일 자동매매(보수형) 관리자페이지.
 하나의 API에서 controls / meta(C봇) / botA / botB / position / bot_opinions 구조를 반환한다.
 """
+import logging
 from typing import Any
 
 from sqlalchemy.orm import Session
@@ -10,8 +11,11 @@ from app.models import Position, AppSetting
 from app.services.trade_switch import get_trade_enabled, set_trade_enabled
 from app.services.c_bot import get_snapshot as get_c_bot_snapshot
 from app.services.c_bot_indicators import compute_c_bot_indicators
-from app.services.binance_client import fetch_klines
+from app.services.binance_async import fetch_klines
+from app.services.rate_limit import PRIORITY_UI
+from app.services import bar_indicators
 
+logger = logging.getLogger(__name__)
 
 ADMIN_MODE_KEY = "admin_mode"
 ADMIN_NEW_ENTRY_KEY = "admin_new_entry_enabled"
@@ -21,6 +25,11 @@ ADMIN_RISK_KEY = "admin_risk"
 ADMIN_LAST_CONTROL_KEY = "admin_last_control_action"
 ADMIN_OVERRIDE_REASON_KEY = "admin_manual_override_reason"
 
+MODE_BACKTEST = "BACKTEST"
+MODE_PAPER = "PAPER"
+MODE_LIVE = "LIVE"
+MODES = (MODE_BACKTEST, MODE_PAPER, MODE_LIVE)
+
 
 def _get_setting(db: Session, key: str) -> str | None:
     row = db.query(AppSetting).filter(AppSetting.key == key).first()
@@ -47,9 +56,31 @@ def _get_bool(db: Session, key: str, default: bool = False) -> bool:
     return v.lower() in ("true", "1", "yes", "on")
 
 
+def get_mode(db: Session) -> str:
+    """실행 모드 (BACKTEST/PAPER/LIVE). 미설정이면 PAPER — 거래소 실주문은 LIVE로 명시한 경우에만."""
+    mode = (_get_setting(db, ADMIN_MODE_KEY) or MODE_PAPER).upper()
+    return mode if mode in MODES else MODE_PAPER
+
+
+def ensure_mode(db: Session) -> str:
+    """
+    시작 시 admin_mode가 비어 있으면 명시적으로 기록 (commit 포함). 현재 모드 반환.
+    모드 도입 전에는 trade_enabled면 Binance 실주문 → 업그레이드한 배포가 조용히 PAPER로 바뀌지 않게
+    trade_enabled면 LIVE, 아니면 PAPER로 고정하고 경고 로그.
+    """
+    if _get_setting(db, ADMIN_MODE_KEY) is not None:
+        return get_mode(db)
+    mode = MODE_LIVE if get_trade_enabled() else MODE_PAPER
+    _set_setting(db, ADMIN_MODE_KEY, mode)
+    _set_setting(db, ADMIN_LAST_CONTROL_KEY, f"Mode={mode} (미설정 → 시작 시 자동 기록)")
+    db.commit()
+    logger.warning("admin mode was unset; pinned to %s (trade_enabled=%s). Change it with POST /admin/control/mode", mode, mode == MODE_LIVE)
+    return mode
+
+
 def _get_controls(db: Session) -> dict[str, Any]:
     """controls: mode, run_state, new_entry_enabled, emergency_stop, leverage_setting, risk_setting, last_control_action, manual_override_reason"""
-    mode = _get_setting(db, ADMIN_MODE_KEY) or "PAPER"
+    mode = get_mode(db)
     run_state = "RUNNING" if get_trade_enabled() else "PAUSED"
     new_entry_enabled = _get_bool(db, ADMIN_NEW_ENTRY_KEY, default=True)
     emergency_stop = _get_bool(db, ADMIN_EMERGENCY_KEY, default=False)
@@ -138,8 +169,16 @@ def set_risk_text(db: Session, risk_text: str, reason: str | None = None) -> Non
     _set_setting(db, ADMIN_LAST_CONTROL_KEY, text)
 
 
-def _get_meta(db: Session) -> dict[str, Any]:
-    """meta(C봇): regime, candidate_regime, active_strategy, trading_allowed, blocked_reason, confirm_count, cooldown_until, emergency_mode/reason, indicators, risk"""
+async def fetch_meta_klines() -> list[dict] | None:
+    """meta 지표용 ETHUSDT 4h 캔들 (bar_indicators 스냅샷이 없을 때 async 라우트가 조회해 get_unified_admin_state에 넘김). 실패 시 None."""
+    try:
+        return await fetch_klines("ETHUSDT", "4h", limit=200, priority=PRIORITY_UI)
+    except Exception:
+        return None
+
+
+def _get_meta(db: Session, klines: list[dict] | None) -> dict[str, Any]:
+    """meta(C봇): regime, candidate_regime, active_strategy, trading_allowed, blocked_reason, confirm_count, cooldown_until, emergency_mode/reason, indicators(+source), risk"""
     snapshot = get_c_bot_snapshot(db)
     regime = snapshot.get("regime_current")
     candidate_regime = snapshot.get("candidate_regime")
@@ -152,17 +191,17 @@ def _get_meta(db: Session) -> dict[str, Any]:
     emergency_mode = snapshot.get("emergency_mode", False)
     emergency_reason = snapshot.get("emergency_reason")
 
-    # indicators: 4H 기준 최신 캔들에서 계산 (데이터 부족/오류 시 None)
+    # indicators: 4H 기준 worker 스냅샷(bar_indicators), 없으면 넘겨받은 캔들로 계산 (데이터 부족/오류 시 None)
     indicators: dict[str, Any] = {
         "adx": None,
         "atr_pct": None,
         "ema_slope_pct": None,
         "atr_hot": None,
     }
+    row = bar_indicators.latest(db, "ETHUSDT", "4h")
     try:
-        klines = fetch_klines("ETHUSDT", "4h", limit=200)
-        if klines:
-            c_inds = compute_c_bot_indicators(klines)
+        c_inds = row.c if row is not None else (compute_c_bot_indicators(klines) if klines else None)
+        if c_inds:
             indicators = {
                 "adx": c_inds.get("adx"),
                 "atr_pct": c_inds.get("atr_pct"),
@@ -197,6 +236,7 @@ def _get_meta(db: Session) -> dict[str, Any]:
         "emergency_mode": emergency_mode,
         "emergency_reason": emergency_reason,
         "indicators": indicators,
+        "indicators_source": "worker" if row is not None else "live",
         "risk": risk,
     }
 
@@ -256,10 +296,10 @@ def _get_position(db: Session) -> dict[str, Any] | None:
     }
 
 
-def get_unified_admin_state(db: Session) -> dict[str, Any]:
-    """controls / meta / botA / botB / position / bot_opinions 구조 반환."""
+def get_unified_admin_state(db: Session, klines: list[dict] | None = None) -> dict[str, Any]:
+    """controls / meta / botA / botB / position / bot_opinions 구조 반환. klines: fetch_meta_klines() 결과 (없으면 지표 None)."""
     controls = _get_controls(db)
-    meta = _get_meta(db)
+    meta = _get_meta(db, klines)
     bot_a = _get_bot_a_state()
     bot_b = _get_bot_b_state()
     position = _get_position(db)
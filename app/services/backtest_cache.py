@@ -0,0 +1,105 @@
+"""
+백테스트 결과 캐시 (내용 주소 기반, 디스크).
+- 키: sha256(캔들 구간 내용 digest + 하위 TF 캔들 digest + params + fee/slippage 등 실행 옵션 + 엔진 버전)
+  → 같은 데이터·같은 설정이면 소스(binance/db/file)나 실행 시점과 무관하게 같은 키.
+  캔들이 추가/수정되면 digest가 바뀌므로 별도 무효화 불필요. 엔진 로직이 바뀌면 ENGINE_VERSION을 올림.
+- 값: 결과 dict 전체(요약 + trades)를 compact JSON → zlib 압축해 <key>.json.z 로 저장.
+- 용량 제한: 저장 후 디렉터리 합계가 max_bytes를 넘으면 오래 안 쓴(mtime) 파일부터 삭제. 조회 적중 시 mtime 갱신 (LRU).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from array import array
+from typing import Iterable
+
+SUFFIX = ".json.z"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def klines_digest(klines: Iterable[dict]) -> str:
+    """캔들 내용 digest (open_time + OHLCV). 행 단위 dict 대신 컬럼 배열로 모아 한 번에 해시."""
+    ot = array("q")
+    vals = array("d")
+    for k in klines:
+        ot.append(int(k["open_time"]))
+        vals.extend((float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"])))
+    h = hashlib.sha256()
+    h.update(ot.tobytes())
+    h.update(vals.tobytes())
+    return f"{len(ot)}:{h.hexdigest()}"
+
+
+def arrays_digest(*cols: array) -> str:
+    """이미 컬럼 배열로 들고 있는 데이터(IntrabarIndex 등) digest."""
+    h = hashlib.sha256()
+    for col in cols:
+        h.update(col.tobytes())
+    return h.hexdigest()
+
+
+def cache_key(**parts) -> str:
+    """키 구성 요소(JSON 직렬화 가능한 값)를 정렬된 JSON으로 묶어 sha256."""
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def _path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, key + SUFFIX)
+
+
+def get(cache_dir: str, key: str) -> dict | None:
+    """적중 시 결과 dict, 없거나 깨진 파일이면 None."""
+    path = _path(cache_dir, key)
+    try:
+        with open(path, "rb") as f:
+            result = json.loads(zlib.decompress(f.read()))
+    except (OSError, ValueError, zlib.error):
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return result
+
+
+def put(cache_dir: str, key: str, result: dict, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+    """결과 저장 (임시 파일 → rename으로 원자적 교체) 후 용량 초과분 정리."""
+    os.makedirs(cache_dir, exist_ok=True)
+    data = zlib.compress(json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode(), 6)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, _path(cache_dir, key))
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir: str, max_bytes: int) -> int:
+    """합계가 max_bytes 이하가 될 때까지 mtime 오래된 순으로 삭제. 삭제한 파일 수 반환."""
+    entries = []
+    total = 0
+    with os.scandir(cache_dir) as it:
+        for e in it:
+            if e.is_file() and e.name.endswith(SUFFIX):
+                st = e.stat()
+                entries.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+    if total <= max_bytes:
+        return 0
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
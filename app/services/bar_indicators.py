@@ -0,0 +1,75 @@
+"""
+봉별 지표 스냅샷 (bar_indicators): worker가 봉 마감 이벤트를 처리할 때 같은 캔들로 A/B/C봇 지표·레짐·체크를 1행 기록.
+대시보드(/dashboard/b/data, /admin/c-bot/full, /admin/state)는 (symbol, tf) 최신 행만 읽어 계산·거래소 호출 없이 응답.
+최신 행이 없거나 FRESH_BARS봉보다 오래됐으면(해당 심볼을 worker가 안 돌림) 대시보드가 기존처럼 직접 계산.
+"""
+import logging
+import time
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import BarIndicator
+from app.services.bot_b_indicators import compute_bot_b_indicators
+from app.services.bot_b_strategy import checks_to_dict, evaluate_long_checks, evaluate_short_checks, get_regime_from_adx
+from app.services.c_bot_indicators import compute_c_bot_indicators
+from app.services.intrabar import tf_to_ms
+
+logger = logging.getLogger(__name__)
+
+B_BARS = 60  # B봇 대시보드와 같은 캔들 수
+C_BARS = 200  # C봇·관리자 meta와 같은 캔들 수
+ADX_RANGE_MAX = 16  # B봇 대시보드 기본 규칙 (dashboard_b.DEFAULT_ADX_RANGE_MAX)
+FRESH_BARS = 2
+
+
+def build_row(symbol: str, tf: str, close_time: int, klines: list[dict], a_indicators: dict | None) -> BarIndicator:
+    b = compute_bot_b_indicators(klines[-B_BARS:])
+    c = compute_c_bot_indicators(klines[-C_BARS:])
+    return BarIndicator(
+        symbol=symbol,
+        tf=tf,
+        close_time=close_time,
+        regime=get_regime_from_adx(b.get("adx"), ADX_RANGE_MAX),
+        a=a_indicators,
+        b=b,
+        c=c,
+        checks={
+            "long": checks_to_dict(evaluate_long_checks(b)),
+            "short": checks_to_dict(evaluate_short_checks(b)),
+        },
+    )
+
+
+def record(db: Session, symbol: str, tf: str, close_time: int, klines: list[dict], a_indicators: dict | None = None) -> BarIndicator | None:
+    """봉 1개 스냅샷 기록 (같은 봉 재처리면 교체). 실패해도 worker 흐름은 계속 (None)."""
+    try:
+        row = build_row(symbol, tf, close_time, klines, a_indicators)
+        db.query(BarIndicator).filter(
+            BarIndicator.symbol == symbol, BarIndicator.tf == tf, BarIndicator.close_time == close_time
+        ).delete(synchronize_session=False)
+        db.add(row)
+        db.commit()
+        return row
+    except IntegrityError:
+        db.rollback()  # 같은 봉을 동시에 기록한 다른 worker가 이김
+        return None
+    except Exception as e:
+        db.rollback()
+        logger.warning("bar_indicators record failed %s %s %s: %s", symbol, tf, close_time, e)
+        return None
+
+
+def latest(db: Session, symbol: str, tf: str) -> BarIndicator | None:
+    """(symbol, tf) 최신 행. FRESH_BARS봉보다 오래됐으면 None."""
+    row = (
+        db.query(BarIndicator)
+        .filter(BarIndicator.symbol == symbol, BarIndicator.tf == tf)
+        .order_by(BarIndicator.close_time.desc())
+        .first()
+    )
+    if row is None:
+        return None
+    if int(row.close_time) < time.time() * 1000 - FRESH_BARS * tf_to_ms(tf):
+        return None
+    return row
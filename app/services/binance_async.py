@@ -0,0 +1,173 @@
+"""
+Binance USDT-M Futures asyncio 클라이언트 (FastAPI async 라우트용). binance_client와 같은 함수 이름·반환 형식.
+- 프로세스 공용 httpx.AsyncClient 1개 (연결 풀 재사용, 이벤트 루프별). 종료 시 aclose() (main lifespan)
+- 요청 합치기: 같은 공개 GET(경로+파라미터)이 진행 중이면 새로 보내지 않고 그 결과를 같이 기다림
+  → 대시보드 탭 여러 개가 동시에 폴링해도 Binance 요청 1번, 가중치 1번
+- 가중치 제한은 binance_client와 같은 rate_limit.limiter (acquire_async: 이벤트 루프를 막지 않고 대기)
+- 주문·취소는 없음 (worker/execution 동기 경로 전용)
+"""
+import asyncio
+import logging
+from typing import Any
+
+import httpx
+
+from app.config import get_settings
+from app.services import rate_limit, time_sync
+from app.services.binance_client import TF_TO_INTERVAL, _headers, _response_code, _sign, _timestamp
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = 20
+
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+_inflight: dict[tuple, asyncio.Task] = {}
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=get_settings().binance_base_url.rstrip("/"),
+            timeout=15,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        )
+        _client_loop = loop
+        _inflight.clear()
+    return _client
+
+
+async def aclose() -> None:
+    """공용 클라이언트 닫기 (API 종료 시)."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+async def _send(method: str, path: str, *, params: dict | None = None, data: dict | None = None,
+                priority: int | None = None, **kwargs) -> httpx.Response:
+    level = rate_limit.current_priority() if priority is None else priority
+    await rate_limit.limiter.acquire_async(rate_limit.weight_for(path, {**(params or {}), **(data or {})}), level)
+    r = await _get_client().request(method, path, params=params, data=data, **kwargs)
+    rate_limit.limiter.observe(r)
+    return r
+
+
+async def _get_public(path: str, params: dict | None = None, priority: int | None = None, timeout: float = 15) -> Any:
+    """공개 GET. 같은 요청이 진행 중이면 합침 (먼저 보낸 쪽 우선순위로 한 번만 전송)."""
+    key = (path, tuple(sorted((params or {}).items())))
+    task = _inflight.get(key)
+    if task is None:
+        async def fetch():
+            try:
+                r = await _send("GET", path, params=params, priority=priority, timeout=timeout)
+                r.raise_for_status()
+                return r.json()
+            finally:
+                _inflight.pop(key, None)
+
+        task = asyncio.ensure_future(fetch())
+        _inflight[key] = task
+    # 기다리던 요청 하나가 취소돼도 공유 요청은 계속
+    return await asyncio.shield(task)
+
+
+async def _request_signed(method: str, path: str, params: dict | None = None, timeout: float = 15, priority: int | None = None) -> Any:
+    """서명 요청 (binance_client._request_signed와 같은 규칙: -1021이면 서버 시각 재측정 후 1회 재전송)."""
+    secret = get_settings().binance_api_secret
+    if not secret:
+        raise ValueError("BINANCE_API_SECRET not set")
+    for attempt in range(2):
+        query = dict(params or {})
+        query["timestamp"] = _timestamp()
+        query["recvWindow"] = time_sync.clock.recv_window()
+        query["signature"] = _sign(query, secret)
+        r = await _send(method, path, params=query, headers=_headers(), timeout=timeout, priority=priority)
+        if attempt == 0 and r.status_code == 400 and _response_code(r) == -1021:
+            logger.warning("-1021 on %s (offset=%dms); resyncing server time", path, time_sync.clock.offset_ms)
+            await asyncio.to_thread(time_sync.request_resync, True)
+            continue
+        break
+    r.raise_for_status()
+    return r.json()
+
+
+async def get_klines(
+    symbol: str,
+    interval: str,
+    limit: int = 200,
+    end_time: int | None = None,
+    start_time: int | None = None,
+    priority: int | None = None,
+) -> list[list]:
+    """GET fapi/v1/klines (binance_client.get_klines와 동일)."""
+    params: dict[str, Any] = {"symbol": symbol, "interval": interval, "limit": min(limit, 1500)}
+    if start_time is not None:
+        params["startTime"] = start_time
+    if end_time is not None:
+        params["endTime"] = end_time
+    return await _get_public("/fapi/v1/klines", params, priority=priority)
+
+
+async def fetch_klines(symbol: str, tf: str, limit: int, priority: int | None = None) -> list[dict]:
+    """open_time, o, h, l, c, v dict 리스트 (binance_client.fetch_klines와 동일)."""
+    interval = TF_TO_INTERVAL.get(tf.lower(), tf)
+    raw = await get_klines(symbol, interval, limit=limit, priority=priority)
+    return [
+        {
+            "open_time": row[0],
+            "o": float(row[1]),
+            "h": float(row[2]),
+            "l": float(row[3]),
+            "c": float(row[4]),
+            "v": float(row[5]),
+        }
+        for row in raw
+    ]
+
+
+async def fetch_latest_closed_kline(symbol: str, tf: str, priority: int | None = None) -> dict | None:
+    """가장 최근 마감 봉 (binance_client.fetch_latest_closed_kline과 동일)."""
+    interval = TF_TO_INTERVAL.get(tf.lower(), tf)
+    raw = await get_klines(symbol, interval, limit=2, priority=priority)
+    if len(raw) < 2:
+        return None
+    row = raw[0]
+    return {
+        "open_time": row[0],
+        "o": float(row[1]),
+        "h": float(row[2]),
+        "l": float(row[3]),
+        "c": float(row[4]),
+        "v": float(row[5]),
+        "close_time": row[6],
+    }
+
+
+async def get_exchange_info(symbol: str | None = None) -> dict:
+    """GET fapi/v1/exchangeInfo."""
+    return await _get_public("/fapi/v1/exchangeInfo", {"symbol": symbol} if symbol else None)
+
+
+async def get_mark_price(symbol: str) -> float:
+    """GET fapi/v1/premiumIndex → markPrice."""
+    data = await _get_public("/fapi/v1/premiumIndex", {"symbol": symbol}, timeout=10)
+    return float(data.get("markPrice", 0))
+
+
+async def get_account() -> dict:
+    """GET fapi/v2/account."""
+    return await _request_signed("GET", "/fapi/v2/account")
+
+
+async def get_position_risk(symbol: str | None = None) -> list[dict]:
+    """GET fapi/v2/positionRisk."""
+    return await _request_signed("GET", "/fapi/v2/positionRisk", params={"symbol": symbol} if symbol else None)
+
+
+async def get_open_orders(symbol: str | None = None) -> list[dict]:
+    """GET fapi/v1/openOrders. symbol 없으면 전체 (가중치 40)."""
+    return await _request_signed("GET", "/fapi/v1/openOrders", params={"symbol": symbol} if symbol else None)
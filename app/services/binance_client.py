@@ -5,15 +5,37 @@ Base URL: https://fapi.binance.com (prod) or https://testnet.binancefuture.com (
 import time
 import hmac
 import hashlib
+import logging
+import threading
+import uuid
 from urllib.parse import urlencode
 from typing import Any
 import requests
 from app.config import get_settings
+from app.services import rate_limit, time_sync
+from app.services.rate_limit import PRIORITY_ORDER, RateLimited
+
+logger = logging.getLogger(__name__)
 
 # Binance interval for klines: 1m, 3m, 5m, 15m, 30m, 1h, 2h, 4h, 6h, 8h, 12h, 1d, 3d, 1w
 TF_TO_INTERVAL = {"1h": "1h", "4h": "4h", "1m": "1m", "15m": "15m", "30m": "30m", "2h": "2h", "6h": "6h", "12h": "12h", "1d": "1d"}
 
-RECV_WINDOW = 10000
+RECV_WINDOW = time_sync.FALLBACK_RECV_WINDOW  # 서버 시각 동기화 전 기본값 (동기화 후엔 time_sync.clock.recv_window())
+
+# 주문 전송 결과를 알 수 없는 응답 (타임아웃·5xx·-1007 등) → clientOrderId로 조회 후 재시도
+UNKNOWN_STATUS_CODES = {-1000, -1001, -1006, -1007}
+NOT_FOUND_CODES = {-2013}
+DUPLICATE_CLIENT_ID_CODES = {-4015, -4116}
+CLIENT_ORDER_PREFIX = "tb-"
+
+# fetch_klines single-flight + 마이크로 캐시: key → _Flight (진행 중), key → (봉 openTime, 만료 monotonic, 결과)
+_flights: dict[tuple, "_Flight"] = {}
+_kline_cache: dict[tuple, tuple[int, float, list[dict]]] = {}
+_flight_lock = threading.Lock()
+kline_cache_stats = {"hits": 0, "shared": 0, "misses": 0}
+
+# 심볼 필터 캐시 (exchangeInfo는 거의 안 바뀜): (base_url, symbol) → (만료 monotonic, 필터)
+_filters_cache: dict[tuple[str, str], tuple[float, dict]] = {}
 
 
 def _sign(query: dict, secret: str) -> str:
@@ -24,53 +46,143 @@ def _headers() -> dict:
     return {"X-MBX-APIKEY": get_settings().binance_api_key}
 
 
+def _send(method: str, path: str, *, params: dict | None = None, data: dict | None = None,
+          priority: int | None = None, **kwargs) -> requests.Response:
+    """모든 REST 호출 공통: 가중치 제한(rate_limit) 통과 후 전송, 응답 헤더로 사용량 보정. priority 없으면 호출 문맥 우선순위."""
+    level = rate_limit.current_priority() if priority is None else priority
+    rate_limit.limiter.acquire(rate_limit.weight_for(path, {**(params or {}), **(data or {})}), level)
+    base = get_settings().binance_base_url.rstrip("/")
+    r = requests.request(method, f"{base}{path}", params=params, data=data, **kwargs)
+    rate_limit.limiter.observe(r)
+    return r
+
+
 def _timestamp() -> int:
-    return int(time.time() * 1000)
+    """서버 시각 기준 ms (로컬 시각 + time_sync 오프셋)."""
+    return time_sync.clock.now_ms()
 
 
-def _request_signed(method: str, path: str, params: dict | None = None, data: dict | None = None) -> dict:
-    """Signed request for private endpoints."""
-    base = get_settings().binance_base_url.rstrip("/")
-    url = f"{base}{path}"
+def _request_signed(
+    method: str, path: str, params: dict | None = None, data: dict | None = None, timeout: float = 15, priority: int | None = None,
+) -> dict:
+    """Signed request for private endpoints. -1021(timestamp)이면 서버 시각 재측정 후 1회 재전송 (거절된 요청이라 안전)."""
     secret = get_settings().binance_api_secret
     if not secret:
         raise ValueError("BINANCE_API_SECRET not set")
-    ts = _timestamp()
-    query = dict(params or {})
-    query.update(data or {})
-    query["timestamp"] = ts
-    query["recvWindow"] = RECV_WINDOW
-    query["signature"] = _sign(query, secret)
-    if method == "GET":
-        r = requests.get(url, params=query, headers=_headers(), timeout=15)
-    else:
-        r = requests.post(url, data=query, headers=_headers(), timeout=15)
+    for attempt in range(2):
+        query = dict(params or {})
+        query.update(data or {})
+        query["timestamp"] = _timestamp()
+        query["recvWindow"] = time_sync.clock.recv_window()
+        query["signature"] = _sign(query, secret)
+        if method in ("GET", "DELETE"):
+            r = _send(method, path, params=query, headers=_headers(), timeout=timeout, priority=priority)
+        else:
+            r = _send(method, path, data=query, headers=_headers(), timeout=timeout, priority=priority)
+        if attempt == 0 and r.status_code == 400 and _response_code(r) == -1021:
+            logger.warning("-1021 on %s (offset=%dms); resyncing server time", path, time_sync.clock.offset_ms)
+            time_sync.request_resync(wait=True)
+            continue
+        break
     r.raise_for_status()
     return r.json()
 
 
-def get_klines(symbol: str, interval: str, limit: int = 200, end_time: int | None = None) -> list[list]:
+def _response_code(r: requests.Response) -> int | None:
+    try:
+        return int(r.json().get("code"))
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+
+def get_klines(
+    symbol: str,
+    interval: str,
+    limit: int = 200,
+    end_time: int | None = None,
+    start_time: int | None = None,
+    priority: int | None = None,
+) -> list[list]:
     """
     GET fapi/v1/klines
     Returns list of [open_time, o, h, l, c, v, close_time, ...]
+    priority: rate_limit.PRIORITY_* (대시보드는 PRIORITY_UI → 한도 가까우면 RateLimited)
     """
-    base = get_settings().binance_base_url.rstrip("/")
-    url = f"{base}/fapi/v1/klines"
     params: dict[str, Any] = {"symbol": symbol, "interval": interval, "limit": min(limit, 1500)}
+    if start_time is not None:
+        params["startTime"] = start_time
     if end_time is not None:
         params["endTime"] = end_time
-    r = requests.get(url, params=params, timeout=15)
+    r = _send("GET", "/fapi/v1/klines", params=params, timeout=15, priority=priority)
     r.raise_for_status()
     return r.json()
 
 
-def fetch_klines(symbol: str, tf: str, limit: int) -> list[dict]:
+class _Flight:
+    def __init__(self, level: int):
+        self.level = level
+        self.done = threading.Event()
+        self.result: list[dict] | None = None
+        self.error: Exception | None = None
+
+
+def _bar_open(interval: str) -> int | None:
+    """현재 진행 중인 봉 openTime (서버 시각 기준). 모르는 interval이면 None (캐시 안 함)."""
+    unit = {"m": 60_000, "h": 3_600_000, "d": 86_400_000}.get(interval[-1:])
+    if not unit or not interval[:-1].isdigit():
+        return None
+    bar_ms = int(interval[:-1]) * unit
+    return time_sync.clock.now_ms() // bar_ms * bar_ms
+
+
+def fetch_klines(symbol: str, tf: str, limit: int, priority: int | None = None) -> list[dict]:
     """
     Fetch klines and return list of dicts with open_time, o, h, l, c, v.
     Uses Binance interval (e.g. 1h, 4h).
+    같은 (symbol, tf, limit) 요청이 동시에 오면 REST 1번을 같이 기다리고(single-flight),
+    결과는 kline_cache_ttl_s 동안 + 같은 봉 안에서만 재사용 (봉이 바뀌면 바로 새로 조회).
     """
     interval = TF_TO_INTERVAL.get(tf.lower(), tf)
-    raw = get_klines(symbol, interval, limit=limit)
+    level = rate_limit.current_priority() if priority is None else priority
+    key = (get_settings().binance_base_url, symbol, interval, limit)
+    bar_open = _bar_open(interval)
+    with _flight_lock:
+        cached = _kline_cache.get(key)
+        if cached and cached[0] == bar_open and cached[1] > time.monotonic():
+            kline_cache_stats["hits"] += 1
+            return list(cached[2])
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight(level)
+            kline_cache_stats["misses"] += 1
+        else:
+            kline_cache_stats["shared"] += 1
+    if not leader:
+        flight.done.wait()
+        if flight.error is None:
+            return list(flight.result)
+        # 하위 우선순위 leader가 가중치 제한에 걸린 것이면 내 우선순위로 직접 조회
+        if isinstance(flight.error, RateLimited) and level < flight.level:
+            return _klines_to_dicts(get_klines(symbol, interval, limit=limit, priority=level))
+        raise flight.error
+    try:
+        flight.result = _klines_to_dicts(get_klines(symbol, interval, limit=limit, priority=level))
+        ttl = get_settings().kline_cache_ttl_s
+        if ttl > 0 and bar_open is not None:
+            with _flight_lock:
+                _kline_cache[key] = (bar_open, time.monotonic() + ttl, flight.result)
+        return list(flight.result)
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flight_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+def _klines_to_dicts(raw: list[list]) -> list[dict]:
     return [
         {
             "open_time": row[0],
@@ -84,6 +196,31 @@ def fetch_klines(symbol: str, tf: str, limit: int) -> list[dict]:
     ]
 
 
+def iter_klines_range(symbol: str, tf: str, start_time: int, end_time: int):
+    """
+    [start_time, end_time) 구간 klines를 1500개씩 페이지 조회하며 dict로 하나씩 yield.
+    하위 TF(1m/15m) 장기 구간 로드용 — 전체를 리스트로 쌓지 않음.
+    """
+    interval = TF_TO_INTERVAL.get(tf.lower(), tf)
+    cursor = start_time
+    while cursor < end_time:
+        raw = get_klines(symbol, interval, limit=1500, start_time=cursor, end_time=end_time - 1)
+        if not raw:
+            return
+        for row in raw:
+            if row[0] >= end_time:
+                return
+            yield {
+                "open_time": row[0],
+                "o": float(row[1]),
+                "h": float(row[2]),
+                "l": float(row[3]),
+                "c": float(row[4]),
+                "v": float(row[5]),
+            }
+        cursor = raw[-1][0] + 1
+
+
 def fetch_latest_closed_kline(symbol: str, tf: str) -> dict | None:
     """
     Fetch the most recent *closed* candle only.
@@ -111,17 +248,21 @@ def fetch_latest_closed_kline(symbol: str, tf: str) -> dict | None:
 
 def get_exchange_info(symbol: str | None = None) -> dict:
     """GET fapi/v1/exchangeInfo. Optional symbol filter."""
-    base = get_settings().binance_base_url.rstrip("/")
     params = {}
     if symbol:
         params["symbol"] = symbol
-    r = requests.get(f"{base}/fapi/v1/exchangeInfo", params=params or None, timeout=15)
+    r = _send("GET", "/fapi/v1/exchangeInfo", params=params or None, timeout=15)
     r.raise_for_status()
     return r.json()
 
 
 def get_symbol_filters(symbol: str) -> dict:
-    """Step size, tick size, min notional for symbol."""
+    """Step size, tick size, min notional for symbol. symbol_filters_ttl_s 동안 프로세스 메모리에 캐시."""
+    settings = get_settings()
+    key = (settings.binance_base_url, symbol)
+    cached = _filters_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return dict(cached[1])
     data = get_exchange_info(symbol)
     info = next((s for s in data.get("symbols", []) if s["symbol"] == symbol), None)
     if not info:
@@ -136,13 +277,15 @@ def get_symbol_filters(symbol: str) -> dict:
         tick = float(filters["PRICE_FILTER"].get("tickSize", "0.01"))
     if "MIN_NOTIONAL" in filters:
         min_notional = float(filters["MIN_NOTIONAL"].get("notional", "0"))
-    return {"stepSize": step, "tickSize": tick, "minNotional": min_notional}
+    result = {"stepSize": step, "tickSize": tick, "minNotional": min_notional}
+    if settings.symbol_filters_ttl_s > 0:
+        _filters_cache[key] = (time.monotonic() + settings.symbol_filters_ttl_s, result)
+    return dict(result)
 
 
 def get_mark_price(symbol: str) -> float:
     """GET fapi/v1/premiumIndex. Returns mark price for symbol."""
-    base = get_settings().binance_base_url.rstrip("/")
-    r = requests.get(f"{base}/fapi/v1/premiumIndex", params={"symbol": symbol}, timeout=10)
+    r = _send("GET", "/fapi/v1/premiumIndex", params={"symbol": symbol}, timeout=10)
     r.raise_for_status()
     data = r.json()
     return float(data.get("markPrice", 0))
@@ -161,6 +304,29 @@ def get_position_risk(symbol: str | None = None) -> list[dict]:
     return _request_signed("GET", "/fapi/v2/positionRisk", params=params)
 
 
+def get_open_orders(symbol: str | None = None) -> list[dict]:
+    """GET fapi/v1/openOrders. symbol 없으면 전체 (가중치 40)."""
+    params = {}
+    if symbol:
+        params["symbol"] = symbol
+    return _request_signed("GET", "/fapi/v1/openOrders", params=params)
+
+
+def get_order(symbol: str, order_id: int | None = None, client_order_id: str | None = None) -> dict:
+    """GET fapi/v1/order (orderId 또는 origClientOrderId). 체결/취소된 주문도 조회 가능."""
+    params: dict[str, Any] = {"symbol": symbol}
+    if order_id is not None:
+        params["orderId"] = order_id
+    else:
+        params["origClientOrderId"] = client_order_id
+    return _request_signed("GET", "/fapi/v1/order", params=params)
+
+
+def cancel_order(symbol: str, order_id: int) -> dict:
+    """DELETE fapi/v1/order."""
+    return _request_signed("DELETE", "/fapi/v1/order", params={"symbol": symbol, "orderId": order_id}, priority=PRIORITY_ORDER)
+
+
 def set_leverage(symbol: str, leverage: int) -> dict:
     """POST fapi/v1/leverage."""
     return _request_signed("POST", "/fapi/v1/leverage", data={"symbol": symbol, "leverage": leverage})
@@ -179,13 +345,17 @@ def create_order(
     price: float | None = None,
     stop_price: float | None = None,
     reduce_only: bool = False,
+    client_order_id: str | None = None,
 ) -> dict:
     """
     POST fapi/v1/order.
     order_type: MARKET, STOP_MARKET, etc.
     For STOP_MARKET: pass stopPrice and quantity; reduce_only=True for stop-loss.
+    client_order_id: newClientOrderId (^[.A-Z:/a-z0-9_-]{1,36}$). 재시도 안전하게 하려면 submit_order 사용.
     """
     data = {"symbol": symbol, "side": side, "type": order_type}
+    if client_order_id:
+        data["newClientOrderId"] = client_order_id
     if quantity is not None:
         data["quantity"] = quantity
     if price is not None:
@@ -194,4 +364,126 @@ def create_order(
         data["stopPrice"] = stop_price
     if reduce_only:
         data["reduceOnly"] = "true"
-    return _request_signed("POST", "/fapi/v1/order", data=data)
+    return _request_signed("POST", "/fapi/v1/order", data=data, timeout=get_settings().order_timeout_s, priority=PRIORITY_ORDER)
+
+
+def client_order_id(event_id: int | str | None, leg: str) -> str:
+    """결정적 clientOrderId: tb-{event_id}-{leg} (leg: entry/stop/exit). 이벤트 없으면(수동 청산 등) 임의 ID."""
+    if event_id is None:
+        event_id = f"m{uuid.uuid4().hex[:12]}"
+    return f"{CLIENT_ORDER_PREFIX}{event_id}-{leg}"[:36]
+
+
+def _error_code(e: requests.HTTPError) -> int | None:
+    return _response_code(e.response) if e.response is not None else None
+
+
+def _status_unknown(e: Exception) -> bool:
+    """주문이 거래소에 도달했는지 알 수 없는 실패인지."""
+    if isinstance(e, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code >= 500 or _error_code(e) in UNKNOWN_STATUS_CODES
+    return False
+
+
+def _retryable(e: Exception) -> bool:
+    """거래소가 확실히 거절했거나 보내지도 않은 일시 오류 (재전송해도 이중 주문 없음): 429/418, -1021 timestamp, RateLimited."""
+    if isinstance(e, RateLimited):
+        return True
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code in (418, 429) or _error_code(e) == -1021
+    return False
+
+
+def _find_order(symbol: str, cid: str) -> dict | None:
+    """clientOrderId로 조회. 없으면 None, 조회 자체 실패는 예외."""
+    try:
+        return get_order(symbol, client_order_id=cid)
+    except requests.HTTPError as e:
+        if _error_code(e) in NOT_FOUND_CODES:
+            return None
+        raise
+
+
+def submit_order(
+    symbol: str,
+    side: str,
+    order_type: str,
+    client_order_id: str,
+    *,
+    quantity: float | None = None,
+    stop_price: float | None = None,
+    reduce_only: bool = False,
+    retries: int | None = None,
+    backoff_s: float | None = None,
+) -> dict:
+    """
+    멱등 주문 전송. 같은 clientOrderId로:
+    - 결과 불명(타임아웃·5xx·-1007 등) → 조회해서 있으면 그 주문 반환, 없으면 재전송
+    - 확실한 거절(429/-1021) → 잠시 후 재전송
+    - clientOrderId 중복(-4015/-4116) → 이미 들어간 것이므로 조회해서 반환
+    retries/backoff_s 기본값은 설정 order_retries / order_retry_backoff_s.
+    """
+    s = get_settings()
+    retries = s.order_retries if retries is None else retries
+    backoff_s = s.order_retry_backoff_s if backoff_s is None else backoff_s
+    last_exc: Exception | None = None
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff_s * (2 ** (attempt - 1)))
+        if last_exc is not None and _status_unknown(last_exc):
+            try:
+                found = _find_order(symbol, client_order_id)
+            except Exception as e:
+                logger.warning("order %s lookup failed (attempt %d): %s", client_order_id, attempt, e)
+                last_exc = e
+                continue
+            if found is not None:
+                logger.info("order %s found after unknown result: orderId=%s status=%s", client_order_id, found.get("orderId"), found.get("status"))
+                return found
+        try:
+            return create_order(
+                symbol, side, order_type, quantity=quantity, stop_price=stop_price,
+                reduce_only=reduce_only, client_order_id=client_order_id,
+            )
+        except Exception as e:
+            last_exc = e
+            if isinstance(e, requests.HTTPError) and _error_code(e) in DUPLICATE_CLIENT_ID_CODES:
+                found = _find_order(symbol, client_order_id)
+                if found is not None:
+                    return found
+                raise
+            if not (_status_unknown(e) or _retryable(e)):
+                raise
+            logger.warning("order %s attempt %d failed: %s", client_order_id, attempt + 1, e)
+    # 마지막 전송도 결과 불명이면 한 번 더 조회
+    if last_exc is not None and _status_unknown(last_exc):
+        found = _find_order(symbol, client_order_id)
+        if found is not None:
+            return found
+    raise last_exc
+
+
+# ---------- User data stream (API key only, 서명 없음) ----------
+
+
+def _request_api_key(method: str, path: str) -> dict:
+    r = _send(method, path, headers=_headers(), timeout=15)
+    r.raise_for_status()
+    return r.json()
+
+
+def create_listen_key() -> str:
+    """POST fapi/v1/listenKey. 이미 유효한 키가 있으면 같은 키가 돌아오고 만료(60분)만 연장."""
+    return _request_api_key("POST", "/fapi/v1/listenKey")["listenKey"]
+
+
+def keepalive_listen_key() -> None:
+    """PUT fapi/v1/listenKey. 60분 안에 한 번씩 호출해야 스트림 유지."""
+    _request_api_key("PUT", "/fapi/v1/listenKey")
+
+
+def close_listen_key() -> None:
+    """DELETE fapi/v1/listenKey."""
+    _request_api_key("DELETE", "/fapi/v1/listenKey")
@@ -16,6 +16,7 @@ BOT_B_STATUS_KEY = "bot_b_status"  # RUNNING / PAUSED / NO-TRADE
 _bot_b_position: dict | None = None
 _bot_b_logs: list[dict] = []
 _MAX_LOGS = 20
+_revision = 0  # 포지션/로그가 바뀔 때마다 +1 → live_state 지문에 포함 (응답 캐시·SSE 무효화)
 
 
 def _now_ms() -> int:
@@ -24,9 +25,10 @@ def _now_ms() -> int:
 
 def append_log(log_type: str, msg: str) -> None:
     """Decision log 추가 (최근 20개 유지)."""
-    global _bot_b_logs
+    global _bot_b_logs, _revision
     _bot_b_logs.append({"time": _now_ms(), "type": log_type, "msg": msg})
     _bot_b_logs = _bot_b_logs[-_MAX_LOGS:]
+    _revision += 1
 
 
 def get_logs() -> list[dict]:
@@ -34,14 +36,19 @@ def get_logs() -> list[dict]:
 
 
 def set_position(pos: dict | None) -> None:
-    global _bot_b_position
+    global _bot_b_position, _revision
     _bot_b_position = pos
+    _revision += 1
 
 
 def get_position() -> dict | None:
     return _bot_b_position
 
 
+def revision() -> int:
+    return _revision
+
+
 def get_risk_from_db(db: Session) -> dict:
     """app_settings에서 bot_b_risk 읽기. 없으면 기본값."""
     from app.models import AppSetting
@@ -3,7 +3,7 @@ DB에 저장된 캔들 테이블(예: btc4h)에서 klines 로드.
 btc4h: (symbol, openTime, o, h, l, c, v, closeTime, createdAt)
 """
 from sqlalchemy import text
-from app.database import engine
+from app.database import get_engine
 
 # symbol + tf → 테이블명 (필요 시 확장)
 TABLE_MAP = {
@@ -15,6 +15,15 @@ TABLE_MAP = {
     ("ethusdt", "1h"): "eth1h",
     ("ETHUSDT", "4h"): "eth4h",
     ("ethusdt", "4h"): "eth4h",
+    # 하위 TF (intrabar 스탑 체결 시뮬레이션용)
+    ("BTCUSDT", "1m"): "btc1m",
+    ("btcusdt", "1m"): "btc1m",
+    ("BTCUSDT", "15m"): "btc15m",
+    ("btcusdt", "15m"): "btc15m",
+    ("ETHUSDT", "1m"): "eth1m",
+    ("ethusdt", "1m"): "eth1m",
+    ("ETHUSDT", "15m"): "eth15m",
+    ("ethusdt", "15m"): "eth15m",
 }
 
 
@@ -38,7 +47,7 @@ def load_klines_from_db(symbol: str, tf: str, limit: int | None = None) -> list[
 
     # 테이블의 symbol 컬럼 값 (대문자 통일: BTCUSDT, ETHUSDT 등)
     sym_val = symbol.upper()
-    with engine.connect() as conn:
+    with get_engine().connect() as conn:
         sql = f"SELECT openTime, o, h, l, c, v FROM {table} WHERE symbol = :sym ORDER BY openTime ASC"
         if limit:
             sql += f" LIMIT {int(limit)}"
@@ -56,3 +65,41 @@ def load_klines_from_db(symbol: str, tf: str, limit: int | None = None) -> list[
         }
         for row in rows
     ]
+
+
+def iter_klines_from_db(
+    symbol: str,
+    tf: str,
+    start_time: int | None = None,
+    end_time: int | None = None,
+    chunk_size: int = 10000,
+):
+    """
+    openTime 오름차순으로 [start_time, end_time) 구간 캔들을 하나씩 yield.
+    서버사이드 커서(stream_results)로 chunk_size씩 가져오므로 1m 수년치도 전체를 메모리에 올리지 않음.
+    """
+    table = get_table_name(symbol, tf)
+    if not table:
+        raise ValueError(f"Unknown symbol/tf for DB table: {symbol} {tf}. TABLE_MAP에 추가하세요.")
+
+    sql = f"SELECT openTime, o, h, l, c, v FROM {table} WHERE symbol = :sym"
+    bind: dict = {"sym": symbol.upper()}
+    if start_time is not None:
+        sql += " AND openTime >= :start"
+        bind["start"] = int(start_time)
+    if end_time is not None:
+        sql += " AND openTime < :end"
+        bind["end"] = int(end_time)
+    sql += " ORDER BY openTime ASC"
+
+    with get_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(text(sql), bind)
+        for row in result:
+            yield {
+                "open_time": int(row[0]),
+                "o": float(row[1]),
+                "h": float(row[2]),
+                "l": float(row[3]),
+                "c": float(row[4]),
+                "v": float(row[5]),
+            }
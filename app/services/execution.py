@@ -1,6 +1,11 @@
 """
 Order execution: MARKET entry, MARKET reduceOnly exit.
 Uses trade_enabled; applies Binance filters and risk-based quantity.
+관리자 모드로 분기: LIVE → Binance 주문, PAPER → paper_exec (로컬 체결), BACKTEST → 주문 없음.
+청산은 현재 모드가 아니라 포지션을 연 모드(positions.mode)를 따름.
+LIVE 잔고·포지션 조회는 user data stream 미러(user_stream.mirror)가 살아 있으면 미러, 아니면 REST.
+LIVE 주문은 결정적 clientOrderId(tb-{event_id}-{entry|stop|exit})로 submit_order → 타임아웃 뒤 조회 후 재시도 (이중 주문 없음).
+진입·청산 경로의 Binance 호출(잔고·마크·필터 조회 포함)은 가중치 제한에서 ORDER 우선순위 (rate_limit).
 """
 import logging
 import time
@@ -14,11 +19,16 @@ from app.services.binance_client import (
     get_mark_price,
     set_leverage,
     set_margin_type,
-    create_order,
+    submit_order,
+    client_order_id,
 )
 from app.services.risk import compute_quantity, round_price
 from app.services.binance_client import get_symbol_filters
 from app.services.telegram_notify import notify_order
+from app.services.admin_state import get_mode, MODE_LIVE, MODE_PAPER
+from app.services.paper_exec import paper_entry, paper_exit
+from app.services.rate_limit import PRIORITY_ORDER, priority
+from app.services.user_stream import mirror
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +52,7 @@ def _ensure_margin_and_leverage(symbol: str, leverage: int) -> None:
         logger.warning("set_leverage: %s", e)
 
 
+@priority(PRIORITY_ORDER)
 def execute_entry(
     db: Session,
     symbol: str,
@@ -52,13 +63,24 @@ def execute_entry(
     position_multiplier: float = 1.0,
     filter_state: str = "NORMAL",
     filter_reason_ko: str = "정상 진입",
+    event_id: int | None = None,
 ) -> bool:
     """Execute MARKET entry (BUY for LONG, SELL for SHORT). Returns True if order sent.
     position_multiplier: Adaptive Filter 배율 (0.5 / 1.0 / 1.3).
-    filter_reason_ko: 진입 사유 한글 (로그/기록용)."""
+    filter_reason_ko: 진입 사유 한글 (로그/기록용).
+    event_id: clientOrderId 생성용 (같은 이벤트 재처리·재시도에도 같은 ID)."""
     if not get_trade_enabled():
         logger.info("Trade disabled; skip entry %s %s", symbol, side)
         return False
+    mode = get_mode(db)
+    if mode == MODE_PAPER:
+        return paper_entry(
+            db, symbol, side, indicators, params,
+            position_multiplier=position_multiplier, filter_state=filter_state, filter_reason_ko=filter_reason_ko,
+        )
+    if mode != MODE_LIVE:
+        logger.info("Mode %s; skip entry %s %s", mode, symbol, side)
+        return False
     if not get_settings().binance_api_secret:
         logger.warning("No BINANCE_API_SECRET; skip entry")
         return False
@@ -67,7 +89,9 @@ def execute_entry(
     if not atr_val:
         logger.warning("No ATR for entry")
         return False
-    equity = _equity_usdt(get_account())
+    equity = mirror.balance_usdt()
+    if equity is None:
+        equity = _equity_usdt(get_account())
     if equity <= 0:
         logger.warning("Zero equity")
         return False
@@ -87,10 +111,11 @@ def execute_entry(
 
     _ensure_margin_and_leverage(symbol, leverage)
     order_side = "BUY" if side == "LONG" else "SELL"
+    cid = client_order_id(event_id, "entry")
     try:
-        res = create_order(symbol, order_side, "MARKET", quantity=qty)
+        res = submit_order(symbol, order_side, "MARKET", cid, quantity=qty)
     except Exception as e:
-        logger.exception("create_order entry failed: %s", e)
+        logger.exception("create_order entry failed (clientOrderId=%s): %s", cid, e)
         return False
 
     order_id = res.get("orderId")
@@ -99,7 +124,7 @@ def execute_entry(
     avg_price = float(res.get("avgPrice", 0) or res.get("price", 0) or mark)
     executed_qty = float(res.get("executedQty", 0) or qty)
 
-    db.add(Order(order_id=order_id_int, type="MARKET", side=order_side, qty=executed_qty, price=avg_price, status=status, raw=res, symbol=symbol))
+    db.add(Order(order_id=order_id_int, client_order_id=cid, type="MARKET", side=order_side, qty=executed_qty, price=avg_price, status=status, raw=res, symbol=symbol))
 
     stop_mult = params.get("stop_mult", 2.0)
     atr_val = indicators.get("ATR") or 0
@@ -115,25 +140,40 @@ def execute_entry(
         pos.size = executed_qty
         pos.entry_price = avg_price
         pos.stop_price = stop_price_val
+        pos.mode = MODE_LIVE
         pos.updated_at = now_ms
     else:
-        db.add(Position(symbol=symbol, side=side, size=executed_qty, entry_price=avg_price, stop_price=stop_price_val, updated_at=now_ms))
+        db.add(Position(symbol=symbol, side=side, size=executed_qty, entry_price=avg_price, stop_price=stop_price_val, mode=MODE_LIVE, updated_at=now_ms))
     db.commit()
     notify_order(symbol, side, "MARKET", executed_qty, avg_price, str(order_id or ""))
-    _place_stop_order(symbol, side, executed_qty, avg_price, indicators, params)
+    _place_stop_order(db, symbol, side, executed_qty, avg_price, indicators, params, client_order_id(event_id, "stop"))
     logger.info("Entry filled: %s %s qty=%s avg=%s orderId=%s [Filter State: %s] [진입 사유: %s]", symbol, side, executed_qty, avg_price, order_id, filter_state, filter_reason_ko)
     return True
 
 
-def execute_exit(db: Session, symbol: str, side: str) -> tuple[bool, float | None]:
-    """Execute MARKET reduceOnly exit. Position size from Binance. Returns (success, pnl_pct for adaptive filter)."""
+@priority(PRIORITY_ORDER)
+def execute_exit(db: Session, symbol: str, side: str, *, event_id: int | None = None) -> tuple[bool, float | None]:
+    """Execute MARKET reduceOnly exit. Position size from Binance. Returns (success, pnl_pct for adaptive filter).
+    event_id: clientOrderId 생성용 (없으면 수동 청산으로 보고 시각 기반 ID)."""
     if not get_trade_enabled():
         logger.info("Trade disabled; skip exit %s %s", symbol, side)
         return False, None
+    row = db.query(Position).filter(Position.symbol == symbol).first()
+    open_mode = row.mode if row and row.size and float(row.size) > 0 else None
+    mode = open_mode or get_mode(db)
+    if mode == MODE_PAPER:
+        return paper_exit(db, symbol, side)
+    if mode != MODE_LIVE:
+        logger.info("Mode %s; skip exit %s %s", mode, symbol, side)
+        return False, None
     if not get_settings().binance_api_secret:
         return False, None
 
-    positions = get_position_risk(symbol)
+    mirrored = mirror.position(symbol)
+    if mirrored is not None:
+        positions = [{"symbol": symbol, "positionAmt": mirrored[0], "entryPrice": mirrored[1]}]
+    else:
+        positions = get_position_risk(symbol)
     pos_amt = 0.0
     entry_price_from_binance = None
     for p in positions:
@@ -157,17 +197,18 @@ def execute_exit(db: Session, symbol: str, side: str) -> tuple[bool, float | Non
     entry_price = float(pos_row.entry_price) if pos_row and pos_row.entry_price is not None else entry_price_from_binance or 0.0
 
     order_side = "SELL" if side == "LONG" else "BUY"
+    cid = client_order_id(event_id, "exit")
     try:
-        res = create_order(symbol, order_side, "MARKET", quantity=pos_amt, reduce_only=True)
+        res = submit_order(symbol, order_side, "MARKET", cid, quantity=pos_amt, reduce_only=True)
     except Exception as e:
-        logger.exception("create_order exit failed: %s", e)
+        logger.exception("create_order exit failed (clientOrderId=%s): %s", cid, e)
         return False, None
 
     order_id = res.get("orderId")
     order_id_int = int(order_id) if order_id is not None else None
     status = res.get("status", "")
     exit_avg = float(res.get("avgPrice", 0) or res.get("price", 0) or 0)
-    db.add(Order(order_id=order_id_int, type="MARKET", side=order_side, qty=pos_amt, price=None, status=status, raw=res, symbol=symbol))
+    db.add(Order(order_id=order_id_int, client_order_id=cid, type="MARKET", side=order_side, qty=pos_amt, price=exit_avg or None, status=status, raw=res, symbol=symbol))
     _clear_position_db(db, symbol)
     db.commit()
     notify_order(symbol, side, "MARKET", pos_amt, 0, str(order_id or ""))
@@ -182,14 +223,16 @@ def execute_exit(db: Session, symbol: str, side: str) -> tuple[bool, float | Non
 
 
 def _place_stop_order(
+    db: Session,
     symbol: str,
     side: str,
     quantity: float,
     entry_avg: float,
     indicators: dict,
     params: dict,
+    cid: str,
 ) -> None:
-    """Place STOP_MARKET reduceOnly stop-loss after entry."""
+    """Place STOP_MARKET reduceOnly stop-loss after entry (orders에 clientOrderId와 함께 기록)."""
     atr_val = indicators.get("ATR")
     stop_mult = params.get("stop_mult", 2.0)
     if not atr_val or atr_val <= 0:
@@ -203,17 +246,24 @@ def _place_stop_order(
     stop_price = round_price(stop_price, filters["tickSize"])
     order_side = "SELL" if side == "LONG" else "BUY"
     try:
-        res = create_order(
+        res = submit_order(
             symbol,
             order_side,
             "STOP_MARKET",
+            cid,
             quantity=quantity,
             stop_price=stop_price,
             reduce_only=True,
         )
-        logger.info("Stop order placed: %s %s stopPrice=%s orderId=%s", symbol, side, stop_price, res.get("orderId"))
+        order_id = res.get("orderId")
+        db.add(Order(
+            order_id=int(order_id) if order_id is not None else None, client_order_id=cid, type="STOP_MARKET",
+            side=order_side, qty=quantity, price=None, status=res.get("status", ""), raw=res, symbol=symbol,
+        ))
+        db.commit()
+        logger.info("Stop order placed: %s %s stopPrice=%s orderId=%s", symbol, side, stop_price, order_id)
     except Exception as e:
-        logger.exception("Stop order failed: %s", e)
+        logger.exception("Stop order failed (clientOrderId=%s): %s", cid, e)
 
 
 def _clear_position_db(db: Session, symbol: str) -> None:
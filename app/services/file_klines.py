@@ -0,0 +1,246 @@
+"""
+로컬 파일 캔들 소스 (DB/네트워크 없이 백테스트·스윕용).
+- .bin: 자체 컬럼형 바이너리 (헤더 + 컬럼 6개 + 희소 인덱스). mmap으로 열어 복사 없이 읽음.
+- .csv: 헤더 open_time,o,h,l,c,v (또는 Binance 덤프 형식: 헤더 없이 openTime, open, high, low, close, volume, ...)
+- .parquet: pyarrow 설치 시에만 (open_time/o/h/l/c/v 또는 open/high/low/close/volume 컬럼)
+반환 형식은 load_klines_from_db와 동일: [{"open_time": ms, "o", "h", "l", "c", "v"}, ...]
+
+.bin 레이아웃 (little-endian):
+  헤더  magic "TBKLINE1", version, ncols, index_stride, count, symbol, tf, 컬럼 오프셋 6개, 인덱스 오프셋/개수
+  컬럼  open_time int64[count], o/h/l/c/v float64[count] (각 8바이트 정렬)
+  인덱스 index_stride 봉마다 open_time (구간 조회 시 open_time 컬럼 전체를 훑지 않고 시작 위치 탐색)
+
+CLI:
+  python -m app.services.file_klines convert eth4h.csv eth4h.bin --symbol ETHUSDT --tf 4h
+  python -m app.services.file_klines export-db ETHUSDT 4h eth4h.bin
+"""
+import argparse
+import csv
+import mmap
+import struct
+from array import array
+from bisect import bisect_right
+from itertools import islice
+from typing import Iterable, Iterator
+
+MAGIC = b"TBKLINE1"
+VERSION = 1
+COLUMNS = ("open_time", "o", "h", "l", "c", "v")
+INDEX_STRIDE = 4096
+_HEADER = struct.Struct("<8sHHIQ16s8s6QQQ")
+
+
+class BinKlines:
+    """mmap으로 연 .bin 캔들 파일. 컬럼은 memoryview (복사 없음)."""
+
+    def __init__(self, path: str):
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = _HEADER.unpack_from(self._mm, 0)
+        magic, version, ncols, stride, count, symbol, tf = header[:7]
+        if magic != MAGIC or version != VERSION or ncols != len(COLUMNS):
+            self.close()
+            raise ValueError(f"Not a kline .bin file (v{VERSION}): {path}")
+        col_offsets = header[7:13]
+        index_offset, index_count = header[13], header[14]
+        self.count = count
+        self.index_stride = stride
+        self.symbol = symbol.rstrip(b"\0").decode()
+        self.tf = tf.rstrip(b"\0").decode()
+        mv = memoryview(self._mm)
+        self.open_time = mv[col_offsets[0] : col_offsets[0] + 8 * count].cast("q")
+        self.o, self.h, self.l, self.c, self.v = (
+            mv[off : off + 8 * count].cast("d") for off in col_offsets[1:]
+        )
+        self.index = mv[index_offset : index_offset + 8 * index_count].cast("q")
+
+    def close(self) -> None:
+        for name in ("open_time", "o", "h", "l", "c", "v", "index"):
+            col = getattr(self, name, None)
+            if col is not None:
+                col.release()
+        self._mm.close()
+        self._f.close()
+
+    def __enter__(self) -> "BinKlines":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def position(self, open_time: int) -> int:
+        """open_time 이상인 첫 행 위치. 희소 인덱스로 블록을 찾고 블록 안만 이진 탐색."""
+        block = max(0, bisect_right(self.index, open_time) - 1)
+        lo = block * self.index_stride
+        hi = min(self.count, lo + self.index_stride + 1)
+        ot = self.open_time
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ot[mid] < open_time:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def rows(self, start: int = 0, stop: int | None = None) -> Iterator[dict]:
+        stop = self.count if stop is None else min(stop, self.count)
+        ot, o, h, l, c, v = self.open_time, self.o, self.h, self.l, self.c, self.v
+        for i in range(start, stop):
+            yield {"open_time": ot[i], "o": o[i], "h": h[i], "l": l[i], "c": c[i], "v": v[i]}
+
+
+def write_klines_bin(path: str, klines: Iterable[dict], symbol: str = "", tf: str = "") -> int:
+    """캔들을 .bin으로 저장 (open_time 오름차순 가정). 저장한 봉 수 반환."""
+    cols = [array("q")] + [array("d") for _ in COLUMNS[1:]]
+    for k in klines:
+        cols[0].append(int(k["open_time"]))
+        for col, name in zip(cols[1:], COLUMNS[1:]):
+            col.append(float(k[name]))
+    count = len(cols[0])
+    index = array("q", cols[0][::INDEX_STRIDE])
+
+    offset = _HEADER.size + (-_HEADER.size % 8)
+    col_offsets = []
+    for _ in COLUMNS:
+        col_offsets.append(offset)
+        offset += 8 * count
+    index_offset = offset
+
+    header = _HEADER.pack(
+        MAGIC, VERSION, len(COLUMNS), INDEX_STRIDE, count,
+        symbol.upper().encode()[:16], tf.lower().encode()[:8],
+        *col_offsets, index_offset, len(index),
+    )
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(b"\0" * (col_offsets[0] - _HEADER.size))
+        for col in cols:
+            col.tofile(f)
+        index.tofile(f)
+    return count
+
+
+def _iter_csv(path: str) -> Iterator[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            return
+        if first[0].strip().lstrip("-").isdigit():
+            # 헤더 없음 → Binance 덤프 순서 (openTime, open, high, low, close, volume, ...)
+            idx = list(range(6))
+            rows = _chain_first(first, reader)
+        else:
+            names = [n.strip().lower() for n in first]
+            aliases = {
+                "open_time": ("open_time", "opentime", "timestamp", "time"),
+                "o": ("o", "open"),
+                "h": ("h", "high"),
+                "l": ("l", "low"),
+                "c": ("c", "close"),
+                "v": ("v", "volume"),
+            }
+            idx = []
+            for col in COLUMNS:
+                match = next((names.index(a) for a in aliases[col] if a in names), None)
+                if match is None:
+                    raise ValueError(f"CSV에 {col} 컬럼 없음: {path}")
+                idx.append(match)
+            rows = reader
+        for row in rows:
+            if not row:
+                continue
+            yield {
+                "open_time": int(float(row[idx[0]])),
+                "o": float(row[idx[1]]),
+                "h": float(row[idx[2]]),
+                "l": float(row[idx[3]]),
+                "c": float(row[idx[4]]),
+                "v": float(row[idx[5]]),
+            }
+
+
+def _chain_first(first: list, rest: Iterator[list]) -> Iterator[list]:
+    yield first
+    yield from rest
+
+
+def _iter_parquet(path: str, chunk_size: int) -> Iterator[dict]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("parquet 읽기에는 pyarrow 필요 (pip install pyarrow)")
+    pf = pq.ParquetFile(path)
+    names = set(pf.schema_arrow.names)
+    short = all(n in names for n in COLUMNS)
+    src = COLUMNS if short else ("open_time", "open", "high", "low", "close", "volume")
+    for batch in pf.iter_batches(batch_size=chunk_size, columns=list(src)):
+        cols = [batch.column(i).to_pylist() for i in range(len(src))]
+        for ot, o, h, l, c, v in zip(*cols):
+            yield {"open_time": int(ot), "o": float(o), "h": float(h), "l": float(l), "c": float(c), "v": float(v)}
+
+
+def iter_klines_from_file(
+    path: str,
+    start_time: int | None = None,
+    end_time: int | None = None,
+    chunk_size: int = 10000,
+) -> Iterator[dict]:
+    """
+    파일에서 [start_time, end_time) 구간 캔들을 하나씩 yield (파일 전체를 리스트로 올리지 않음).
+    .bin은 희소 인덱스로 시작 위치를 바로 찾고, csv/parquet는 순차로 읽으며 걸러냄.
+    """
+    lower = path.lower()
+    if lower.endswith(".bin"):
+        with BinKlines(path) as bk:
+            start = bk.position(start_time) if start_time is not None else 0
+            stop = bk.position(end_time) if end_time is not None else None
+            yield from bk.rows(start, stop)
+        return
+    if lower.endswith(".csv"):
+        rows = _iter_csv(path)
+    elif lower.endswith(".parquet"):
+        rows = _iter_parquet(path, chunk_size)
+    else:
+        raise ValueError(f"지원하지 않는 캔들 파일 형식: {path} (.bin / .csv / .parquet)")
+    for k in rows:
+        if start_time is not None and k["open_time"] < start_time:
+            continue
+        if end_time is not None and k["open_time"] >= end_time:
+            return
+        yield k
+
+
+def load_klines_from_file(path: str, limit: int | None = None) -> list[dict]:
+    """파일 캔들 전체(또는 앞 limit개)를 openTime 오름차순 리스트로."""
+    rows = iter_klines_from_file(path)
+    return list(islice(rows, limit) if limit else rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="캔들 파일 변환 (.csv/.parquet/DB → .bin)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    conv = sub.add_parser("convert", help="csv/parquet → .bin")
+    conv.add_argument("src")
+    conv.add_argument("dst")
+    conv.add_argument("--symbol", default="")
+    conv.add_argument("--tf", default="")
+    exp = sub.add_parser("export-db", help="DB 캔들 테이블(TABLE_MAP) → .bin")
+    exp.add_argument("symbol")
+    exp.add_argument("tf")
+    exp.add_argument("dst")
+    args = parser.parse_args()
+
+    if args.cmd == "convert":
+        n = write_klines_bin(args.dst, iter_klines_from_file(args.src), args.symbol, args.tf)
+    else:
+        from app.services.db_klines import iter_klines_from_db
+        n = write_klines_bin(args.dst, iter_klines_from_db(args.symbol, args.tf), args.symbol, args.tf)
+    print(f"{n}봉 저장: {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 Server-side indicators: Donchian, EMA, DMI (+DI, -DI, ADX), ATR.
 Calculated on closed candles only; last value applies to the bar that just closed.
 """
+from collections import deque
 from typing import Sequence
 
 
@@ -234,3 +235,94 @@ def compute_all(
         "high": last["h"],
         "low": last["l"],
     }
+
+
+class IndicatorStream:
+    """
+    compute_all의 증분 버전: 봉을 하나씩 update()하면 compute_all(지금까지 전체 봉)과 동일한 dict 반환.
+    - EMA는 SMA 시드 후 재귀식 그대로 누적 (compute_all과 연산 순서 동일 → 값 동일).
+    - Donchian/DMI/ATR은 필요한 최근 N봉 창만 유지해 기존 함수로 계산.
+    전체 봉 리스트를 들고 있지 않으므로 봉 수와 무관하게 메모리 일정 (스트리밍 백테스트용).
+    """
+
+    def __init__(
+        self,
+        *,
+        ema_len: int = 200,
+        entry_len: int = 20,
+        exit_len: int = 20,
+        dmi_len: int = 14,
+        atr_len: int = 14,
+    ):
+        self.ema_len = ema_len
+        self.entry_len = entry_len
+        self.exit_len = exit_len
+        self.dmi_len = dmi_len
+        self.atr_len = atr_len
+        # offset=1 지표까지 포함한 최소 창 + ATR의 첫 TR(i==0) 분기에 걸리지 않도록 여유 1봉
+        self.window_len = max(entry_len + 1, exit_len + 1, 2 * dmi_len + 3, atr_len + 2, 32) + 1
+        self.window: deque = deque(maxlen=self.window_len)
+        self.count = 0
+        self.ema_seed_sum = 0
+        self.ema_val: float | None = None
+        self.ema_prev: float | None = None
+
+    def update(self, candle: dict) -> dict:
+        """봉 1개 추가 후 해당 봉 기준 지표 반환 (compute_all과 같은 키)."""
+        self.push(candle)
+        return self.snapshot()
+
+    def push(self, candle: dict) -> None:
+        """봉 1개 추가 (EMA 누적 + 창 갱신만). 워밍업 구간은 snapshot 없이 push만 하면 됨."""
+        self.window.append(candle)
+        self.count += 1
+        x = candle["c"]
+        if self.count <= self.ema_len:
+            self.ema_seed_sum += x
+            if self.count == self.ema_len:
+                self.ema_val = self.ema_seed_sum / self.ema_len
+        else:
+            k = 2.0 / (self.ema_len + 1)
+            self.ema_prev = self.ema_val
+            self.ema_val = x * k + self.ema_val * (1 - k)
+
+    def state(self) -> dict:
+        """체크포인트용 상태 (JSON 직렬화 가능). load_state로 복원하면 이어서 push해도 결과 동일."""
+        return {
+            "count": self.count,
+            "ema_seed_sum": self.ema_seed_sum,
+            "ema_val": self.ema_val,
+            "ema_prev": self.ema_prev,
+            "window": list(self.window),
+        }
+
+    def load_state(self, state: dict) -> None:
+        self.count = state["count"]
+        self.ema_seed_sum = state["ema_seed_sum"]
+        self.ema_val = state["ema_val"]
+        self.ema_prev = state["ema_prev"]
+        self.window = deque(state["window"], maxlen=self.window_len)
+
+    def snapshot(self) -> dict:
+        """마지막으로 push한 봉 기준 지표."""
+        candles = list(self.window)
+        last = candles[-1]
+        plus_di, minus_di, adx = dmi_adx(candles, di_length=self.dmi_len, adx_smoothing=self.dmi_len, offset=0)
+        _, _, adx_prev = dmi_adx(candles, di_length=self.dmi_len, adx_smoothing=self.dmi_len, offset=1)
+        return {
+            "ema200": self.ema_val,
+            "ema200_prev": self.ema_prev,
+            "hiEntry": donchian_high(candles, self.entry_len, offset=1),
+            "loEntry": donchian_low(candles, self.entry_len, offset=1),
+            "hiExit": donchian_high(candles, self.exit_len, offset=1),
+            "loExit": donchian_low(candles, self.exit_len, offset=1),
+            "plusDI": plus_di,
+            "minusDI": minus_di,
+            "ADX": adx,
+            "ADX_prev": adx_prev,
+            "ATR": atr(candles, length=self.atr_len, offset=0),
+            "ATR_30": atr(candles, length=30, offset=0),
+            "close": last["c"],
+            "high": last["h"],
+            "low": last["l"],
+        }
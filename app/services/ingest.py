@@ -1,8 +1,54 @@
+"""
+봉 마감 이벤트 큐잉 (웹훅·kline WS 공용).
+- dedup: uk_events_dedup(dedupKey) 기준 INSERT IGNORE 1문장 (sqlite는 ON CONFLICT DO NOTHING). 동시 재시도도 IntegrityError 없이 1건
+- 최근 dedupKey는 프로세스 메모리 LRU(webhook_dedup_cache_size)에 기억 → TradingView 재전송 폭주는 DB 조회 없이 duplicate
+- 일괄(POST /webhook/bulk): dedupKey IN (...) 조회 1번으로 이미 있는 키를 거르고 나머지를 multi-row INSERT IGNORE
+"""
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models import Event
 from app.config import get_settings
 
 EVENT_CANDLE_CLOSED = "CANDLE_CLOSED"
+BULK_CHUNK = 1000  # IN (...)·multi-row VALUES 한 문장당 최대 키 수
+
+
+class RecentKeys:
+    """최근 dedupKey LRU (스레드 안전). DB가 최종 기준이고, 여기 있으면 이미 큐잉된 키."""
+
+    def __init__(self):
+        self._keys: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def seen(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._keys:
+                return False
+            self._keys.move_to_end(key)
+            self.hits += 1
+            return True
+
+    def add(self, key: str) -> None:
+        size = get_settings().webhook_dedup_cache_size
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > size:
+                self._keys.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+
+recent_keys = RecentKeys()
 
 
 def dedup_key(symbol: str, tf: str, close_time: int) -> str:
@@ -24,8 +70,9 @@ def enqueue_event(
     close_time: int,
     raw: dict,
 ) -> Event | None:
+    """이벤트 1건 큐잉. 이미 있는 dedupKey면 None (LRU 적중이면 DB 왕복 없음, 아니면 INSERT 1문장)."""
     dk = dedup_key(symbol, tf, close_time)
-    if is_duplicate(db, dk):
+    if recent_keys.seen(dk):
         return None
     event = Event(
         symbol=symbol,
@@ -35,7 +82,88 @@ def enqueue_event(
         raw=raw if isinstance(raw, dict) else {"raw": str(raw)},
         status="pending",
     )
-    db.add(event)
+    inserted = _insert_ignore(db, event)
+    recent_keys.add(dk)
+    return event if inserted else None
+
+
+def enqueue_events(db: Session, items: list[dict]) -> int:
+    """
+    여러 건을 INSERT IGNORE 1문장으로 큐잉 (webhook_wal flusher). items: symbol, tf, close_time, raw, received_at(선택).
+    새로 들어간 건수 반환. commit 포함.
+    """
+    rows = []
+    for item in items:
+        event = Event(
+            symbol=item["symbol"],
+            tf=item["tf"],
+            close_time=item["close_time"],
+            dedup_key=dedup_key(item["symbol"], item["tf"], item["close_time"]),
+            raw=item["raw"] if isinstance(item.get("raw"), dict) else {"raw": str(item.get("raw"))},
+            status="pending",
+            **({"received_at": item["received_at"]} if item.get("received_at") else {}),
+        )
+        rows.append(_values(event))
+    if not rows:
+        return 0
+    result = db.execute(_insert_ignore_stmt(db, rows))
     db.commit()
-    db.refresh(event)
-    return event
+    for row in rows:
+        recent_keys.add(row["dedup_key"])
+    return result.rowcount or 0
+
+
+def enqueue_bulk(db: Session, items: list[dict]) -> tuple[list[str], list[str]]:
+    """
+    일괄 큐잉 (봉 재처리 백필). items: symbol, tf, close_time, raw. (queued dedupKey, duplicate dedupKey) 반환.
+    요청 안 중복·events에 이미 있는 키는 duplicate. 나머지는 BULK_CHUNK개씩 SELECT 1번 + INSERT IGNORE 1번.
+    """
+    unique: dict[str, dict] = {}
+    duplicates: list[str] = []
+    for item in items:
+        dk = dedup_key(item["symbol"], item["tf"], item["close_time"])
+        if dk in unique:
+            duplicates.append(dk)
+        else:
+            unique[dk] = item
+    keys = list(unique)
+    queued: list[str] = []
+    for i in range(0, len(keys), BULK_CHUNK):
+        chunk = keys[i:i + BULK_CHUNK]
+        existing = {k for (k,) in db.query(Event.dedup_key).filter(Event.dedup_key.in_(chunk)).all()}
+        fresh = [k for k in chunk if k not in existing]
+        duplicates.extend(k for k in chunk if k in existing)
+        if fresh:
+            enqueue_events(db, [unique[k] for k in fresh])  # 조회와 INSERT 사이에 들어온 키도 IGNORE로 1건
+            queued.extend(fresh)
+    for k in duplicates:
+        recent_keys.add(k)
+    return queued, duplicates
+
+
+def _values(event: Event) -> dict:
+    return {attr.key: getattr(event, attr.key) for attr in Event.__mapper__.column_attrs if attr.key != "id"}
+
+
+def _insert_ignore_stmt(db: Session, rows: list[dict]):
+    values = rows[0] if len(rows) == 1 else rows  # 1건은 단일 VALUES (inserted_primary_key 사용)
+    dialect = db.get_bind().dialect.name
+    if dialect in ("mysql", "mariadb"):
+        return mysql_insert(Event).values(values).prefix_with("IGNORE")
+    if dialect == "sqlite":
+        return sqlite_insert(Event).values(values).on_conflict_do_nothing(index_elements=["dedupKey"])
+    return insert(Event).values(values)
+
+
+def _insert_ignore(db: Session, event: Event) -> bool:
+    """uk_events_dedup 충돌이면 무시. 새로 들어갔으면 event.id 채우고 True. commit 포함."""
+    try:
+        result = db.execute(_insert_ignore_stmt(db, [_values(event)]))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    if not result.rowcount:
+        return False
+    event.id = result.inserted_primary_key[0]
+    return True
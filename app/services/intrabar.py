@@ -0,0 +1,84 @@
+"""
+Intrabar 스탑 체결 시뮬레이션 (백테스트 고정밀 모드).
+- 상위 TF(4h) 봉 아래의 하위 TF(1m/15m) 캔들로 스탑이 봉 중 실제로 닿았는지, 어느 시점에 닿았는지 판단.
+- 청산 채널은 봉 마감(close) 기준이므로, 봉 중 스탑이 닿았다면 항상 채널 청산보다 먼저 발생.
+- 체결가: 스탑가. 단, 하위 봉 시가가 이미 스탑을 넘어 갭으로 열렸으면 시가 체결 (max_gap_bps로 상한).
+- 하위 캔들은 dict 리스트 대신 array 컬럼으로 보관, 상위 봉 i → 하위 구간 [starts[i], ends[i]) 인덱스.
+  (1m 1년 ≈ 52만 봉 × 32바이트 ≈ 17MB)
+"""
+from array import array
+from typing import Iterable
+
+
+def tf_to_ms(tf: str) -> int:
+    """'1m' / '15m' / '4h' / '1d' → 봉 길이(ms)."""
+    tf = (tf or "4h").lower()
+    unit = tf[-1]
+    n = int(tf[:-1] or "1")
+    if unit == "m":
+        return n * 60 * 1000
+    if unit == "h":
+        return n * 3600 * 1000
+    if unit == "d":
+        return n * 86400 * 1000
+    raise ValueError(f"Unsupported tf: {tf}")
+
+
+class IntrabarIndex:
+    """상위 TF 봉별 하위 TF 캔들 구간 인덱스 + 스탑 체결 판정."""
+
+    def __init__(self, htf_open_times: Iterable[int], htf_bar_ms: int, ltf_klines: Iterable[dict]):
+        self.open_time = array("q")
+        self.o = array("d")
+        self.h = array("d")
+        self.l = array("d")
+        for k in ltf_klines:
+            self.open_time.append(int(k["open_time"]))
+            self.o.append(float(k["o"]))
+            self.h.append(float(k["h"]))
+            self.l.append(float(k["l"]))
+
+        # 두 포인터로 상위 봉 [t, t + bar_ms) 에 속하는 하위 봉 구간 계산 (둘 다 openTime 오름차순)
+        self.starts = array("q")
+        self.ends = array("q")
+        n = len(self.open_time)
+        j = 0
+        for t in htf_open_times:
+            while j < n and self.open_time[j] < t:
+                j += 1
+            start = j
+            end_t = t + htf_bar_ms
+            while j < n and self.open_time[j] < end_t:
+                j += 1
+            self.starts.append(start)
+            self.ends.append(j)
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    def has_slice(self, i: int) -> bool:
+        """상위 봉 i 아래 하위 캔들이 있으면 True (없으면 상위 봉 기준 기존 방식으로 처리)."""
+        return i < len(self.starts) and self.ends[i] > self.starts[i]
+
+    def stop_fill(self, i: int, side: str, stop_price: float, max_gap_bps: float = 50.0) -> tuple[float, int] | None:
+        """
+        상위 봉 i 안에서 스탑이 처음 닿은 하위 봉을 찾아 (체결가, 하위 봉 openTime) 반환. 미도달이면 None.
+        - 롱: low <= stop. 시가가 이미 stop 아래(갭 하락)면 시가 체결, 단 stop × (1 - max_gap_bps) 아래로는 안 감.
+        - 숏: high >= stop. 시가가 이미 stop 위(갭 상승)면 시가 체결, 단 stop × (1 + max_gap_bps) 위로는 안 감.
+        """
+        gap = max_gap_bps / 10000
+        if side == "LONG":
+            floor_px = stop_price * (1 - gap)
+            for j in range(self.starts[i], self.ends[i]):
+                if self.l[j] <= stop_price:
+                    o = self.o[j]
+                    fill = max(o, floor_px) if o < stop_price else stop_price
+                    return fill, self.open_time[j]
+            return None
+        cap_px = stop_price * (1 + gap)
+        for j in range(self.starts[i], self.ends[i]):
+            if self.h[j] >= stop_price:
+                o = self.o[j]
+                fill = min(o, cap_px) if o > stop_price else stop_price
+                return fill, self.open_time[j]
+        return None
@@ -0,0 +1,237 @@
+"""
+Binance kline WebSocket 수집 (TradingView 웹훅 대신/병행하는 저지연 봉 마감 이벤트).
+- kline_stream_pairs("ETHUSDT:4h,BTCUSDT:1h")를 combined stream {binance_ws_url}/stream?streams=ethusdt@kline_4h/... 로 구독
+- 마감 봉(k.x=true) → candles 저장 + 웹훅과 같은 dedupKey(symbol_tf_closeTime)로 Event 큐잉 (TV 알림과 겹쳐도 1건)
+  raw에 마감 봉을 그대로 넣고(source=kline_stream), worker는 candles에 연속 봉이 충분하면 REST klines 조회 없이 처리
+- 연결(재연결)마다 갭 백필: 저장된 마지막 봉 이후(없으면 kline_stream_backfill_bars개)를 REST로 채움.
+  끊긴 동안 마감된 봉은 가장 최근 1개가 LATE_EVENT_MS(5분) 안에 마감됐을 때만 Event로 큐잉 (지난 봉으로 뒤늦게 주문하지 않게)
+- 끊기면 지수 백오프(최대 60초) 후 재연결. 로컬 테스트는 fake_binance의 WS /stream + /_fake/kline_replay, /_fake/drop_streams
+
+실행: worker가 kline_stream_enabled=true면 같이 띄움. 단독: python -m app.services.kline_stream
+"""
+import argparse
+import asyncio
+import json
+import logging
+import threading
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal, init_db
+from app.models import Candle
+from app.services.binance_client import TF_TO_INTERVAL, get_klines
+from app.services.ingest import enqueue_event
+from app.services.intrabar import tf_to_ms
+from app.services.time_sync import clock
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "kline_stream"
+MAX_BACKOFF_S = 60.0
+REST_PAGE = 1500
+LATE_EVENT_MS = 5 * 60 * 1000  # 백필한 봉을 Event로 큐잉하는 마감 후 최대 경과
+
+
+def parse_pairs(spec: str) -> list[tuple[str, str]]:
+    """'ETHUSDT:4h, BTCUSDT:1h' → [("ETHUSDT", "4h"), ("BTCUSDT", "1h")]."""
+    pairs = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        symbol, _, tf = item.strip().partition(":")
+        pairs.append((symbol.strip().upper(), (tf.strip() or "4h").lower()))
+    return pairs
+
+
+def stream_name(symbol: str, tf: str) -> str:
+    return f"{symbol.lower()}@kline_{TF_TO_INTERVAL.get(tf, tf)}"
+
+
+def _row_to_kline(row: list) -> dict:
+    return {"open_time": int(row[0]), "o": float(row[1]), "h": float(row[2]), "l": float(row[3]), "c": float(row[4]), "v": float(row[5])}
+
+
+def _ws_to_kline(k: dict) -> dict:
+    return {"open_time": int(k["t"]), "o": float(k["o"]), "h": float(k["h"]), "l": float(k["l"]), "c": float(k["c"]), "v": float(k["v"])}
+
+
+def save_candle(db: Session, symbol: str, tf: str, kline: dict) -> None:
+    """candles upsert (symbol, tf, openTime). commit은 호출 측."""
+    row = db.query(Candle).filter(Candle.symbol == symbol, Candle.tf == tf, Candle.open_time == kline["open_time"]).first()
+    if row is None:
+        row = Candle(symbol=symbol, tf=tf, open_time=kline["open_time"])
+        db.add(row)
+    row.o, row.h, row.l, row.c, row.v = kline["o"], kline["h"], kline["l"], kline["c"], kline["v"]
+
+
+def last_stored_open(db: Session, symbol: str, tf: str) -> int | None:
+    row = (
+        db.query(Candle.open_time)
+        .filter(Candle.symbol == symbol, Candle.tf == tf)
+        .order_by(Candle.open_time.desc())
+        .first()
+    )
+    return int(row[0]) if row else None
+
+
+def stored_klines(db: Session, symbol: str, tf: str, limit: int, close_time: int) -> list[dict] | None:
+    """
+    close_time 봉까지 마감 봉 limit개를 candles에서 (오름차순). 중간에 빠진 봉이 있거나 모자라면 None → REST 폴백.
+    마지막 원소 = close_time 봉. worker는 REST 폴백도 closed_window로 같은 창을 만듦 (어느 경로든 같은 지표).
+    """
+    bar_ms = tf_to_ms(tf)
+    last_open = close_time + 1 - bar_ms
+    rows = (
+        db.query(Candle)
+        .filter(Candle.symbol == symbol, Candle.tf == tf, Candle.open_time <= last_open)
+        .order_by(Candle.open_time.desc())
+        .limit(limit)
+        .all()
+    )
+    if len(rows) < limit or int(rows[0].open_time) != last_open:
+        return None
+    rows.reverse()
+    if int(rows[-1].open_time) - int(rows[0].open_time) != (limit - 1) * bar_ms:
+        return None
+    return [
+        {"open_time": int(r.open_time), "o": float(r.o), "h": float(r.h), "l": float(r.l), "c": float(r.c), "v": float(r.v)}
+        for r in rows
+    ]
+
+
+def on_closed_kline(db: Session, symbol: str, tf: str, kline: dict, close_time: int, enqueue: bool = True):
+    """마감 봉 1개: candles 저장 + Event 큐잉 (중복이면 None)."""
+    save_candle(db, symbol, tf, kline)
+    db.commit()
+    if not enqueue:
+        return None
+    return enqueue_event(db, symbol, tf, close_time, {"source": SOURCE, "symbol": symbol, "tf": tf, "time": close_time, "kline": kline})
+
+
+def backfill(db: Session, symbol: str, tf: str, enqueue_latest: bool = True) -> int:
+    """
+    저장된 마지막 봉 이후 ~ 현재까지 마감 봉을 REST로 채움 (없으면 kline_stream_backfill_bars개). 저장 봉 수 반환.
+    enqueue_latest: 채운 봉 중 가장 최근 마감 봉이 LATE_EVENT_MS 안에 마감된 것이면 Event 큐잉.
+    """
+    bar_ms = tf_to_ms(tf)
+    interval = TF_TO_INTERVAL.get(tf, tf)
+    now = clock.now_ms()
+    current_open = now // bar_ms * bar_ms  # 진행 중인 봉
+    last = last_stored_open(db, symbol, tf)
+    start = last + bar_ms if last is not None else current_open - get_settings().kline_stream_backfill_bars * bar_ms
+    saved = 0
+    newest: dict | None = None
+    while start < current_open:
+        raw = get_klines(symbol, interval, limit=REST_PAGE, start_time=start, end_time=current_open - 1)
+        closed = [r for r in raw if int(r[0]) < current_open]
+        if not closed:
+            break
+        for row in closed:
+            save_candle(db, symbol, tf, _row_to_kline(row))
+        db.commit()
+        saved += len(closed)
+        newest = closed[-1]
+        start = int(closed[-1][0]) + bar_ms
+    if saved:
+        logger.info("kline backfill %s %s: %d bars", symbol, tf, saved)
+    if enqueue_latest and newest is not None and now - int(newest[6]) <= LATE_EVENT_MS:
+        enqueue_event(db, symbol, tf, int(newest[6]), {"source": SOURCE, "symbol": symbol, "tf": tf, "time": int(newest[6]), "kline": _row_to_kline(newest), "backfill": True})
+    return saved
+
+
+def _with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+def handle_message(db: Session, message: dict, pairs: dict[str, tuple[str, str]]):
+    """combined stream 메시지 1개 처리. 마감 봉이면 on_closed_kline 결과(Event|None), 아니면 None."""
+    data = message.get("data") or message
+    k = data.get("k")
+    if not k or not k.get("x"):
+        return None
+    pair = pairs.get(message.get("stream", "")) or pairs.get(stream_name(k["s"], k["i"]))
+    if pair is None:
+        return None
+    symbol, tf = pair
+    event = on_closed_kline(db, symbol, tf, _ws_to_kline(k), int(k["T"]))
+    if event is not None:
+        logger.info("kline closed %s %s %s → event %s", symbol, tf, k["T"], event.id)
+    return event
+
+
+async def run(stop: threading.Event | None = None, pairs: list[tuple[str, str]] | None = None) -> None:
+    """끊기면 재연결(+갭 백필)하며 계속 구독. stop이 set되면 종료."""
+    import websockets
+
+    stop = stop or threading.Event()
+    pairs = pairs or parse_pairs(get_settings().kline_stream_pairs)
+    by_stream = {stream_name(symbol, tf): (symbol, tf) for symbol, tf in pairs}
+    url = f"{get_settings().binance_ws_url.rstrip('/')}/stream?streams={'/'.join(by_stream)}"
+    backoff = 1.0
+    while not stop.is_set():
+        try:
+            async with websockets.connect(url, ping_interval=60, ping_timeout=30) as ws:
+                # 구독 먼저, 백필 나중: 그 사이 마감된 봉은 양쪽에서 와도 upsert·dedupKey로 1번
+                for symbol, tf in pairs:
+                    await asyncio.to_thread(_with_session, backfill, symbol, tf)
+                logger.info("Kline stream connected: %s", ", ".join(by_stream))
+                backoff = 1.0
+                while not stop.is_set():
+                    try:
+                        msg = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        continue
+                    await asyncio.to_thread(_with_session, handle_message, json.loads(msg), by_stream)
+        except Exception as e:
+            logger.warning("Kline stream error: %s (retry in %.0fs)", e, backoff)
+        if not stop.is_set():
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF_S)
+
+
+_thread: threading.Thread | None = None
+_stop = threading.Event()
+
+
+def start() -> threading.Thread | None:
+    """worker 프로세스에서 백그라운드 스레드로 시작 (kline_stream_enabled=false거나 pairs 없으면 None)."""
+    global _thread
+    s = get_settings()
+    if not s.kline_stream_enabled or not parse_pairs(s.kline_stream_pairs):
+        return None
+    if _thread and _thread.is_alive():
+        return _thread
+    _stop.clear()
+    _thread = threading.Thread(target=lambda: asyncio.run(run(_stop)), name="kline-stream", daemon=True)
+    _thread.start()
+    return _thread
+
+
+def stop(timeout: float = 5.0) -> None:
+    _stop.set()
+    if _thread:
+        _thread.join(timeout=timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binance kline WS 수집 (봉 마감 → candles + Event)")
+    parser.add_argument("--pairs", default=None, help="SYMBOL:tf 쉼표 구분 (기본: KLINE_STREAM_PAIRS)")
+    parser.add_argument("--backfill-only", action="store_true", help="갭 백필만 하고 종료")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    pairs = parse_pairs(args.pairs or get_settings().kline_stream_pairs)
+    if args.backfill_only:
+        for symbol, tf in pairs:
+            print(symbol, tf, _with_session(backfill, symbol, tf, False))
+        return
+    asyncio.run(run(pairs=pairs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+대시보드 실시간 푸시 (SSE) 허브. 뷰어가 N명이어도 토픽 상태 계산·직렬화는 변경 1번에 1번.
+- 토픽: dashboard(A봇), b(B봇, symbol·tf별), admin(통합 관리자). 빌더는 각 라우터가 register()로 등록
+- 변경 감지: worker는 별도 프로세스라 DB 지문(fingerprint)을 live_poll_interval_s마다 조회
+  (signals 최신 id, orders/events 최근 id·status, positions, bar_indicators 최신 id, app_settings, 활성 파라미터, 현재 1h 봉)
+  + 이 프로세스 인메모리 상태 리비전 (B봇 포지션·로그, bot_b_state.revision).
+  지문이 같으면 아무것도 계산하지 않음. 관리자 제어(POST /admin/control/...)는 notify()로 바로 재조회
+- 지문이 바뀌면 구독 중인 토픽만 다시 계산 → 직전 상태와 최상위 키 단위로 비교해 바뀐 키만 diff로 전송
+- 새 구독자는 캐시된 마지막 상태를 snapshot으로 받음 (토픽이 처음 열릴 때만 계산)
+- SSE 메시지: event: snapshot (data=전체 상태) / event: diff (data={"set": {...}, "unset": [...]}), id=토픽 seq
+- state_version(): 지문 해시. 응답 캐시(response_cache)가 같은 값을 무효화 기준으로 씀 (허브가 돌면 허브 조회 결과 재사용)
+"""
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import time
+from decimal import Decimal
+from typing import Any, Callable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import AppSetting, BarIndicator, Event, Order, ParamSet, Position, Signal
+from app.services import bot_b_state
+
+logger = logging.getLogger(__name__)
+
+RECENT_ROWS = 50  # A봇 대시보드가 보여주는 최근 행 수 (status 변경도 감지)
+BAR_SLOT_MS = 3600 * 1000  # 스냅샷 없이 직접 계산하는 토픽도 봉마다 갱신되게
+QUEUE_SIZE = 16  # 구독자별 대기 메시지. 넘치면 비우고 snapshot 1개로 대체 (느린 뷰어)
+
+
+def fingerprint(db: Session) -> tuple:
+    """대시보드 상태가 바뀌었는지 판단하는 값 (인덱스 조회만)."""
+    def recent(model):
+        return tuple(tuple(r) for r in db.query(model.id, model.status).order_by(model.id.desc()).limit(RECENT_ROWS).all())
+
+    return (
+        db.query(func.max(Signal.id)).scalar(),
+        recent(Order),
+        recent(Event),
+        tuple(tuple(r) for r in db.query(Position.symbol, Position.side, Position.size, Position.updated_at).order_by(Position.symbol).all()),
+        db.query(func.max(BarIndicator.id)).scalar(),
+        tuple(tuple(r) for r in db.query(AppSetting.key, AppSetting.value).order_by(AppSetting.key).all()),
+        tuple(tuple(r) for r in db.query(ParamSet.id, ParamSet.updated_at).filter(ParamSet.active == True).order_by(ParamSet.id).all()),  # noqa: E712
+        int(time.time() * 1000) // BAR_SLOT_MS,
+        bot_b_state.revision(),  # DB 밖 상태 (B봇 대시보드의 포지션·로그)
+    )
+
+
+_version: tuple[float, str] = (0.0, "")  # (만료 time.monotonic, 버전)
+
+
+def _set_version(fp: tuple) -> str:
+    global _version
+    v = hashlib.sha1(repr(fp).encode()).hexdigest()[:16]
+    _version = (time.monotonic() + get_settings().live_poll_interval_s, v)
+    return v
+
+
+def state_version(db: Session) -> str:
+    """대시보드 상태 버전 (fingerprint 해시). live_poll_interval_s 동안은 조회 없이 마지막 값."""
+    expires, v = _version
+    if v and time.monotonic() < expires:
+        return v
+    return _set_version(fingerprint(db))
+
+
+def diff(old: dict, new: dict) -> dict | None:
+    """최상위 키 단위 diff. 같으면 None."""
+    changed = {k: v for k, v in new.items() if k not in old or old[k] != v}
+    removed = [k for k in old if k not in new]
+    if not changed and not removed:
+        return None
+    return {"set": changed, "unset": removed}
+
+
+def _json_default(o: Any):
+    if isinstance(o, Decimal):
+        return float(o)  # FastAPI 응답과 같은 표현
+    return str(o)
+
+
+def _normalize(state: dict) -> dict:
+    """응답 JSON과 같은 값으로 (Decimal 등) → diff 비교가 직렬화 결과 기준."""
+    return json.loads(json.dumps(state, default=_json_default))
+
+
+def sse_message(event: str, data: dict, seq: int) -> str:
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+class _Topic:
+    def __init__(self, name: str, params: dict):
+        self.name = name
+        self.params = params
+        self.state: dict | None = None
+        self.seq = 0
+        self.snapshot_msg = ""
+        self.queues: set[asyncio.Queue] = set()
+        self.lock = asyncio.Lock()
+
+
+class Hub:
+    def __init__(self):
+        self._builders: dict[str, tuple[Callable, dict]] = {}
+        self._topics: dict[tuple, _Topic] = {}
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._fingerprint: tuple | None = None
+        self._closed = False
+        self.stats = {"polls": 0, "changes": 0, "builds": 0, "sent": 0, "resyncs": 0}
+
+    def register(self, name: str, builder: Callable, params: dict | None = None) -> None:
+        """토픽 빌더 등록. params: 토픽을 나누는 인자와 기본값. builder(db=..., **params) → dict (async 함수면 await, 아니면 스레드풀)."""
+        self._builders[name] = (builder, dict(params or {}))
+
+    def topics(self) -> list[str]:
+        return list(self._builders)
+
+    def key(self, name: str, params: dict) -> tuple:
+        _, defaults = self._builders[name]
+        return (name,) + tuple(params.get(p) or default for p, default in defaults.items())
+
+    async def _build(self, topic: _Topic) -> dict:
+        builder, defaults = self._builders[topic.name]
+        kwargs = {p: topic.params.get(p) or default for p, default in defaults.items()}
+        db = SessionLocal()
+        try:
+            if inspect.iscoroutinefunction(builder):
+                state = await builder(db=db, **kwargs)
+            else:
+                state = await asyncio.to_thread(lambda: builder(db=db, **kwargs))
+        finally:
+            await asyncio.to_thread(db.close)
+        self.stats["builds"] += 1
+        return _normalize(state)
+
+    def _publish(self, topic: _Topic, msg: str) -> None:
+        for q in topic.queues:
+            try:
+                q.put_nowait(msg)
+            except asyncio.QueueFull:
+                # 느린 뷰어: 밀린 diff 버리고 현재 상태 전체로 다시 맞춤
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(topic.snapshot_msg)
+                self.stats["resyncs"] += 1
+            self.stats["sent"] += 1
+
+    async def _refresh(self, topic: _Topic) -> None:
+        async with topic.lock:
+            await self._update(topic)
+
+    async def _update(self, topic: _Topic) -> None:
+        try:
+            state = await self._build(topic)
+        except Exception as e:
+            logger.warning("live_state build %s failed: %s", topic.name, e)
+            return
+        if topic.state is None:
+            change = None
+        else:
+            change = diff(topic.state, state)
+            if change is None:
+                return
+        topic.seq += 1
+        topic.state = state
+        topic.snapshot_msg = sse_message("snapshot", state, topic.seq)
+        self._publish(topic, sse_message("diff", change, topic.seq) if change else topic.snapshot_msg)
+
+    async def subscribe(self, name: str, params: dict | None = None) -> tuple[tuple, asyncio.Queue]:
+        """구독 시작: (토픽 키, 큐). 큐 첫 메시지는 snapshot. 끝나면 unsubscribe(키, 큐)."""
+        params = params or {}
+        key = self.key(name, params)
+        topic = self._topics.get(key)
+        if topic is None:
+            topic = self._topics[key] = _Topic(name, params)
+        if topic.state is None:
+            async with topic.lock:
+                if topic.state is None:
+                    await self._update(topic)  # 처음 열린 토픽만 계산 (동시에 들어온 구독자는 lock 뒤에서 캐시 사용)
+        topic = self._topics.setdefault(key, topic)  # 계산 중 마지막 구독자가 나가 토픽이 지워졌으면 다시 등록
+        q: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        if topic.state is not None:
+            q.put_nowait(topic.snapshot_msg)
+        topic.queues.add(q)  # snapshot 다음에 등록 → diff가 snapshot보다 먼저 오지 않음
+        self._ensure_running()
+        return key, q
+
+    def unsubscribe(self, key: tuple, q: asyncio.Queue) -> None:
+        topic = self._topics.get(key)
+        if topic is None:
+            return
+        topic.queues.discard(q)
+        if not topic.queues:
+            self._topics.pop(key, None)
+
+    def notify(self) -> None:
+        """상태가 바뀌었음을 알림 (관리자 제어 등). 아무 스레드에서나 호출 가능, 버전을 버리고 다음 조회를 바로 실행."""
+        global _version
+        _version = (0.0, "")
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._closed = False
+        self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        """구독 토픽이 있는 동안 지문 조회 → 바뀌면 토픽별 1번 재계산."""
+        while self._topics and not self._closed:
+            self._wake.clear()
+            try:
+                fp = await asyncio.to_thread(_with_session, fingerprint)
+                _set_version(fp)
+                self.stats["polls"] += 1
+                if fp != self._fingerprint:
+                    if self._fingerprint is not None:
+                        self.stats["changes"] += 1
+                    self._fingerprint = fp
+                    for topic in list(self._topics.values()):
+                        await self._refresh(topic)
+            except Exception as e:
+                logger.warning("live_state poll failed: %s", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=get_settings().live_poll_interval_s)
+            except asyncio.TimeoutError:
+                pass
+        self._fingerprint = None
+
+    async def close(self) -> None:
+        """모든 스트림 종료 (API 종료 시). 큐에 None → 스트림 제너레이터가 끝남."""
+        self._closed = True
+        for topic in list(self._topics.values()):
+            for q in topic.queues:
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(None)
+        if self._wake is not None:
+            self._wake.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=5)
+            except Exception:
+                pass
+
+    def state(self) -> dict:
+        return {
+            **self.stats,
+            "topics": [
+                {"topic": ":".join(str(x) for x in key), "subscribers": len(t.queues), "seq": t.seq}
+                for key, t in self._topics.items()
+            ],
+        }
+
+
+def _with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+hub = Hub()
+
+
+async def stream(name: str, params: dict | None = None, is_disconnected: Callable | None = None):
+    """SSE 본문 제너레이터: snapshot → diff들. live_heartbeat_s마다 주석 줄(프록시 유휴 끊김 방지)."""
+    key, q = await hub.subscribe(name, params)
+    heartbeat = get_settings().live_heartbeat_s
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                msg = await asyncio.wait_for(q.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                if is_disconnected is not None and await is_disconnected():
+                    return
+                yield ": ping\n\n"
+                continue
+            if msg is None:
+                return
+            yield msg
+    finally:
+        hub.unsubscribe(key, q)
@@ -0,0 +1,229 @@
+"""
+Paper 실행 엔진 (관리자 모드 PAPER): 거래소 주문 없이 마크가 기준으로 체결을 시뮬레이션.
+- 체결가: 마크가 ± paper_slippage_bps (매수는 위, 매도는 아래 → 항상 불리한 방향)
+- 수수료: 체결 금액 × paper_fee_bps (진입·청산 각 1회), paper 잔고에서 차감
+- 수량: 실전과 동일 (compute_quantity × Adaptive Filter 배율), 자본은 paper 잔고.
+  심볼 필터는 캐시된 exchangeInfo (symbol_filters_ttl_s), 조회 실패면 기본 필터로 계속 체결
+- 기록: orders/positions 테이블에 mode='PAPER'로 저장 (orderId 없음, raw에 체결 상세)
+- 스탑: 진입 시 고정 스탑가를 positions.stopPrice에 저장. worker가 봉 마감 시(고가/저가)와
+  폴링 주기마다(마크가) check_stops를 호출해 판정 (실전은 거래소 STOP_MARKET이 처리)
+- 잔고: app_settings paper_balance (없으면 paper_initial_balance)
+"""
+import logging
+import time
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import AppSetting, Order, Position
+from app.services.binance_client import get_mark_price, get_symbol_filters
+from app.services.risk import compute_quantity
+
+logger = logging.getLogger(__name__)
+
+MODE = "PAPER"
+PAPER_BALANCE_KEY = "paper_balance"
+DEFAULT_FILTERS = {"stepSize": 0.001, "tickSize": 0.01, "minNotional": 0.0}
+
+
+def get_paper_balance(db: Session) -> float:
+    row = db.query(AppSetting).filter(AppSetting.key == PAPER_BALANCE_KEY).first()
+    if row and row.value:
+        return float(row.value)
+    return get_settings().paper_initial_balance
+
+
+def _set_paper_balance(db: Session, balance: float) -> None:
+    row = db.query(AppSetting).filter(AppSetting.key == PAPER_BALANCE_KEY).first()
+    value = f"{balance:.8f}"
+    if row:
+        row.value = value
+    else:
+        db.add(AppSetting(key=PAPER_BALANCE_KEY, value=value))
+
+
+def _fill_price(mark: float, order_side: str) -> float:
+    slip = get_settings().paper_slippage_bps / 10000
+    return mark * (1 + slip) if order_side == "BUY" else mark * (1 - slip)
+
+
+def _fee(notional: float) -> float:
+    return notional * get_settings().paper_fee_bps / 10000
+
+
+def _mark(symbol: str, fallback: float | None = None) -> float | None:
+    try:
+        return get_mark_price(symbol)
+    except Exception as e:
+        logger.warning("paper: mark price failed (%s); fallback=%s", e, fallback)
+        return fallback
+
+
+def _filters(symbol: str) -> dict:
+    try:
+        return get_symbol_filters(symbol)
+    except Exception as e:
+        logger.warning("paper: symbol filters failed (%s); using defaults", e)
+        return DEFAULT_FILTERS
+
+
+def get_paper_position(db: Session, symbol: str) -> Position | None:
+    """열린 PAPER 포지션 (없으면 None)."""
+    row = db.query(Position).filter(Position.symbol == symbol).first()
+    if row and row.mode == MODE and row.size and float(row.size) > 0:
+        return row
+    return None
+
+
+def paper_entry(
+    db: Session,
+    symbol: str,
+    side: str,
+    indicators: dict,
+    params: dict,
+    *,
+    position_multiplier: float = 1.0,
+    filter_state: str = "NORMAL",
+    filter_reason_ko: str = "정상 진입",
+) -> bool:
+    """PAPER MARKET 진입. execute_entry와 같은 수량·스탑 규칙, 체결만 로컬."""
+    atr_val = indicators.get("ATR")
+    if not atr_val:
+        logger.warning("paper: no ATR for entry")
+        return False
+    mark = _mark(symbol, indicators.get("close"))
+    if not mark:
+        return False
+    balance = get_paper_balance(db)
+    if balance <= 0:
+        logger.warning("paper: zero balance")
+        return False
+
+    qty = compute_quantity(symbol, balance, params.get("loss_pct", 0.01), atr_val, params.get("atr_mult", 2.0), mark, filters=_filters(symbol))
+    if not qty or qty <= 0:
+        logger.warning("paper: computed qty invalid: %s", qty)
+        return False
+    qty = qty * position_multiplier
+    if qty <= 0:
+        return False
+
+    order_side = "BUY" if side == "LONG" else "SELL"
+    price = _fill_price(mark, order_side)
+    fee = _fee(qty * price)
+    stop_mult = params.get("stop_mult", 2.0)
+    stop_price = price - stop_mult * atr_val if side == "LONG" else price + stop_mult * atr_val
+
+    now_ms = int(time.time() * 1000)
+    db.add(Order(
+        order_id=None, type="MARKET", side=order_side, qty=qty, price=price, status="FILLED", symbol=symbol, mode=MODE,
+        raw={"paper": True, "mark": mark, "fee": fee, "filter_state": filter_state, "reason_ko": filter_reason_ko},
+    ))
+    pos = db.query(Position).filter(Position.symbol == symbol).first()
+    if pos:
+        pos.side = side
+        pos.size = qty
+        pos.entry_price = price
+        pos.stop_price = stop_price
+        pos.mode = MODE
+        pos.updated_at = now_ms
+    else:
+        db.add(Position(symbol=symbol, side=side, size=qty, entry_price=price, stop_price=stop_price, mode=MODE, updated_at=now_ms))
+    _set_paper_balance(db, balance - fee)
+    db.commit()
+    logger.info("Paper entry: %s %s qty=%s price=%.4f stop=%.4f [Filter State: %s] [진입 사유: %s]", symbol, side, qty, price, stop_price, filter_state, filter_reason_ko)
+    return True
+
+
+def paper_exit(
+    db: Session,
+    symbol: str,
+    side: str,
+    *,
+    price: float | None = None,
+    order_type: str = "MARKET",
+) -> tuple[bool, float | None]:
+    """
+    PAPER 청산 (reduceOnly). price 없으면 마크가 ± 슬리피지로 체결.
+    Returns (success, pnl_pct) — execute_exit와 같은 가격 기준 수익률 (Adaptive Filter용).
+    """
+    pos = get_paper_position(db, symbol)
+    if pos is None or pos.side != side:
+        logger.info("paper: no position to exit %s %s", symbol, side)
+        return True, None
+    order_side = "SELL" if side == "LONG" else "BUY"
+    if price is None:
+        mark = _mark(symbol)
+        if not mark:
+            return False, None
+        price = _fill_price(mark, order_side)
+    qty = float(pos.size)
+    entry = float(pos.entry_price)
+    gross = (price - entry) * qty if side == "LONG" else (entry - price) * qty
+    fee = _fee(qty * price)
+    balance = get_paper_balance(db) + gross - fee
+
+    db.add(Order(
+        order_id=None, type=order_type, side=order_side, qty=qty, price=price, status="FILLED", symbol=symbol, mode=MODE,
+        raw={"paper": True, "reduceOnly": True, "entry": entry, "pnl_usdt": gross - fee, "fee": fee, "balance": balance},
+    ))
+    pos.size = 0
+    pos.entry_price = 0
+    pos.stop_price = None
+    pos.updated_at = int(time.time() * 1000)
+    _set_paper_balance(db, balance)
+    db.commit()
+    pnl_pct = (price - entry) / entry * 100 if side == "LONG" else (entry - price) / entry * 100
+    logger.info("Paper exit: %s %s qty=%s price=%.4f pnl=%.2f%% balance=%.2f (%s)", symbol, side, qty, price, pnl_pct, balance, order_type)
+    return True, pnl_pct
+
+
+def check_stops(
+    db: Session,
+    symbol: str,
+    *,
+    high: float | None = None,
+    low: float | None = None,
+    mark: float | None = None,
+) -> tuple[bool, float | None]:
+    """
+    새 가격으로 PAPER 스탑 판정. 봉 고가/저가(high/low) 또는 마크가(mark)가 스탑을 넘으면 체결.
+    - 봉 기준: 스탑가 ∓ 슬리피지로 체결 (봉 중 닿은 시점의 가격)
+    - 마크가 기준: 이미 스탑을 넘은 마크가 ∓ 슬리피지로 체결 (갭 반영)
+    Returns (stopped, pnl_pct).
+    """
+    pos = get_paper_position(db, symbol)
+    if pos is None or pos.stop_price is None:
+        return False, None
+    stop = float(pos.stop_price)
+    if pos.side == "LONG":
+        if mark is not None and mark <= stop:
+            fill = mark
+        elif low is not None and low <= stop:
+            fill = stop
+        else:
+            return False, None
+        price = _fill_price(fill, "SELL")
+    else:
+        if mark is not None and mark >= stop:
+            fill = mark
+        elif high is not None and high >= stop:
+            fill = stop
+        else:
+            return False, None
+        price = _fill_price(fill, "BUY")
+    ok, pnl_pct = paper_exit(db, symbol, pos.side, price=price, order_type="STOP_MARKET")
+    return ok, pnl_pct
+
+
+def check_stops_at_mark(db: Session) -> list[tuple[str, float | None]]:
+    """열린 PAPER 포지션 전부를 현재 마크가로 스탑 판정 (포지션 없으면 가격 조회 안 함). 체결된 (symbol, pnl_pct) 목록."""
+    rows = db.query(Position).filter(Position.mode == MODE, Position.size > 0, Position.stop_price.isnot(None)).all()
+    stopped = []
+    for row in rows:
+        mark = _mark(row.symbol)
+        if mark is None:
+            continue
+        ok, pnl_pct = check_stops(db, row.symbol, mark=mark)
+        if ok:
+            stopped.append((row.symbol, pnl_pct))
+    return stopped
@@ -22,7 +22,7 @@ DEFAULT_PARAMS = {
 def get_active_params(db) -> dict[str, Any]:
     """Return active param set from DB, or DEFAULT_PARAMS if none."""
     from app.models import ParamSet
-    row = db.query(ParamSet).filter(ParamSet.active == True).first()
+    row = db.query(ParamSet).filter(ParamSet.active == True, ~ParamSet.name.like("shadow:%")).first()
     if row and row.json:
         return {**DEFAULT_PARAMS, **row.json}
     return dict(DEFAULT_PARAMS)
@@ -0,0 +1,231 @@
+"""
+Binance 요청 가중치 제한 (프로세스 공용, binance_client의 모든 REST 호출이 통과).
+- 1분 가중치: 요청 전 예상 가중치를 먼저 잡고(acquire), 응답의 X-MBX-USED-WEIGHT-1M으로 보정(observe).
+  헤더는 IP 전체 사용량이라 API·worker 프로세스가 서로의 사용량을 보게 됨. 분 경계는 서버 시각(time_sync) 기준
+- 우선순위: ORDER(주문·취소, 진입/청산 경로) > CORE(worker 봉 마감 klines, 대사, user stream) > UI(대시보드·관리 화면)
+  우선순위별 사용 상한: ORDER 100%, CORE rate_limit_core_pct, UI rate_limit_ui_pct → 대시보드가 봉 마감 주문 몫을 못 씀
+- 상한 넘으면 ORDER/CORE는 다음 분까지 대기(최대 rate_limit_max_wait_s), UI는 대기 없이 RateLimited (shed).
+  상위 우선순위가 대기 중이면 하위는 상한 안이어도 뒤에 줄 섬
+- 429/418 + Retry-After: 그 시각까지 모든 요청 보류 (보내면 IP 밴이 길어짐)
+- 지표: state() → used/limit, 우선순위별 허용·대기·shed 건수, 밴 (GET /admin/rate-limit)
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import math
+import threading
+import time
+
+from app.config import get_settings
+from app.services import time_sync
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_ORDER = 0
+PRIORITY_CORE = 1
+PRIORITY_UI = 2
+PRIORITY_NAMES = {PRIORITY_ORDER: "order", PRIORITY_CORE: "core", PRIORITY_UI: "ui"}
+
+WEIGHT_HEADER = "X-MBX-USED-WEIGHT-1M"
+
+# 엔드포인트별 가중치 (klines는 limit에 따라 kline_weight)
+ENDPOINT_WEIGHTS = {
+    "/fapi/v1/exchangeInfo": 1,
+    "/fapi/v1/premiumIndex": 1,
+    "/fapi/v1/time": 1,
+    "/fapi/v2/account": 5,
+    "/fapi/v2/positionRisk": 5,
+    "/fapi/v1/order": 1,
+    "/fapi/v1/leverage": 1,
+    "/fapi/v1/marginType": 1,
+    "/fapi/v1/listenKey": 1,
+}
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("binance_priority", default=PRIORITY_CORE)
+
+
+class RateLimited(Exception):
+    """가중치 한도·밴 때문에 요청을 보내지 않음 (거래소엔 도달 안 함 → 재시도 안전)."""
+
+    def __init__(self, message: str, retry_after_s: float):
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+def kline_weight(limit: int) -> int:
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def weight_for(path: str, params: dict | None = None) -> int:
+    params = params or {}
+    if path == "/fapi/v1/klines":
+        return kline_weight(int(params.get("limit", 500)))
+    if path == "/fapi/v1/openOrders":
+        return 1 if params.get("symbol") else 40
+    return ENDPOINT_WEIGHTS.get(path, 1)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextlib.contextmanager
+def priority(level: int):
+    """with priority(PRIORITY_ORDER): 블록 안의 Binance 호출 우선순위 지정 (명시 인자가 있으면 그게 우선)."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class WeightLimiter:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.minute = 0  # 서버 시각 기준 분 (now_ms // 60000)
+        self.used = 0
+        self.last_header: int | None = None
+        self.banned_until = 0.0  # time.time()
+        self.waiting = {p: 0 for p in PRIORITY_NAMES}
+        self.granted = {p: 0 for p in PRIORITY_NAMES}
+        self.delayed = {p: 0 for p in PRIORITY_NAMES}
+        self.shed = {p: 0 for p in PRIORITY_NAMES}
+        self.bans = 0
+
+    def _roll(self, now_ms: int) -> None:
+        minute = now_ms // 60_000
+        if minute != self.minute:
+            self.minute = minute
+            self.used = 0
+            self.last_header = None
+
+    def cap(self, level: int) -> int:
+        s = get_settings()
+        pct = {PRIORITY_ORDER: 100.0, PRIORITY_CORE: s.rate_limit_core_pct, PRIORITY_UI: s.rate_limit_ui_pct}[level]
+        return int(s.rate_limit_weight_1m * pct / 100)
+
+    def _blocked_for(self, weight: int, level: int, now: float, now_ms: int) -> float:
+        """지금 보낼 수 없으면 풀릴 때까지 초, 보낼 수 있으면 0."""
+        if now < self.banned_until:
+            return self.banned_until - now
+        if any(self.waiting[p] for p in PRIORITY_NAMES if p < level):
+            return 0.05
+        if self.used and self.used + weight > self.cap(level):
+            return (60_000 - now_ms % 60_000) / 1000
+        return 0.0
+
+    def _try_acquire(self, weight: int, level: int) -> float:
+        """cond를 잡은 상태에서 호출. 잡았으면 0, 아니면 풀릴 때까지 초."""
+        now_ms = time_sync.clock.now_ms()
+        self._roll(now_ms)
+        blocked = self._blocked_for(weight, level, time.time(), now_ms)
+        if not blocked:
+            self.used += weight
+            self.granted[level] += 1
+        return blocked
+
+    def _shed(self, level: int, blocked: float) -> RateLimited:
+        self.shed[level] += 1
+        reason = "429/418 backoff" if time.time() < self.banned_until else f"weight {self.used}/{self.cap(level)}"
+        return RateLimited(f"binance {reason} ({PRIORITY_NAMES[level]}), retry in {blocked:.1f}s", blocked)
+
+    def _max_wait(self, level: int) -> float:
+        return 0.0 if level == PRIORITY_UI else get_settings().rate_limit_max_wait_s
+
+    def acquire(self, weight: int, level: int) -> None:
+        """weight만큼 이번 분 사용량에 잡음. 한도면 대기(ORDER/CORE) 또는 RateLimited(UI·대기 한도 초과)."""
+        if not get_settings().rate_limit_enabled:
+            return
+        deadline = time.monotonic() + self._max_wait(level)
+        waited = False
+        with self.cond:
+            self.waiting[level] += 1
+            try:
+                while True:
+                    blocked = self._try_acquire(weight, level)
+                    if not blocked:
+                        self.delayed[level] += waited
+                        return
+                    remaining = deadline - time.monotonic()
+                    if blocked > remaining:  # 대기 한도 안에 안 풀림 → 바로 포기
+                        raise self._shed(level, blocked)
+                    waited = True
+                    self.cond.wait(min(remaining, blocked))
+            finally:
+                self.waiting[level] -= 1
+                self.cond.notify_all()
+
+    async def acquire_async(self, weight: int, level: int) -> None:
+        """acquire의 asyncio 버전 (이벤트 루프를 막지 않고 asyncio.sleep으로 대기)."""
+        if not get_settings().rate_limit_enabled:
+            return
+        deadline = time.monotonic() + self._max_wait(level)
+        waited = False
+        with self.cond:
+            self.waiting[level] += 1  # 대기 중인 상위 우선순위 → 하위는 뒤로 (_blocked_for), state()에도 보임
+        try:
+            while True:
+                with self.cond:
+                    blocked = self._try_acquire(weight, level)
+                    if not blocked:
+                        self.delayed[level] += waited
+                        return
+                    remaining = deadline - time.monotonic()
+                    if blocked > remaining:
+                        raise self._shed(level, blocked)
+                waited = True
+                await asyncio.sleep(min(remaining, blocked))
+        finally:
+            with self.cond:
+                self.waiting[level] -= 1
+                self.cond.notify_all()
+
+    def observe(self, response) -> None:
+        """응답 헤더로 사용량 보정, 429/418이면 Retry-After까지 밴."""
+        if not get_settings().rate_limit_enabled:
+            return
+        header = response.headers.get(WEIGHT_HEADER)
+        with self.cond:
+            self._roll(time_sync.clock.now_ms())
+            if header is not None:
+                try:
+                    self.last_header = int(header)
+                    self.used = max(self.used, self.last_header)
+                except ValueError:
+                    pass
+            if response.status_code in (418, 429):
+                try:
+                    retry_after = float(response.headers.get("Retry-After", ""))
+                except ValueError:
+                    retry_after = (60_000 - time_sync.clock.now_ms() % 60_000) / 1000
+                self.banned_until = max(self.banned_until, time.time() + retry_after)
+                self.bans += 1
+                logger.warning("binance %d: backing off %.0fs (used weight %s)", response.status_code, retry_after, header)
+            self.cond.notify_all()
+
+    def state(self) -> dict:
+        with self.cond:
+            self._roll(time_sync.clock.now_ms())
+            now = time.time()
+            return {
+                "used_weight_1m": self.used,
+                "last_header_1m": self.last_header,
+                "limit_1m": get_settings().rate_limit_weight_1m,
+                "caps": {PRIORITY_NAMES[p]: self.cap(p) for p in PRIORITY_NAMES},
+                "banned_for_s": math.ceil(self.banned_until - now) if self.banned_until > now else 0,
+                "bans": self.bans,
+                "granted": {PRIORITY_NAMES[p]: n for p, n in self.granted.items()},
+                "delayed": {PRIORITY_NAMES[p]: n for p, n in self.delayed.items()},
+                "shed": {PRIORITY_NAMES[p]: n for p, n in self.shed.items()},
+                "waiting": {PRIORITY_NAMES[p]: n for p, n in self.waiting.items()},
+            }
+
+
+limiter = WeightLimiter()
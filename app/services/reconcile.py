@@ -0,0 +1,311 @@
+"""
+DB ↔ 거래소 주기 대사 (reconciliation).
+positions/orders는 우리 진입·청산 코드만 갱신하므로, 거래소 스탑 체결·수동 청산·부분 체결이 빠질 수 있음.
+사이클마다 positionRisk / openOrders / account를 한 번에(동시에) 조회해 DB와 비교·복구:
+- positions: 거래소 flat인데 DB LIVE 열림 → 정리 / 거래소 열림인데 DB flat → LIVE 행 생성 /
+  side·size(부분 체결)·entry·stop(열린 STOP_MARKET 기준) 불일치 → 거래소 값으로 갱신.
+  DB에 열린 PAPER 포지션이 있는 심볼은 mode_conflict로 기록만 하고 건드리지 않음
+- orders: DB에서 NEW/PARTIALLY_FILLED인데 거래소 미체결 목록에 없는 LIVE 주문 → 개별 조회로 상태·체결가 갱신
+- 고아 스탑: 포지션 없거나 방향이 안 맞는 reduceOnly/closePosition 스탑 → 취소
+- 요청 가중치 예산(reconcile_weight_budget): positionRisk(5) 필수, openOrders는 예산 되면 전체(40) 아니면 DB에 있는
+  심볼별(1), account(5)는 남으면, 주문 조회·취소(각 1)는 남은 만큼만 (못 한 건 다음 사이클)
+- 지표: 사이클별 drift 종류별 건수·사용 가중치·소요시간 → 메모리 metrics + app_settings reconcile_metrics (GET /admin/reconcile)
+
+worker 유휴 루프에서 reconcile_interval_s마다 maybe_run(). 단독 실행:
+  python -m app.services.reconcile --once [--dry-run]
+"""
+import argparse
+import json
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import AppSetting, Order, Position
+from app.services.binance_client import cancel_order, get_account, get_open_orders, get_order, get_position_risk
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "reconcile_metrics"
+WEIGHT_POSITION_RISK = 5
+WEIGHT_ACCOUNT = 5
+WEIGHT_OPEN_ORDERS_ALL = 40
+WEIGHT_PER_SYMBOL = 1  # openOrders(symbol), order 조회, 취소
+OPEN_STATUSES = ("NEW", "PARTIALLY_FILLED")
+STOP_TYPES = ("STOP_MARKET", "STOP")
+SIZE_TOL = 1e-6  # 상대 오차
+PRICE_TOL = 1e-4  # DB 스탑가는 틱 반올림 전 값이라 틱 이내 차이는 무시
+
+metrics = {"cycles": 0, "drift_total": Counter(), "last": None}
+_last_run = 0.0
+
+
+def _differs(a: float, b: float, tol: float = SIZE_TOL) -> bool:
+    return abs(a - b) > tol * max(abs(a), abs(b), 1e-12)
+
+
+def _is_reducing_stop(order: dict) -> bool:
+    reduce_only = str(order.get("reduceOnly", "false")).lower() == "true"
+    close_position = str(order.get("closePosition", "false")).lower() == "true"
+    return order.get("type") in STOP_TYPES and (reduce_only or close_position)
+
+
+def _fetch(db: Session, budget: int) -> tuple[dict, int]:
+    """예산 안에서 positionRisk / openOrders / account 동시 조회. (data, 사용 가중치)."""
+    used = WEIGHT_POSITION_RISK
+    calls = {"risk": (get_position_risk,)}
+    if used + WEIGHT_OPEN_ORDERS_ALL <= budget:
+        calls["orders"] = (get_open_orders,)
+        used += WEIGHT_OPEN_ORDERS_ALL
+    else:
+        # 전체 조회 예산이 안 되면 DB가 아는 심볼만 (거래소에만 있는 포지션은 이번 사이클에 행이 생기고 다음 사이클에 주문 대사)
+        symbols = {r.symbol for r in db.query(Position).filter(Position.mode == "LIVE", Position.size > 0)}
+        symbols |= {o.symbol for o in db.query(Order).filter(Order.mode == "LIVE", Order.status.in_(OPEN_STATUSES))}
+        for sym in sorted(symbols):
+            if used + WEIGHT_PER_SYMBOL > budget:
+                break
+            calls[f"orders:{sym}"] = (get_open_orders, sym)
+            used += WEIGHT_PER_SYMBOL
+    if used + WEIGHT_ACCOUNT <= budget:
+        calls["account"] = (get_account,)
+        used += WEIGHT_ACCOUNT
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        futures = {k: pool.submit(*c) for k, c in calls.items()}
+        data = {k: f.result() for k, f in futures.items()}
+    open_orders = data.pop("orders", None)
+    fetched_symbols = None  # None = 전체 심볼 조회함
+    if open_orders is None:
+        open_orders, fetched_symbols = [], set()
+        for k in [k for k in data if k.startswith("orders:")]:
+            open_orders.extend(data.pop(k))
+            fetched_symbols.add(k.split(":", 1)[1])
+    data["orders"] = open_orders
+    data["order_symbols"] = fetched_symbols
+    return data, used
+
+
+def reconcile_once(db: Session, *, weight_budget: int | None = None, repair: bool = True) -> dict:
+    """1 사이클. repair=False면 drift만 집계 (DB·거래소 변경 없음, 누적 지표도 안 올림). 사이클 지표 dict 반환."""
+    t0 = time.perf_counter()
+    budget = weight_budget if weight_budget is not None else get_settings().reconcile_weight_budget
+    if budget < WEIGHT_POSITION_RISK:
+        raise ValueError(f"reconcile weight budget {budget} < positionRisk weight {WEIGHT_POSITION_RISK}")
+    data, used = _fetch(db, budget)
+    drift: Counter = Counter()
+    details: list[str] = []
+
+    def note(kind: str, msg: str) -> None:
+        drift[kind] += 1
+        details.append(f"{kind}: {msg}")
+        logger.warning("reconcile %s: %s", kind, msg)
+
+    exch = {}
+    for p in data["risk"]:
+        if p.get("positionSide", "BOTH") != "BOTH":
+            continue
+        amt = float(p.get("positionAmt", 0) or 0)
+        if amt:
+            exch[p["symbol"]] = (amt, float(p.get("entryPrice", 0) or 0))
+    stops: dict[str, list[dict]] = {}
+    for o in data["orders"]:
+        if _is_reducing_stop(o):
+            stops.setdefault(o["symbol"], []).append(o)
+
+    # ---------- positions ----------
+    rows = {r.symbol: r for r in db.query(Position).all()}
+    now_ms = int(time.time() * 1000)
+    for symbol in sorted(set(exch) | {s for s, r in rows.items() if r.size and float(r.size) > 0}):
+        row = rows.get(symbol)
+        row_open = bool(row and row.size and float(row.size) > 0)
+        amt, entry = exch.get(symbol, (0.0, 0.0))
+        if row_open and row.mode != "LIVE":
+            if amt:
+                note("mode_conflict", f"{symbol} exchange amt={amt} but DB has open {row.mode} position")
+            continue
+        if not amt:
+            note("db_open_exchange_flat", f"{symbol} DB {row.side} size={row.size}")
+            if repair:
+                row.size, row.entry_price, row.stop_price, row.updated_at = 0, 0, None, now_ms
+            continue
+        side = "LONG" if amt > 0 else "SHORT"
+        size = abs(amt)
+        stop_orders = [o for o in stops.get(symbol, []) if o["side"] == ("SELL" if side == "LONG" else "BUY")]
+        stop_price = float(stop_orders[0]["stopPrice"]) if stop_orders else None
+        if not row_open:
+            note("exchange_open_db_flat", f"{symbol} exchange {side} {size}@{entry}")
+            if repair:
+                if row is None:
+                    row = Position(symbol=symbol, side=side, size=size, entry_price=entry, stop_price=stop_price, mode="LIVE", updated_at=now_ms)
+                    db.add(row)
+                else:
+                    row.side, row.size, row.entry_price, row.stop_price, row.mode, row.updated_at = side, size, entry, stop_price, "LIVE", now_ms
+            continue
+        changed = False
+        if row.side != side:
+            note("side_mismatch", f"{symbol} DB {row.side} exchange {side}")
+            changed = True
+        if _differs(float(row.size), size):
+            note("size_mismatch", f"{symbol} DB {float(row.size)} exchange {size}")
+            changed = True
+        if entry and _differs(float(row.entry_price or 0), entry, PRICE_TOL):
+            note("entry_mismatch", f"{symbol} DB {float(row.entry_price or 0)} exchange {entry}")
+            changed = True
+        if stop_price is not None and (row.stop_price is None or _differs(float(row.stop_price), stop_price, PRICE_TOL)):
+            note("stop_mismatch", f"{symbol} DB {row.stop_price} exchange {stop_price}")
+            changed = True
+        if changed and repair:
+            row.side, row.size, row.entry_price, row.updated_at = side, size, entry or row.entry_price, now_ms
+            if stop_price is not None:
+                row.stop_price = stop_price
+
+    # ---------- 고아 스탑 취소 ----------
+    for symbol, orders in stops.items():
+        amt = exch.get(symbol, (0.0, 0.0))[0]
+        for o in orders:
+            reduces = (amt > 0 and o["side"] == "SELL") or (amt < 0 and o["side"] == "BUY")
+            if reduces:
+                continue
+            note("orphan_stop", f"{symbol} {o['side']} stop {o.get('stopPrice')} orderId={o['orderId']} (amt={amt})")
+            if repair and used + WEIGHT_PER_SYMBOL <= budget:
+                try:
+                    cancel_order(symbol, int(o["orderId"]))
+                    used += WEIGHT_PER_SYMBOL
+                except Exception as e:
+                    logger.warning("reconcile: cancel %s failed: %s", o["orderId"], e)
+
+    # ---------- orders 상태 ----------
+    open_ids = {int(o["orderId"]) for o in data["orders"]}
+    order_symbols = data["order_symbols"]
+    stale = (
+        db.query(Order)
+        .filter(Order.mode == "LIVE", Order.status.in_(OPEN_STATUSES), Order.order_id.isnot(None))
+        .order_by(Order.id)
+        .all()
+    )
+    for row in stale:
+        if int(row.order_id) in open_ids or (order_symbols is not None and row.symbol not in order_symbols):
+            continue
+        if used + WEIGHT_PER_SYMBOL > budget:
+            break
+        try:
+            res = get_order(row.symbol, int(row.order_id))
+            used += WEIGHT_PER_SYMBOL
+        except Exception as e:
+            logger.warning("reconcile: query order %s failed: %s", row.order_id, e)
+            continue
+        note("order_status", f"{row.symbol} orderId={row.order_id} DB {row.status} exchange {res.get('status')}")
+        if repair:
+            row.status = res.get("status", row.status)
+            avg = float(res.get("avgPrice", 0) or 0)
+            if avg:
+                row.price = avg
+
+    balance = None
+    if "account" in data:
+        balance = next(
+            (float(a.get("walletBalance", 0) or 0) for a in data["account"].get("assets", []) if a.get("asset") == "USDT"), None
+        )
+    cycle = {
+        "at": now_ms,
+        "ms": round((time.perf_counter() - t0) * 1000, 1),
+        "weight": used,
+        "budget": budget,
+        "drift": dict(drift),
+        "details": details,
+        "positions": len(exch),
+        "open_orders": len(data["orders"]),
+        "balance": balance,
+        "repaired": repair,
+    }
+    if not repair:
+        return cycle  # dry-run: 누적 지표·app_settings reconcile_metrics도 그대로 (DB 쓰기 없음)
+    metrics["cycles"] += 1
+    metrics["drift_total"].update(drift)
+    metrics["last"] = cycle
+    _save_metrics(db, cycle)
+    db.commit()
+    return cycle
+
+
+def _save_metrics(db: Session, cycle: dict) -> None:
+    """app_settings(value 256자)에 요약만: 시각, 소요 ms, 가중치, 이번 drift, 누적 사이클·drift 수."""
+    summary = {
+        "at": cycle["at"],
+        "ms": cycle["ms"],
+        "w": cycle["weight"],
+        "d": cycle["drift"],
+        "n": metrics["cycles"],
+        "t": sum(metrics["drift_total"].values()),
+    }
+    value = json.dumps(summary, separators=(",", ":"))
+    if len(value) > 256:
+        summary["d"] = {"total": sum(cycle["drift"].values())}
+        value = json.dumps(summary, separators=(",", ":"))
+    row = db.query(AppSetting).filter(AppSetting.key == METRICS_KEY).first()
+    if row:
+        row.value = value
+    else:
+        db.add(AppSetting(key=METRICS_KEY, value=value))
+
+
+def get_metrics(db: Session) -> dict | None:
+    """마지막 사이클 요약 (다른 프로세스에서 조회용)."""
+    row = db.query(AppSetting).filter(AppSetting.key == METRICS_KEY).first()
+    if not row or not row.value:
+        return None
+    return json.loads(row.value)
+
+
+def maybe_run(force: bool = False) -> dict | None:
+    """reconcile_interval_s 지났으면 1 사이클 (worker 유휴 루프용). API 시크릿 없거나 꺼져 있으면 None."""
+    global _last_run
+    s = get_settings()
+    if not s.reconcile_enabled or not s.binance_api_secret:
+        return None
+    now = time.monotonic()
+    if not force and now - _last_run < s.reconcile_interval_s:
+        return None
+    _last_run = now
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return reconcile_once(db)
+    except Exception as e:
+        db.rollback()
+        logger.exception("reconcile failed: %s", e)
+        return None
+    finally:
+        db.close()
+
+
+def main():
+    from app.database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="DB positions/orders ↔ Binance 대사")
+    parser.add_argument("--once", action="store_true", help="1 사이클만 실행 후 종료")
+    parser.add_argument("--dry-run", action="store_true", help="drift만 출력 (DB·거래소 변경 없음)")
+    parser.add_argument("--interval", type=float, default=None, help="주기 (초, 기본 RECONCILE_INTERVAL_S)")
+    parser.add_argument("--budget", type=int, default=None, help="사이클당 요청 가중치 (기본 RECONCILE_WEIGHT_BUDGET)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    init_db()
+    interval = args.interval or get_settings().reconcile_interval_s
+    while True:
+        db = SessionLocal()
+        try:
+            cycle = reconcile_once(db, weight_budget=args.budget, repair=not args.dry_run)
+            print(json.dumps(cycle, ensure_ascii=False))
+        finally:
+            db.close()
+        if args.once:
+            return
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+대시보드 JSON 응답 캐시 + ETag/조건부 GET (이 API 프로세스 기준).
+- 무효화 기준: live_state.state_version() (신호·주문·이벤트·포지션·bar_indicators·app_settings·파라미터 변경 지문
+  + B봇 인메모리 포지션·로그 리비전).
+  버전 조회는 live_poll_interval_s 동안 재사용 → 반복 폴링은 dict 조회 1번 + (If-None-Match 일치 시) 본문 없는 304
+- 키: 경로 + 정렬된 쿼리. 같은 버전이면 직렬화된 본문을 그대로 재사용 (계산·DB·거래소 호출 없음)
+- ETag = 본문 해시 → 버전이 바뀌어도 내용이 같으면 클라이언트는 계속 304
+- 거래소 캔들로 직접 계산한 응답(worker 스냅샷 없음)은 버전과 무관하게 response_cache_live_ttl_s 뒤 만료
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.services import live_state
+
+MAX_ENTRIES = 256
+
+# key → (version, etag, body, expires(monotonic) | None)
+_entries: "OrderedDict[str, tuple[str, str, bytes, float | None]]" = OrderedDict()
+_lock = threading.Lock()
+stats = {"hits": 0, "not_modified": 0, "misses": 0}
+
+
+def _key(request: Request) -> str:
+    return request.url.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _lookup(key: str, version: str) -> tuple[str, bytes] | None:
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        v, etag, body, expires = entry
+        if v != version or (expires is not None and time.monotonic() >= expires):
+            return None
+        _entries.move_to_end(key)
+        return etag, body
+
+
+def _store(key: str, version: str, body: bytes, live: bool) -> str:
+    etag = _etag(body)
+    expires = time.monotonic() + get_settings().response_cache_live_ttl_s if live else None
+    with _lock:
+        _entries[key] = (version, etag, body, expires)
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return etag
+
+
+def _respond(request: Request, etag: str, body: bytes) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}  # 매번 재검증 (304면 본문 없음)
+    if _matches(request, etag):
+        stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def cached_json(
+    request: Request,
+    db: Session,
+    build: Callable[[], Awaitable[Any]],
+    is_live: Callable[[Any], bool] | None = None,
+) -> Response:
+    """
+    build()를 상태 버전 기준으로 캐시해 JSON 응답. is_live(payload)가 참이면 live TTL 적용.
+    If-None-Match가 현재 ETag와 같으면 304.
+    """
+    version = await run_in_threadpool(live_state.state_version, db)
+    key = _key(request)
+    cached = _lookup(key, version)
+    if cached is not None:
+        stats["hits"] += 1
+        return _respond(request, *cached)
+    stats["misses"] += 1
+    payload = await build()
+    body = JSONResponse(jsonable_encoder(payload)).body
+    etag = _store(key, version, body, bool(is_live and is_live(payload)))
+    return _respond(request, etag, body)
+
+
+def state() -> dict:
+    return {**stats, "entries": len(_entries)}
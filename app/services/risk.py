@@ -37,12 +37,14 @@ def compute_quantity(
     atr: float,
     atr_mult: float,
     mark_price: float,
+    filters: dict | None = None,
 ) -> float | None:
     """
     riskCash = equity_usdt * loss_pct
     stopDistance = atr_mult * atr
     qty = riskCash / stopDistance
     Then apply stepSize floor and minNotional check.
+    filters: 이미 가진 심볼 필터 (없으면 get_symbol_filters).
     """
     if atr <= 0 or mark_price <= 0:
         return None
@@ -51,7 +53,8 @@ def compute_quantity(
     if stop_distance <= 0:
         return None
     qty = risk_cash / stop_distance
-    filters = get_symbol_filters(symbol)
+    if filters is None:
+        filters = get_symbol_filters(symbol)
     step = filters["stepSize"]
     min_notional = filters["minNotional"]
     qty = round_down_step(qty, step)
@@ -0,0 +1,222 @@
+"""
+Shadow 전략 러너: 실전 파라미터 외의 후보 파라미터 세트를 같은 봉·같은 캔들로 평가해 가상 신호와 paper PnL만 기록.
+- 후보: param_sets 중 name이 "shadow:" 로 시작하는 행 (active 여부와 무관, 실전 get_active_params에는 안 잡힘)
+- 지표: 지표 길이(ema/entry/exit/dmi/atr)가 같은 세트끼리 compute_all 1회 공유. 실전과 같으면 실전 지표 재사용
+- 신호: strategy.evaluate + cooldown_bars (Adaptive Filter·관리자 게이트·주문 없음)
+- 체결: 진입은 종가, 청산은 종가(스탑 체결이면 스탑가), 왕복 수수료+슬리피지(paper_fee_bps, paper_slippage_bps) 차감
+- 기록: shadow_signals 테이블 (세트·심볼별 마지막 행이 가상 포지션 상태)
+- 실행: worker가 실전 신호·주문 처리 후 submit() → 전용 스레드 1개에서 별도 세션으로 실행 (실전 지연에 영향 없음)
+"""
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import ParamSet, ShadowSignal
+from app.services.indicators import compute_all
+from app.services.params import DEFAULT_PARAMS
+from app.services.strategy import evaluate, LONG_ENTRY, SHORT_ENTRY, LONG_EXIT, SHORT_EXIT
+
+logger = logging.getLogger(__name__)
+
+SHADOW_PREFIX = "shadow:"
+INDICATOR_KEYS = ("ema_len", "entry_len", "exit_len", "dmi_len", "atr_len")
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def indicator_key(params: dict) -> tuple:
+    """compute_all 결과를 결정하는 파라미터만 (같으면 지표 공유)."""
+    return tuple(params.get(k, DEFAULT_PARAMS[k]) for k in INDICATOR_KEYS)
+
+
+def get_shadow_param_sets(db: Session) -> list[tuple[int, str, dict]]:
+    """(param_set_id, name, params) 목록. name의 "shadow:" 접두어는 뗀 이름."""
+    rows = db.query(ParamSet).filter(ParamSet.name.like(SHADOW_PREFIX + "%")).order_by(ParamSet.id).all()
+    return [(r.id, r.name[len(SHADOW_PREFIX):], {**DEFAULT_PARAMS, **(r.json or {})}) for r in rows]
+
+
+def _last_row(db: Session, param_set_id: int, symbol: str) -> ShadowSignal | None:
+    return (
+        db.query(ShadowSignal)
+        .filter(ShadowSignal.param_set_id == param_set_id, ShadowSignal.symbol == symbol)
+        .order_by(ShadowSignal.close_time.desc(), ShadowSignal.id.desc())
+        .first()
+    )
+
+
+def _in_cooldown(db: Session, param_set_id: int, symbol: str, close_time: int, bar_ms: int, cooldown_bars: int) -> bool:
+    if cooldown_bars <= 0:
+        return False
+    last_exit = (
+        db.query(ShadowSignal)
+        .filter(
+            ShadowSignal.param_set_id == param_set_id,
+            ShadowSignal.symbol == symbol,
+            ShadowSignal.action.in_([LONG_EXIT, SHORT_EXIT]),
+        )
+        .order_by(ShadowSignal.close_time.desc())
+        .first()
+    )
+    if not last_exit:
+        return False
+    return (close_time - int(last_exit.close_time)) < (1 + cooldown_bars) * bar_ms
+
+
+def _round_trip_cost_pct() -> float:
+    s = get_settings()
+    return 2 * (s.paper_fee_bps + s.paper_slippage_bps) / 100
+
+
+def evaluate_shadow_sets(
+    db: Session,
+    symbol: str,
+    tf: str,
+    close_time: int,
+    bar_ms: int,
+    klines: list[dict],
+    *,
+    live_key: tuple | None = None,
+    live_indicators: dict | None = None,
+) -> int:
+    """
+    한 봉에 대해 모든 shadow 세트 평가 후 shadow_signals에 기록. 기록한 행 수 반환.
+    같은 (세트, 심볼, tf, closeTime)이 이미 있으면 건너뜀 (이벤트 재처리에도 한 번만).
+    """
+    sets = get_shadow_param_sets(db)
+    if not sets:
+        return 0
+    cache: dict[tuple, dict] = {}
+    if live_key is not None and live_indicators is not None:
+        cache[live_key] = live_indicators
+    written = 0
+    for param_set_id, name, params in sets:
+        key = indicator_key(params)
+        indicators = cache.get(key)
+        if indicators is None:
+            ema_len, entry_len, exit_len, dmi_len, atr_len = key
+            indicators = cache[key] = compute_all(
+                klines, ema_len=ema_len, entry_len=entry_len, exit_len=exit_len, dmi_len=dmi_len, atr_len=atr_len,
+            )
+
+        last = _last_row(db, param_set_id, symbol)
+        if last is not None and int(last.close_time) >= close_time:
+            continue
+        side = last.position_side if last else None
+        entry = float(last.entry_price) if last and last.entry_price is not None else None
+        stop = float(last.stop_price) if last and last.stop_price is not None else None
+
+        action = evaluate(
+            indicators,
+            side,
+            entry_price=entry,
+            stop_price=stop,
+            adx_min=params["adx_min"],
+            breakout_atr_margin=params["breakout_atr_margin"],
+            use_ema_slope=params["use_ema_slope"],
+            use_adx_rising=params["use_adx_rising"],
+        )
+        close = indicators.get("close")
+        price = close
+        pnl_pct = None
+        if action in (LONG_ENTRY, SHORT_ENTRY):
+            if side is not None or _in_cooldown(db, param_set_id, symbol, close_time, bar_ms, params["cooldown_bars"]):
+                action = "NONE"
+            else:
+                side = "LONG" if action == LONG_ENTRY else "SHORT"
+                entry = close
+                atr_val = indicators.get("ATR") or 0
+                stop = close - params["stop_mult"] * atr_val if side == "LONG" else close + params["stop_mult"] * atr_val
+        elif action in (LONG_EXIT, SHORT_EXIT) and side is not None and entry:
+            stopped = stop is not None and (
+                (side == "LONG" and indicators.get("low") is not None and indicators["low"] <= stop)
+                or (side == "SHORT" and indicators.get("high") is not None and indicators["high"] >= stop)
+            )
+            price = stop if stopped else close
+            move = (price - entry) / entry * 100 if side == "LONG" else (entry - price) / entry * 100
+            pnl_pct = move - _round_trip_cost_pct()
+            side, entry, stop = None, None, None
+
+        db.add(ShadowSignal(
+            param_set_id=param_set_id,
+            name=name,
+            symbol=symbol,
+            tf=tf,
+            close_time=close_time,
+            action=action,
+            price=price,
+            pnl_pct=pnl_pct,
+            position_side=side,
+            entry_price=entry,
+            stop_price=stop,
+        ))
+        written += 1
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        logger.info("shadow: %s %s %s already recorded", symbol, tf, close_time)
+        return 0
+    logger.info("shadow: %s %s close=%s sets=%d indicator_groups=%d", symbol, tf, close_time, written, len(cache))
+    return written
+
+
+def _run(symbol: str, tf: str, close_time: int, bar_ms: int, klines: list[dict], live_key: tuple, live_indicators: dict) -> int:
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return evaluate_shadow_sets(
+            db, symbol, tf, close_time, bar_ms, klines, live_key=live_key, live_indicators=live_indicators,
+        )
+    except Exception as e:
+        logger.exception("shadow evaluation failed: %s", e)
+        return 0
+    finally:
+        db.close()
+
+
+def submit(
+    symbol: str,
+    tf: str,
+    close_time: int,
+    bar_ms: int,
+    klines: list[dict],
+    live_params: dict,
+    live_indicators: dict,
+) -> Future:
+    """백그라운드 스레드에 shadow 평가 예약 (워커 프로세스당 스레드 1개, 봉 순서대로 처리)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+    return _executor.submit(_run, symbol, tf, close_time, bar_ms, klines, indicator_key(live_params), live_indicators)
+
+
+def summarize(db: Session) -> list[dict]:
+    """세트별 누적: 신호 수, 청산 수, 승률, 합계 PnL %, 현재 가상 포지션."""
+    out = []
+    for param_set_id, name, params in get_shadow_param_sets(db):
+        rows = (
+            db.query(ShadowSignal)
+            .filter(ShadowSignal.param_set_id == param_set_id)
+            .order_by(ShadowSignal.close_time, ShadowSignal.id)
+            .all()
+        )
+        pnls = [float(r.pnl_pct) for r in rows if r.pnl_pct is not None]
+        open_positions = {}
+        for r in rows:
+            open_positions[r.symbol] = r.position_side
+        out.append({
+            "id": param_set_id,
+            "name": name,
+            "params": params,
+            "bars": len(rows),
+            "entries": sum(1 for r in rows if r.action in (LONG_ENTRY, SHORT_ENTRY)),
+            "exits": len(pnls),
+            "win_rate": round(sum(1 for p in pnls if p > 0) / len(pnls) * 100, 2) if pnls else None,
+            "total_pnl_pct": round(sum(pnls), 4),
+            "positions": {s: p for s, p in open_positions.items() if p},
+        })
+    return out
@@ -0,0 +1,136 @@
+"""
+Binance 서버 시각 오프셋 추적 (서명 요청 timestamp/recvWindow용).
+- GET /fapi/v1/time을 여러 번 찍어 RTT가 가장 짧은 표본으로 오프셋 계산: offset = serverTime - (보낸 시각 + 받은 시각) / 2
+- binance_client._timestamp()가 로컬 시각 + offset을 씀 → 로컬 시계가 밀려도 -1021 (timestamp outside recvWindow) 없음
+- 동기화돼 있으면 recvWindow를 time_sync_recv_window_ms(기본 5000, RTT가 길면 2×RTT+1000까지)로 좁힘. 동기화 전·오래되면 RECV_WINDOW(10000)
+- 백그라운드 스레드가 time_sync_interval_s마다 재측정. -1021을 받으면 request_resync()로 즉시 재측정
+- 지표: state() → offset_ms, rtt_ms, drift_ms(직전 대비 오프셋 변화), synced_at, syncs, failures, recv_window_ms (GET /admin/time-sync)
+"""
+import logging
+import threading
+import time
+
+import requests
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_RECV_WINDOW = 10000
+SAMPLES = 5
+STALE_FACTOR = 3  # interval × 3 지나도록 재측정 못 하면 동기화 안 된 것으로 봄
+WARN_OFFSET_MS = 1000
+
+
+class TimeSync:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.offset_ms = 0
+        self.rtt_ms: float | None = None
+        self.drift_ms = 0
+        self.synced_at = 0.0  # time.monotonic()
+        self.syncs = 0
+        self.failures = 0
+
+    def now_ms(self) -> int:
+        return int(time.time() * 1000) + self.offset_ms
+
+    def is_synced(self) -> bool:
+        if not self.synced_at:
+            return False
+        return time.monotonic() - self.synced_at < get_settings().time_sync_interval_s * STALE_FACTOR
+
+    def recv_window(self) -> int:
+        if not self.is_synced():
+            return FALLBACK_RECV_WINDOW
+        floor = int(2 * (self.rtt_ms or 0) + 1000)
+        return min(FALLBACK_RECV_WINDOW, max(get_settings().time_sync_recv_window_ms, floor))
+
+    def sync(self, samples: int = SAMPLES) -> int:
+        """표본 samples개 중 최소 RTT로 오프셋 갱신. 새 offset_ms 반환 (전부 실패하면 예외)."""
+        base = get_settings().binance_base_url.rstrip("/")
+        best: tuple[float, int] | None = None
+        last_exc: Exception | None = None
+        for _ in range(samples):
+            t0 = time.time() * 1000
+            try:
+                r = requests.get(f"{base}/fapi/v1/time", timeout=5)
+                r.raise_for_status()
+                server = int(r.json()["serverTime"])
+            except Exception as e:
+                last_exc = e
+                continue
+            t1 = time.time() * 1000
+            rtt = t1 - t0
+            if best is None or rtt < best[0]:
+                best = (rtt, int(server - (t0 + t1) / 2))
+        if best is None:
+            with self.lock:
+                self.failures += 1
+            raise last_exc or RuntimeError("time sync: no samples")
+        rtt, offset = best
+        with self.lock:
+            self.drift_ms = offset - self.offset_ms if self.syncs else 0
+            self.offset_ms = offset
+            self.rtt_ms = round(rtt, 1)
+            self.synced_at = time.monotonic()
+            self.syncs += 1
+        level = logging.WARNING if abs(offset) >= WARN_OFFSET_MS else logging.INFO
+        logger.log(level, "time sync: offset=%dms rtt=%.1fms drift=%dms recvWindow=%d", offset, rtt, self.drift_ms, self.recv_window())
+        return offset
+
+    def state(self) -> dict:
+        with self.lock:
+            return {
+                "synced": self.is_synced(),
+                "offset_ms": self.offset_ms,
+                "rtt_ms": self.rtt_ms,
+                "drift_ms": self.drift_ms,
+                "age_s": round(time.monotonic() - self.synced_at, 1) if self.synced_at else None,
+                "syncs": self.syncs,
+                "failures": self.failures,
+                "recv_window_ms": self.recv_window(),
+            }
+
+
+clock = TimeSync()
+
+_thread: threading.Thread | None = None
+_wake = threading.Event()
+
+
+def request_resync(wait: bool = False) -> None:
+    """
+    -1021 등으로 오프셋이 틀린 게 드러났을 때 재측정.
+    wait=False: 백그라운드 스레드를 깨우고 바로 반환 (스레드 없으면 여기서 측정). wait=True: 여기서 측정 (재전송 직전용).
+    """
+    if not wait and _thread and _thread.is_alive():
+        _wake.set()
+        return
+    try:
+        clock.sync()
+    except Exception as e:
+        logger.warning("time sync failed: %s", e)
+
+
+def _loop() -> None:
+    while True:
+        try:
+            clock.sync()
+        except Exception as e:
+            logger.warning("time sync failed: %s", e)
+        _wake.wait(get_settings().time_sync_interval_s)
+        _wake.clear()
+
+
+def start() -> threading.Thread | None:
+    """주기 측정 스레드 시작 (API 시크릿 없거나 time_sync_enabled=false면 None). 서명 요청을 하는 프로세스(worker, API)마다 1개."""
+    global _thread
+    s = get_settings()
+    if not s.time_sync_enabled or not s.binance_api_secret:
+        return None
+    if _thread and _thread.is_alive():
+        return _thread
+    _thread = threading.Thread(target=_loop, name="time-sync", daemon=True)
+    _thread.start()
+    return _thread
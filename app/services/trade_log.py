@@ -0,0 +1,144 @@
+"""
+백테스트 매매 기록 스트리밍 출력 (실행 중 한 건씩 기록 → 전체 리스트를 메모리에 모아 indent JSON으로 쓰지 않음).
+- .jsonl: 한 줄에 매매 1건 (compact JSON, BacktestEngine trade dict 그대로)
+- .tbt:   고정 길이 바이너리 레코드 (45바이트/건). 문자열 필드(side/action/via/filter_state/reason)는 1바이트 코드
+- 확장자 뒤에 .gz 를 붙이면 gzip 압축 (예: trades.jsonl.gz, trades.tbt.gz)
+- 요약(result dict에서 trades 제외)은 write_summary로 별도 작은 JSON 파일
+
+.tbt 레이아웃 (little-endian):
+  헤더   magic "TBTRADE1"
+  레코드 time int64, action u8, side u8, via u8, filter_state u8, reason u8,
+         price / pnl_pct / balance / position_mult float64 (해당 없는 필드는 NaN)
+"""
+import gzip
+import json
+import math
+import os
+import struct
+from typing import IO, Iterator
+
+from app.services.adaptive_filter import REASON_KO, STATE_NORMAL, STATE_OFF, STATE_STRONG, STATE_WEAK
+
+MAGIC = b"TBTRADE1"
+_RECORD = struct.Struct("<qBBBBBdddd")
+
+ACTIONS = ("entry", "exit")
+SIDES = ("LONG", "SHORT")
+VIAS = ("", "stop", "channel")
+FILTER_STATES = (STATE_OFF, STATE_WEAK, STATE_NORMAL, STATE_STRONG)
+REASONS = tuple(REASON_KO.values())
+UNKNOWN = 255
+NAN = float("nan")
+
+
+def _open(path: str, append: bool) -> IO[bytes]:
+    mode = "ab" if append else "wb"
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, compresslevel=6)
+    return open(path, mode)
+
+
+def _code(values: tuple, value) -> int:
+    try:
+        return values.index(value)
+    except ValueError:
+        return UNKNOWN
+
+
+class JsonlTradeWriter:
+    """매매 1건 = compact JSON 한 줄."""
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        self.count = 0
+        self._f = _open(path, append)
+
+    def write(self, trade: dict) -> None:
+        self._f.write(json.dumps(trade, ensure_ascii=False, separators=(",", ":")).encode() + b"\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "JsonlTradeWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class BinaryTradeWriter(JsonlTradeWriter):
+    """매매 1건 = 고정 길이 레코드 (_RECORD). 이어쓰기(append) 시 헤더는 빈 파일일 때만 기록."""
+
+    def __init__(self, path: str, append: bool = False):
+        empty = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+        super().__init__(path, append)
+        if empty:
+            self._f.write(MAGIC)
+
+    def write(self, trade: dict) -> None:
+        self._f.write(
+            _RECORD.pack(
+                int(trade["time"]),
+                _code(ACTIONS, trade.get("action")),
+                _code(SIDES, trade.get("side")),
+                _code(VIAS, trade.get("via", "")),
+                _code(FILTER_STATES, trade.get("filter_state")),
+                _code(REASONS, trade.get("reason_ko")),
+                trade["price"],
+                trade.get("pnl_pct", NAN),
+                trade.get("balance", NAN),
+                trade.get("position_mult", NAN),
+            )
+        )
+        self.count += 1
+
+
+def open_trade_writer(path: str, append: bool = False) -> JsonlTradeWriter:
+    """확장자로 형식 선택: .jsonl[.gz] / .tbt[.gz]."""
+    base = path[:-3] if path.endswith(".gz") else path
+    if base.endswith(".jsonl"):
+        return JsonlTradeWriter(path, append)
+    if base.endswith(".tbt"):
+        return BinaryTradeWriter(path, append)
+    raise ValueError(f"지원하지 않는 매매 기록 형식: {path} (.jsonl / .tbt, 뒤에 .gz 가능)")
+
+
+def _decode(values: tuple, code: int):
+    return values[code] if code < len(values) else None
+
+
+def read_trades(path: str) -> Iterator[dict]:
+    """open_trade_writer로 쓴 파일을 trade dict로 다시 읽기 (BacktestEngine 형식과 같은 키)."""
+    base = path[:-3] if path.endswith(".gz") else path
+    with _open_read(path) as f:
+        if base.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a trade .tbt file: {path}")
+        while True:
+            buf = f.read(_RECORD.size)
+            if len(buf) < _RECORD.size:
+                return
+            t, action, side, via, state, reason, price, pnl_pct, balance, mult = _RECORD.unpack(buf)
+            trade = {"time": t, "side": _decode(SIDES, side), "price": price, "action": _decode(ACTIONS, action)}
+            if trade["action"] == "exit":
+                trade.update(pnl_pct=pnl_pct, via=_decode(VIAS, via), balance=balance)
+            trade["filter_state"] = _decode(FILTER_STATES, state)
+            if trade["action"] == "entry":
+                trade.update(position_mult=None if math.isnan(mult) else mult, reason_ko=_decode(REASONS, reason))
+            yield trade
+
+
+def _open_read(path: str) -> IO[bytes]:
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def write_summary(path: str, result: dict) -> None:
+    """요약 JSON (전체 trades 제외, trades_last_20은 유지)."""
+    summary = {k: v for k, v in result.items() if k != "trades"}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,308 @@
+"""
+Binance Futures user data stream 소비자 + 계정 미러 (포지션·주문·잔고).
+- listenKey 발급 → WS {binance_ws_url}/ws/{listenKey} 구독 → REST 스냅샷(account, openOrders)으로 초기화 →
+  ORDER_TRADE_UPDATE / ACCOUNT_UPDATE를 메모리 미러(mirror)와 DB에 반영. user_stream_keepalive_s마다 keepalive.
+- listenKeyExpired·끊김이면 지수 백오프(최대 60초) 후 재발급·재구독·스냅샷 재동기화. 끊긴 동안 mirror.is_live()=False.
+- DB 미러:
+  * 거래소 STOP_MARKET 체결 → orders 기록 + positions 정리 + Adaptive Filter PnL 반영 (이전엔 아무도 몰랐음)
+  * ACCOUNT_UPDATE 포지션 0 → LIVE positions 행 정리 (수동 청산 등). 열린 PAPER 포지션 행은 건드리지 않음
+  * 이미 있는 orders 행(orderId)은 상태·체결가 갱신. 새 행은 우리가 내지 않은 주문(clientOrderId가 tb- 아님)만 추가
+  * 잔고 → app_settings live_balance
+- execution은 mirror가 살아 있으면 REST(positionRisk/account) 대신 미러를 읽음. 아니면 기존 REST 폴백.
+- worker 프로세스 안에서 데몬 스레드로 실행 (start()). 로컬 테스트는 fake_binance의 /ws/{listenKey}.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from app.config import get_settings
+from app.models import AppSetting, Order, Position
+from app.services.binance_client import (
+    CLIENT_ORDER_PREFIX,
+    create_listen_key,
+    get_account,
+    get_open_orders,
+    keepalive_listen_key,
+)
+
+logger = logging.getLogger(__name__)
+
+LIVE_BALANCE_KEY = "live_balance"
+MAX_BACKOFF_S = 60.0
+_OPEN_STATUSES = ("NEW", "PARTIALLY_FILLED")
+
+# ACCOUNT_UPDATE(포지션 0)가 스탑 체결 ORDER_TRADE_UPDATE보다 먼저 올 수 있어, 정리한 행의 (side, entry)를 잠시 보관
+_recently_closed: dict[str, tuple[str, float]] = {}
+
+
+class AccountMirror:
+    """스레드 안전 메모리 미러. 스냅샷 + 스트림 이벤트 (값은 모두 절대값이라 재적용해도 같은 결과)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.positions: dict[str, dict] = {}  # symbol → {"amt", "entry", "updated"}
+        self.orders: dict[int, dict] = {}  # orderId → 미체결 주문 (체결/취소되면 제거)
+        self.balance: float | None = None
+        self.connected = False
+        self.synced_at = 0
+        self.last_event_ms = 0
+
+    def load_snapshot(self, account: dict, open_orders: list[dict]) -> None:
+        with self.lock:
+            self.positions = {
+                p["symbol"]: {"amt": float(p.get("positionAmt", 0) or 0), "entry": float(p.get("entryPrice", 0) or 0), "updated": int(p.get("updateTime", 0) or 0)}
+                for p in account.get("positions", [])
+            }
+            self.orders = {int(o["orderId"]): o for o in open_orders}
+            self.balance = next(
+                (float(a.get("walletBalance", 0) or 0) for a in account.get("assets", []) if a.get("asset") == "USDT"), None
+            )
+            self.synced_at = int(time.time() * 1000)
+
+    def apply(self, event: dict) -> None:
+        kind = event.get("e")
+        with self.lock:
+            self.last_event_ms = int(event.get("E", 0) or 0)
+            if kind == "ACCOUNT_UPDATE":
+                a = event.get("a", {})
+                for b in a.get("B", []):
+                    if b.get("a") == "USDT":
+                        self.balance = float(b["wb"])
+                for p in a.get("P", []):
+                    if p.get("ps", "BOTH") != "BOTH":
+                        continue
+                    self.positions[p["s"]] = {"amt": float(p["pa"]), "entry": float(p["ep"]), "updated": int(event.get("T", 0) or 0)}
+            elif kind == "ORDER_TRADE_UPDATE":
+                o = event.get("o", {})
+                oid = int(o["i"])
+                if o.get("X") in _OPEN_STATUSES:
+                    self.orders[oid] = {
+                        "orderId": oid, "symbol": o["s"], "side": o["S"], "type": _order_type(o), "status": o["X"],
+                        "origQty": o["q"], "executedQty": o["z"], "stopPrice": o["sp"], "reduceOnly": o["R"],
+                        "clientOrderId": o["c"],
+                    }
+                else:
+                    self.orders.pop(oid, None)
+
+    def is_live(self) -> bool:
+        return self.connected and self.synced_at > 0
+
+    def position(self, symbol: str) -> tuple[float, float] | None:
+        """(positionAmt, entryPrice). 미러가 끊겼거나 동기화 전이면 None (REST로 폴백)."""
+        with self.lock:
+            if not self.is_live():
+                return None
+            p = self.positions.get(symbol)
+            return (p["amt"], p["entry"]) if p else (0.0, 0.0)
+
+    def balance_usdt(self) -> float | None:
+        with self.lock:
+            return self.balance if self.is_live() else None
+
+    def open_orders(self, symbol: str | None = None) -> list[dict] | None:
+        with self.lock:
+            if not self.is_live():
+                return None
+            return [dict(o) for o in self.orders.values() if not symbol or o["symbol"] == symbol]
+
+    def state(self) -> dict:
+        with self.lock:
+            return {
+                "live": self.is_live(),
+                "synced_at": self.synced_at,
+                "last_event_ms": self.last_event_ms,
+                "balance": self.balance,
+                "positions": {s: p for s, p in self.positions.items() if p["amt"]},
+                "open_orders": list(self.orders.values()),
+            }
+
+
+mirror = AccountMirror()
+
+
+def _order_type(o: dict) -> str:
+    """주문 원래 타입. 발동된 스탑의 체결은 o=MARKET, ot=STOP_MARKET으로 옴 → ot 우선."""
+    return o.get("ot") or o["o"]
+
+
+# ---------- DB 반영 ----------
+
+
+def _set_balance(db, balance: float) -> None:
+    row = db.query(AppSetting).filter(AppSetting.key == LIVE_BALANCE_KEY).first()
+    value = f"{balance:.8f}"
+    if row:
+        row.value = value
+    else:
+        db.add(AppSetting(key=LIVE_BALANCE_KEY, value=value))
+
+
+def _live_row(db, symbol: str) -> Position | None:
+    """열린 LIVE 포지션 행 (없거나 PAPER면 None)."""
+    row = db.query(Position).filter(Position.symbol == symbol).first()
+    if row and row.mode == "LIVE" and row.size and float(row.size) > 0:
+        return row
+    return None
+
+
+def _clear(row: Position) -> None:
+    row.size = 0
+    row.entry_price = 0
+    row.stop_price = None
+    row.updated_at = int(time.time() * 1000)
+
+
+def persist_event(db, event: dict) -> None:
+    """스트림 이벤트 1건을 orders/positions/app_settings에 반영하고 commit."""
+    from app.services.adaptive_filter import update_adaptive_filter_state_after_exit
+
+    kind = event.get("e")
+    if kind == "ORDER_TRADE_UPDATE":
+        o = event["o"]
+        oid = int(o["i"])
+        avg = float(o.get("ap", 0) or 0) or None
+        row = db.query(Order).filter(Order.order_id == oid).first()
+        if row:
+            row.status = o["X"]
+            if avg:
+                row.price = avg
+        elif not str(o.get("c", "")).startswith(CLIENT_ORDER_PREFIX):
+            # 우리 주문은 execution이 직접 기록 (스트림이 먼저 와도 중복 행 안 만듦)
+            db.add(Order(
+                order_id=oid, client_order_id=o.get("c"), type=_order_type(o), side=o["S"], qty=float(o["q"]), price=avg, status=o["X"],
+                symbol=o["s"], mode="LIVE", raw={"stream": o},
+            ))
+        if o["X"] == "FILLED" and _order_type(o) == "STOP_MARKET" and o.get("R"):
+            pos = _live_row(db, o["s"])
+            if pos is not None:
+                side, entry = pos.side, float(pos.entry_price)
+                _clear(pos)
+            else:
+                side, entry = _recently_closed.pop(o["s"], (None, 0.0))
+            if side and entry and avg:
+                pnl_pct = (avg - entry) / entry * 100 if side == "LONG" else (entry - avg) / entry * 100
+                update_adaptive_filter_state_after_exit(db, pnl_pct)
+                logger.info("Exchange stop filled: %s %s avg=%s pnl=%.2f%%", o["s"], side, avg, pnl_pct)
+    elif kind == "ACCOUNT_UPDATE":
+        a = event.get("a", {})
+        for b in a.get("B", []):
+            if b.get("a") == "USDT":
+                _set_balance(db, float(b["wb"]))
+        for p in a.get("P", []):
+            if p.get("ps", "BOTH") == "BOTH" and float(p["pa"]) == 0:
+                pos = _live_row(db, p["s"])
+                if pos is not None:
+                    logger.info("Position closed on exchange: %s (%s)", p["s"], a.get("m"))
+                    _recently_closed[p["s"]] = (pos.side, float(pos.entry_price))
+                    _clear(pos)
+    db.commit()
+
+
+def persist_snapshot(db) -> None:
+    """재동기화 시: 거래소에 없는 LIVE 포지션 행 정리 (끊긴 사이 스탑 체결 등) + 잔고."""
+    state = mirror.state()
+    if state["balance"] is not None:
+        _set_balance(db, state["balance"])
+    rows = db.query(Position).filter(Position.mode == "LIVE", Position.size > 0).all()
+    for row in rows:
+        if row.symbol not in state["positions"]:
+            logger.info("Position %s flat on exchange at resync; clearing DB row", row.symbol)
+            _clear(row)
+    db.commit()
+
+
+def _persist(fn, *args) -> None:
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        fn(db, *args)
+    except Exception as e:
+        db.rollback()
+        logger.exception("user stream DB mirror failed: %s", e)
+    finally:
+        db.close()
+
+
+# ---------- 스트림 루프 ----------
+
+
+async def _keepalive(interval_s: float) -> None:
+    while True:
+        await asyncio.sleep(interval_s)
+        try:
+            await asyncio.to_thread(keepalive_listen_key)
+        except Exception as e:
+            logger.warning("listenKey keepalive failed: %s", e)
+
+
+async def run(stop: threading.Event | None = None, persist: bool = True) -> None:
+    """끊기면 재연결하며 계속 구독. stop이 set되면 종료. persist=False면 메모리 미러만."""
+    import websockets
+
+    stop = stop or threading.Event()
+    backoff = 1.0
+    while not stop.is_set():
+        keepalive = None
+        try:
+            key = await asyncio.to_thread(create_listen_key)
+            url = f"{get_settings().binance_ws_url.rstrip('/')}/ws/{key}"
+            async with websockets.connect(url, ping_interval=60, ping_timeout=30) as ws:
+                # 구독 후 스냅샷: 그 사이 이벤트는 스냅샷과 스트림 양쪽에 있어도 절대값이라 재적용 무해
+                account, open_orders = await asyncio.gather(
+                    asyncio.to_thread(get_account), asyncio.to_thread(get_open_orders)
+                )
+                mirror.load_snapshot(account, open_orders)
+                mirror.connected = True
+                if persist:
+                    await asyncio.to_thread(_persist, persist_snapshot)
+                keepalive = asyncio.create_task(_keepalive(get_settings().user_stream_keepalive_s))
+                logger.info("User data stream connected")
+                backoff = 1.0
+                while not stop.is_set():
+                    try:
+                        msg = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        continue
+                    event = json.loads(msg)
+                    if event.get("e") == "listenKeyExpired":
+                        logger.info("listenKey expired; reconnecting")
+                        break
+                    mirror.apply(event)
+                    if persist:
+                        await asyncio.to_thread(_persist, persist_event, event)
+        except Exception as e:
+            logger.warning("User data stream error: %s (retry in %.0fs)", e, backoff)
+        finally:
+            mirror.connected = False
+            if keepalive:
+                keepalive.cancel()
+        if not stop.is_set():
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF_S)
+
+
+_thread: threading.Thread | None = None
+_stop = threading.Event()
+
+
+def start() -> threading.Thread | None:
+    """worker 프로세스에서 백그라운드 스레드로 시작 (API 키 없거나 user_stream_enabled=false면 None)."""
+    global _thread
+    s = get_settings()
+    if not s.user_stream_enabled or not s.binance_api_key:
+        return None
+    if _thread and _thread.is_alive():
+        return _thread
+    _stop.clear()
+    _thread = threading.Thread(target=lambda: asyncio.run(run(_stop)), name="user-stream", daemon=True)
+    _thread.start()
+    return _thread
+
+
+def stop(timeout: float = 5.0) -> None:
+    _stop.set()
+    if _thread:
+        _thread.join(timeout=timeout)
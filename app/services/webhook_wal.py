@@ -0,0 +1,208 @@
+"""
+웹훅 선기록(WAL): DB보다 먼저 로컬 파일에 남기고 바로 응답 (webhook_wal_enabled=true일 때).
+- POST /webhook/tv: 검증된 payload 1줄(JSON)을 {webhook_wal_dir}/events.log에 append + fsync → "accepted"
+  MariaDB가 느리거나 잠깐 내려가도 웹훅 응답 시간은 파일 쓰기만큼으로 일정
+- flusher 스레드: webhook_wal_flush_interval_s마다 events.offset 이후 줄을 모아 ingest.enqueue_events
+  (INSERT IGNORE 1문장) → 커밋되면 offset 전진(임시 파일 + fsync + rename). 실패하면 offset 그대로 두고 다음 주기에 재시도
+- 시작 시 offset 이후 남은 줄부터 재생 (이미 들어간 줄이 다시 와도 dedupKey로 1건). 모두 반영되면 로그를 비움
+- 한 디렉터리는 한 프로세스만 사용 (events.lock에 flock). 잠겨 있으면 WAL 없이 DB 직접 큐잉
+- 로그는 소유자만 읽기·쓰기(0600). 웹훅 secret은 기록하지 않음 (라우터가 raw에서 제외)
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.services.ingest import enqueue_events
+
+logger = logging.getLogger(__name__)
+
+LOG_NAME = "events.log"
+OFFSET_NAME = "events.offset"
+LOCK_NAME = "events.lock"
+MAX_BATCH_BYTES = 1 << 20  # flush 1번에 읽는 최대 바이트 (재생 시 큰 로그도 나눠서)
+
+
+class WebhookWal:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.log_path = os.path.join(directory, LOG_NAME)
+        self.offset_path = os.path.join(directory, OFFSET_NAME)
+        self.lock_path = os.path.join(directory, LOCK_NAME)
+        self._lock = threading.Lock()  # append·offset·truncate 직렬화
+        self._log = None
+        self._lock_fd: int | None = None
+        self.offset = 0
+        self.stats = {"appended": 0, "flushed": 0, "inserted": 0, "flush_errors": 0, "skipped_lines": 0}
+
+    def open(self) -> bool:
+        """디렉터리 잠금 + 로그 열기. 다른 프로세스가 쓰는 중이면 False."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        try:
+            with open(self.offset_path) as f:
+                self.offset = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            self.offset = 0
+        log_fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        os.fchmod(log_fd, 0o600)  # 이전 버전이 기본 권한으로 만든 로그도 소유자 전용으로
+        self._log = os.fdopen(log_fd, "ab")
+        if self.offset > self._log.tell():
+            self.offset = 0  # 로그가 offset 기록 뒤 비워짐 (truncate 직후 중단)
+        return True
+
+    def close(self) -> None:
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+    def append(self, record: dict) -> None:
+        """1줄 append + fsync. 반환되면 디스크에 있음."""
+        line = (json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n").encode()
+        with self._lock:
+            self._log.write(line)
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self.stats["appended"] += 1
+
+    def pending_bytes(self) -> int:
+        with self._lock:
+            return (self._log.tell() - self.offset) if self._log is not None else 0
+
+    def _write_offset(self, offset: int) -> None:
+        tmp = self.offset_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.offset_path)
+
+    def _read_batch(self) -> tuple[list[dict], int]:
+        """offset 이후 완성된 줄 (최대 MAX_BATCH_BYTES) → (레코드, 다음 offset)."""
+        with self._lock:
+            start, end = self.offset, self._log.tell()
+        if end <= start:
+            return [], start
+        with open(self.log_path, "rb") as f:
+            f.seek(start)
+            chunk = f.read(min(end - start, MAX_BATCH_BYTES))
+        cut = chunk.rfind(b"\n") + 1
+        if cut == 0:
+            return [], start
+        records = []
+        for line in chunk[:cut].splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                self.stats["skipped_lines"] += 1  # 중단 중 잘린 줄
+                logger.warning("webhook WAL: skipping unreadable line (%d bytes)", len(line))
+        return records, start + cut
+
+    def flush(self) -> int:
+        """offset 이후 줄을 모두 events에 반영. 새로 들어간 건수. DB 오류는 그대로 올림 (offset 유지)."""
+        inserted = 0
+        while True:
+            records, next_offset = self._read_batch()
+            if next_offset == self.offset:
+                return inserted
+            n = 0
+            if records:
+                db = SessionLocal()
+                try:
+                    n = enqueue_events(db, records)
+                finally:
+                    db.close()
+            inserted += n
+            with self._lock:
+                if next_offset == self._log.tell():
+                    # 전부 반영 → 로그 비움 (append도 이 잠금 뒤라 잃는 줄 없음)
+                    self._log.truncate(0)
+                    self._log.seek(0)
+                    next_offset = 0
+                self._write_offset(next_offset)
+                self.offset = next_offset
+            self.stats["flushed"] += len(records)
+            self.stats["inserted"] += n
+
+    def state(self) -> dict:
+        return {**self.stats, "pending_bytes": self.pending_bytes(), "path": self.log_path}
+
+
+wal: WebhookWal | None = None
+_thread: threading.Thread | None = None
+_stop = threading.Event()
+
+
+def _run() -> None:
+    interval = get_settings().webhook_wal_flush_interval_s
+    backoff = interval
+    while True:
+        try:
+            wal.flush()
+            backoff = interval
+        except Exception as e:
+            wal.stats["flush_errors"] += 1
+            backoff = min(backoff * 2, 30.0)
+            logger.warning("webhook WAL flush failed: %s (retry in %.1fs)", e, backoff)
+        if _stop.wait(backoff):
+            break
+    try:
+        wal.flush()  # 종료 전 마지막 반영 (실패하면 다음 시작 때 재생)
+    except Exception as e:
+        logger.warning("webhook WAL final flush failed: %s", e)
+
+
+def start() -> WebhookWal | None:
+    """API 프로세스 시작 시: 로그 열고 남은 줄 재생 후 flusher 시작. 비활성·잠금 실패면 None (웹훅은 DB 직접 큐잉)."""
+    global wal, _thread
+    s = get_settings()
+    if not s.webhook_wal_enabled:
+        return None
+    if wal is not None:
+        return wal
+    w = WebhookWal(s.webhook_wal_dir)
+    if not w.open():
+        logger.error("webhook WAL %s is locked by another process; ingesting directly to DB", s.webhook_wal_dir)
+        return None
+    wal = w
+    pending = w.pending_bytes()
+    if pending:
+        logger.info("webhook WAL: replaying %d bytes", pending)
+    _stop.clear()
+    _thread = threading.Thread(target=_run, name="webhook-wal", daemon=True)
+    _thread.start()
+    return wal
+
+
+def stop(timeout: float = 10.0) -> None:
+    global wal, _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=timeout)
+        _thread = None
+    if wal is not None:
+        wal.close()
+        wal = None
+
+
+def append(symbol: str, tf: str, close_time: int, raw: dict) -> bool:
+    """WAL이 열려 있으면 기록하고 True, 아니면 False (호출 측이 DB 직접 큐잉)."""
+    w = wal
+    if w is None:
+        return False
+    w.append({"symbol": symbol, "tf": tf, "close_time": close_time, "raw": raw, "received_at": int(time.time() * 1000)})
+    return True
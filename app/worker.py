@@ -1,12 +1,14 @@
 """
-Worker: process pending webhook events.
-1. Fetch latest closed kline / klines from Binance
+Worker: process pending webhook events (close_time order).
+0. Coalesce a backlog per symbol/tf: only the newest bar is processed, and only while it is still the latest closed bar
+1. Fetch klines ending at the event's closed bar (candles table for kline WS events, else Binance REST minus the open bar)
 2. Update candle store (optional; we use Binance as source of truth per run)
 3. Compute indicators, evaluate strategy
 4. Save signal to DB (and later: execute order if trade_enabled)
 """
 import json
 import logging
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.database import SessionLocal, init_db
 from app.models import Event, Signal, Position
@@ -15,6 +17,7 @@ from app.services.indicators import compute_all
 from app.services.strategy import evaluate, LONG_ENTRY, SHORT_ENTRY, LONG_EXIT, SHORT_EXIT
 from app.services.params import get_active_params, DEFAULT_PARAMS
 from app.services.execution import execute_entry, execute_exit
+from app.services.paper_exec import check_stops as paper_check_stops, check_stops_at_mark as paper_check_stops_at_mark
 from app.services.telegram_notify import notify_signal
 from app.services.adaptive_filter import (
     evaluate as filter_evaluate,
@@ -22,11 +25,15 @@ from app.services.adaptive_filter import (
     update_adaptive_filter_state_after_exit,
     update_adaptive_filter_state_after_skip,
 )
-from app.services.admin_state import is_new_entry_allowed
+from app.services.admin_state import ensure_mode, is_new_entry_allowed
+from app.services import bar_indicators, kline_stream, reconcile, shadow, time_sync, user_stream
+from app.config import get_settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+STATUS_COALESCED = "coalesced"
+
 
 def get_position_info(db: Session, symbol: str) -> tuple[str | None, float | None, float | None]:
     """(side, entry_price, stop_price) for symbol. (None, None, None) if flat."""
@@ -50,6 +57,24 @@ def _bar_duration_ms(tf: str) -> int:
     return 4 * 3600 * 1000
 
 
+def closed_window(klines: list[dict], close_time: int, tf: str) -> list[dict]:
+    """close_time 봉까지의 마감 봉만 (REST 결과 끝의 진행 중 봉·이후 봉 제외). kline_stream.stored_klines와 같은 창."""
+    last_open = close_time + 1 - _bar_duration_ms(tf)
+    end = len(klines)
+    while end and klines[end - 1]["open_time"] > last_open:
+        end -= 1
+    return klines if end == len(klines) else klines[:end]
+
+
+def _closed_bar(klines: list[dict], close_time: int, tf: str) -> dict | None:
+    """close_time에 마감된 봉. REST fetch_klines 끝의 진행 중 봉은 건너뜀 (없으면 그 이전 마지막 봉)."""
+    last_open = close_time + 1 - _bar_duration_ms(tf)
+    for k in reversed(klines):
+        if k["open_time"] <= last_open:
+            return k
+    return None
+
+
 def _in_cooldown(db: Session, symbol: str, current_close_time: int, tf: str, cooldown_bars: int) -> bool:
     """청산 후 cooldown_bars 이내면 True (진입 스킵)."""
     if cooldown_bars <= 0:
@@ -82,7 +107,13 @@ def process_one_event(db: Session, event: Event) -> bool:
 
     limit = max(200, ema_len, entry_len, exit_len, dmi_len, atr_len) + 10
     try:
-        klines = fetch_klines(symbol, tf, limit=limit)
+        klines = None
+        if (event.raw or {}).get("source") == kline_stream.SOURCE:
+            # WS 수집 이벤트: candles에 마감 봉이 연속으로 있으면 REST 조회 없이 (빠진 봉 있으면 REST)
+            klines = kline_stream.stored_klines(db, symbol, tf, limit, close_time)
+        if klines is None:
+            # REST는 끝에 진행 중인 봉이 붙음 → WS 경로와 같은 창 (close_time 봉까지 마감 봉 limit개)
+            klines = closed_window(fetch_klines(symbol, tf, limit=limit + 1), close_time, tf)[-limit:]
     except Exception as e:
         logger.exception("fetch_klines failed: %s", e)
         event.status = "failed"
@@ -95,6 +126,13 @@ def process_one_event(db: Session, event: Event) -> bool:
         db.commit()
         return False
 
+    # PAPER 포지션 스탑: 방금 마감된 봉의 고가/저가로 판정 (실전은 거래소 STOP_MARKET이 처리)
+    bar = _closed_bar(klines, close_time, tf)
+    stopped, stop_pnl = paper_check_stops(db, symbol, high=bar["h"], low=bar["l"]) if bar else (False, None)
+    if stopped and stop_pnl is not None:
+        update_adaptive_filter_state_after_exit(db, stop_pnl)
+        db.commit()
+
     indicators = compute_all(
         klines,
         ema_len=ema_len,
@@ -157,7 +195,7 @@ def process_one_event(db: Session, event: Event) -> bool:
                 db.commit()
             logger.info("Adaptive filter: skip LONG entry [Filter State: %s] [사유: %s]", filt.state, filt.reason_ko)
         else:
-            execute_entry(db, symbol, "LONG", indicators, params, position_multiplier=filt.multiplier, filter_state=filt.state, filter_reason_ko=filt.reason_ko)
+            execute_entry(db, symbol, "LONG", indicators, params, position_multiplier=filt.multiplier, filter_state=filt.state, filter_reason_ko=filt.reason_ko, event_id=event.id)
     elif action == SHORT_ENTRY and position_side is None and not skip_entry_cooldown and admin_allow_entry:
         if not filt.allowed:
             if filt.reason == "consecutive_loss_cooldown":
@@ -165,39 +203,105 @@ def process_one_event(db: Session, event: Event) -> bool:
                 db.commit()
             logger.info("Adaptive filter: skip SHORT entry [Filter State: %s] [사유: %s]", filt.state, filt.reason_ko)
         else:
-            execute_entry(db, symbol, "SHORT", indicators, params, position_multiplier=filt.multiplier, filter_state=filt.state, filter_reason_ko=filt.reason_ko)
+            execute_entry(db, symbol, "SHORT", indicators, params, position_multiplier=filt.multiplier, filter_state=filt.state, filter_reason_ko=filt.reason_ko, event_id=event.id)
     elif action == LONG_EXIT:
-        ok, pnl_pct = execute_exit(db, symbol, "LONG")
+        ok, pnl_pct = execute_exit(db, symbol, "LONG", event_id=event.id)
         if ok and pnl_pct is not None:
             update_adaptive_filter_state_after_exit(db, pnl_pct)
             db.commit()
     elif action == SHORT_EXIT:
-        ok, pnl_pct = execute_exit(db, symbol, "SHORT")
+        ok, pnl_pct = execute_exit(db, symbol, "SHORT", event_id=event.id)
         if ok and pnl_pct is not None:
             update_adaptive_filter_state_after_exit(db, pnl_pct)
             db.commit()
 
     logger.info("Event %s processed: symbol=%s tf=%s action=%s [Filter State: %s]", event.id, symbol, tf, action, filt.state)
+
+    # 대시보드용 봉별 지표 스냅샷 (주문 처리 뒤, 같은 캔들로 B/C봇 지표까지)
+    bar_indicators.record(db, symbol, tf, close_time, klines, indicators)
+
+    # 후보 파라미터 세트: 실전 주문까지 끝난 뒤 같은 캔들로 백그라운드 평가
+    if get_settings().shadow_enabled:
+        shadow.submit(symbol, tf, close_time, _bar_duration_ms(tf), klines, params, indicators)
     return True
 
 
+def coalesce_backlog(db: Session, event: Event) -> int:
+    """
+    같은 (symbol, tf) pending 백로그 정리 (다운타임 뒤 웹훅·/webhook/bulk 백필). 정리한 건수 반환.
+    fetch_klines는 최신 캔들이라 지난 봉 이벤트를 처리하면 지금 데이터로 과거 봉 신호·주문이 나감 →
+    가장 최근 봉 1건만 남기고 나머지는 coalesced. 그 최신 봉도 다음 봉이 이미 마감됐으면 coalesced.
+    """
+    pending = (Event.symbol == event.symbol, Event.tf == event.tf, Event.status == "pending")
+    latest = db.query(func.max(Event.close_time)).filter(*pending).scalar()
+    if latest is None:
+        return 0
+    cutoff = int(latest)
+    if cutoff + _bar_duration_ms(event.tf) < time_sync.clock.now_ms():
+        cutoff += 1  # 최신 봉도 지남
+    n = (
+        db.query(Event)
+        .filter(*pending, Event.close_time < cutoff)
+        .update({Event.status: STATUS_COALESCED}, synchronize_session=False)
+    )
+    db.commit()
+    if n:
+        logger.info("Coalesced %d stale event(s) for %s %s (newest close %s%s)", n, event.symbol, event.tf, latest,
+                    ", also stale" if cutoff > latest else "")
+    return n
+
+
 def run_once():
-    """Process one pending event from the queue."""
+    """Process one pending event from the queue (oldest bar first; stale backlog coalesced)."""
     init_db()
     db = SessionLocal()
     try:
-        event = db.query(Event).filter(Event.status == "pending").order_by(Event.id).first()
+        event = db.query(Event).filter(Event.status == "pending").order_by(Event.close_time, Event.id).first()
         if not event:
             return False
+        if coalesce_backlog(db, event):
+            return True  # 다음 호출에서 남은 최신 봉 처리
         return process_one_event(db, event)
     finally:
         db.close()
 
 
+def check_paper_stops() -> int:
+    """이벤트 사이 폴링마다 PAPER 포지션 스탑을 현재 마크가로 판정. 체결 건수 반환."""
+    db = SessionLocal()
+    try:
+        stopped = paper_check_stops_at_mark(db)
+        for symbol, pnl_pct in stopped:
+            logger.info("Paper stop filled: %s pnl=%s", symbol, pnl_pct)
+            if pnl_pct is not None:
+                update_adaptive_filter_state_after_exit(db, pnl_pct)
+        if stopped:
+            db.commit()
+        return len(stopped)
+    except Exception as e:
+        logger.exception("paper stop check failed: %s", e)
+        return 0
+    finally:
+        db.close()
+
+
 def run_worker(interval_seconds: float = 5.0):
     """Poll for pending events and process them."""
     import time
+    init_db()
+    db = SessionLocal()
+    try:
+        ensure_mode(db)  # 모드 미설정(업그레이드 직후)이면 trade_enabled 기준으로 기록
+    finally:
+        db.close()
+    # 서명 요청 timestamp 오프셋 + LIVE 포지션·주문·잔고 미러 (거래소 스탑 체결 반영). API 키 없으면 시작 안 함
+    time_sync.start()
+    user_stream.start()
+    # Binance kline WS → 봉 마감 Event (kline_stream_enabled일 때만)
+    kline_stream.start()
     while True:
         if run_once():
             continue
+        check_paper_stops()
+        reconcile.maybe_run()
         time.sleep(interval_seconds)
@@ -0,0 +1,7 @@
+-- PAPER 실행 엔진 (app/services/paper_exec.py): orders/positions 에 실행 모드 태그
+-- 기존 행은 모두 실주문이므로 LIVE. (한 번만 실행, 이미 있으면 에러 무시)
+
+SET NAMES utf8mb4;
+
+ALTER TABLE orders ADD COLUMN mode VARCHAR(8) NOT NULL DEFAULT 'LIVE' AFTER raw;
+ALTER TABLE positions ADD COLUMN mode VARCHAR(8) NOT NULL DEFAULT 'LIVE' AFTER stopPrice;
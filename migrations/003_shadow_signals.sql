@@ -0,0 +1,21 @@
+-- Shadow 전략 러너 (app/services/shadow.py): 후보 파라미터 세트(param_sets.name 'shadow:%')의 가상 신호·PnL
+
+SET NAMES utf8mb4;
+
+CREATE TABLE IF NOT EXISTS shadow_signals (
+  id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  paramSetId BIGINT UNSIGNED NOT NULL,
+  name VARCHAR(64) NOT NULL,
+  symbol VARCHAR(20) NOT NULL,
+  tf VARCHAR(10) NOT NULL,
+  closeTime BIGINT NOT NULL,
+  action VARCHAR(32) NOT NULL,
+  price DECIMAL(20,8) NULL,
+  pnlPct DECIMAL(12,6) NULL,
+  positionSide VARCHAR(8) NULL,
+  entryPrice DECIMAL(20,8) NULL,
+  stopPrice DECIMAL(20,8) NULL,
+  createdAt BIGINT NOT NULL,
+  PRIMARY KEY (id),
+  UNIQUE KEY uk_shadow_set_symbol_tf_close (paramSetId, symbol, tf, closeTime)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,7 @@
+-- 멱등 주문 (binance_client.submit_order): orders 에 Binance clientOrderId (tb-{event_id}-{leg}) 기록
+-- (한 번만 실행, 이미 있으면 에러 무시)
+
+SET NAMES utf8mb4;
+
+ALTER TABLE orders ADD COLUMN clientOrderId VARCHAR(36) NULL AFTER orderId;
+ALTER TABLE orders ADD INDEX ix_orders_clientOrderId (clientOrderId);
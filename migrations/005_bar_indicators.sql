@@ -0,0 +1,20 @@
+-- 봉별 지표 스냅샷 (app/services/bar_indicators.py): worker가 봉 마감마다 A/B/C봇 지표·레짐·체크를 1행 기록,
+-- 대시보드는 (symbol, tf) 최신 행만 읽음 (유니크 키가 인덱스 역할)
+-- (한 번만 실행)
+
+SET NAMES utf8mb4;
+
+CREATE TABLE IF NOT EXISTS bar_indicators (
+  id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  symbol VARCHAR(20) NOT NULL,
+  tf VARCHAR(10) NOT NULL,
+  closeTime BIGINT NOT NULL,
+  regime VARCHAR(16) NULL,
+  a JSON NULL,
+  b JSON NULL,
+  c JSON NULL,
+  checks JSON NULL,
+  createdAt BIGINT NOT NULL,
+  PRIMARY KEY (id),
+  UNIQUE KEY uk_bar_indicators_symbol_tf_close (symbol, tf, closeTime)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,8 @@
+-- worker 큐 조회 (app/worker.py run_once / coalesce_backlog): pending 이벤트를 closeTime 순으로,
+-- (symbol, tf)별 최신 pending 봉을 인덱스로 찾음 (/webhook/bulk 백필로 백로그가 커져도 풀스캔 없이)
+-- (한 번만 실행, 이미 있으면 에러 무시)
+
+SET NAMES utf8mb4;
+
+ALTER TABLE events ADD INDEX ix_events_status_close (status, closeTime);
+ALTER TABLE events ADD INDEX ix_events_symbol_tf_status_close (symbol, tf, status, closeTime);